@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Generated applications and catalogs that the benchmarks in
+``bench.py`` are run against.
+'''
+
+import sys
+
+import six
+from pyramid_controllers import Controller, RestController, expose
+
+#------------------------------------------------------------------------------
+def sizeof(objects):
+  '''
+  Returns the approximate total memory, in bytes, used by `objects`
+  (a list of entries), including their attribute storage and string
+  values. Each distinct object is only counted once, so interned
+  strings are only counted once.
+  '''
+  seen = set()
+  def _size(obj):
+    if id(obj) in seen:
+      return 0
+    seen.add(id(obj))
+    return sys.getsizeof(obj)
+  total = 0
+  for obj in objects:
+    total += _size(obj)
+    for store in (getattr(obj, '__dict__', None), getattr(obj, '_extra', None)):
+      if store:
+        total += _size(store)
+    for key, value in obj.items():
+      total += _size(key)
+      if isinstance(value, six.string_types):
+        total += _size(value)
+      elif isinstance(value, list):
+        total += _size(value)
+  return total
+
+#------------------------------------------------------------------------------
+def makeApp(size):
+  '''
+  Returns a generated controller tree with `size` branches, each with
+  a RESTful collection and item controller (i.e. ``/b{N}/items`` and
+  ``/b{N}/items/item``), for a total of ``9 * size + 1`` entries.
+  '''
+  class Item(RestController):
+    'An item.'
+    @expose
+    def get(self, request):
+      'Returns the item.'
+    @expose
+    def put(self, request):
+      'Updates the item.'
+    @expose
+    def delete(self, request):
+      'Deletes the item.'
+  class Items(RestController):
+    'A collection of items.'
+    @expose
+    def get(self, request):
+      'Lists the items.'
+    @expose
+    def post(self, request):
+      'Creates an item.'
+  class Branch(Controller):
+    'A branch.'
+    @expose
+    def status(self, request):
+      'Returns the branch status.'
+  class Root(Controller):
+    'The root.'
+  root = Root()
+  for idx in range(size):
+    branch = Branch()
+    branch.items = Items()
+    branch.items.item = Item()
+    setattr(root, 'b%d' % (idx,), branch)
+  return root
+
+#------------------------------------------------------------------------------
+def addTypes(catalog, count):
+  '''
+  Registers `count` generated dict types in the `catalog`\'s type
+  registry (each one referencing an earlier one), and sets the
+  `params` and `returns` of all methods to reference them.
+  '''
+  from pyramid_describe.describer import _allEntries
+  from pyramid_describe.typereg import Type, TypeRef
+  typereg = catalog.typereg
+  types   = []
+  for idx in range(count):
+    value = [
+      TypeRef(name='id', type=typereg.parseType('int'), doc='The ID.'),
+      TypeRef(name='name', type=typereg.parseType('str'), doc='The name.'),
+    ]
+    if types:
+      value.append(TypeRef(name='parent', type=types[idx // 2], doc='The parent.'))
+    typ = Type(base=Type.DICT, name='Type%d' % (idx,), doc='A type.', value=value)
+    typereg.registerType(typ)
+    types.append(typ)
+  methods = [entry for entry in _allEntries(catalog.endpoints) if entry.isMethod]
+  for idx, entry in enumerate(methods):
+    entry.params  = TypeRef(type=types[idx % count])
+    entry.returns = TypeRef(type=Type(
+      base=Type.COMPOUND, name=Type.LIST, value=types[( idx + 1 ) % count]))
+  # the rendered types are derived from the endpoints (see
+  # `Describer._makeDescriberCatalog`), and must therefore be updated.
+  if catalog.get('typegraph') is not None:
+    catalog.types = ( catalog.types or [] ) + types
+    catalog.typegraph = catalog.describer._getTypeGraph(catalog)
+  return catalog
+
+#------------------------------------------------------------------------------
+def makeDocApp(size):
+  '''
+  Returns a generated controller tree with `size` RESTful collection
+  and item controllers (i.e. ``/c{N}`` and ``/c{N}/item``), whose
+  methods declare identical numpydoc parameter, return value and
+  exception shapes, for a total of ``7 * size + 1`` entries.
+  '''
+  shape = '''
+    :Parameters:
+
+    name : str
+
+      The name.
+
+    size : int, optional, default: 1
+
+      The size.
+
+    tags : list(str), optional
+
+      The tags.
+
+    :Returns:
+
+    dict
+
+      id : int
+
+        The ID.
+
+      state : ( "new" | "done" )
+
+        The state.
+
+    :Raises:
+
+    HTTPNotFound
+
+      The item does not exist.
+  '''
+  class Item(RestController):
+    'An item.'
+    @expose
+    def get(self, request):
+      pass
+    get.__doc__ = 'Returns the item.\n' + shape
+    @expose
+    def put(self, request):
+      pass
+    put.__doc__ = 'Updates the item.\n' + shape
+  class Items(RestController):
+    'A collection of items.'
+    @expose
+    def get(self, request):
+      pass
+    get.__doc__ = 'Lists the items.\n' + shape
+    @expose
+    def post(self, request):
+      pass
+    post.__doc__ = 'Creates an item.\n' + shape
+  class Root(Controller):
+    'The root.'
+  root = Root()
+  for idx in range(size):
+    items = Items()
+    items.item = Item()
+    setattr(root, 'c%d' % (idx,), items)
+  return root
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Benchmarks of pyramid-describe internals, run as::
+
+  python bench/bench.py [--size SIZE] [NAME ...]
+
+If no NAME is specified, all benchmarks are run.
+'''
+
+from __future__ import print_function
+
+import sys
+import time
+import argparse
+import collections
+
+from pyramid_controllers import Controller, expose
+
+from apps import makeApp, makeDocApp, addTypes, sizeof
+
+#------------------------------------------------------------------------------
+
+BENCHMARKS = collections.OrderedDict()
+
+#------------------------------------------------------------------------------
+def benchmark(name):
+  def _decorator(func):
+    BENCHMARKS[name] = func
+    return func
+  return _decorator
+
+#------------------------------------------------------------------------------
+def timeit(func, repeat=3):
+  '''
+  Returns the best wall-clock time, in seconds, of `repeat` calls to
+  `func` (with no arguments).
+  '''
+  best = None
+  for idx in range(repeat):
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return best
+
+#------------------------------------------------------------------------------
+@benchmark('entry')
+def bench_entry(size):
+  '''
+  Compares the memory used by the analyzed entries of a large catalog
+  with the default :class:`pyramid_describe.entry.Entry` and with the
+  :class:`pyramid_describe.entry.CompactEntry` implementation.
+  '''
+  from pyramid_describe.describer import Describer, _allEntries
+  app = makeApp(size)
+  ret = []
+  for label, compact in (('Entry', False), ('CompactEntry', True)):
+    desc = Describer(settings={
+      'entry.compact': compact, 'access.default.endpoint': 'public'})
+    entries = list(_allEntries(desc.analyze(app).endpoints))
+    ret.append((label, len(entries), sizeof(entries),
+                timeit(lambda: desc.analyze(app), repeat=1)))
+  print('%-16s %8s %12s %10s' % ('entry', 'entries', 'bytes', 'seconds'))
+  for row in ret:
+    print('%-16s %8d %12d %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('tree')
+def bench_tree(size):
+  '''
+  Times the generation of the text tree of a large catalog, i.e.
+  :attr:`pyramid_describe.describer.DescriberCatalog.tree_entries`.
+  '''
+  from pyramid_describe.describer import Describer
+  desc = Describer(settings={'access.default.endpoint': 'public'})
+  catalog = desc.analyze(makeApp(size))
+  ret = [('tree_entries', len(catalog.tree_entries),
+          timeit(lambda: catalog.tree_entries))]
+  print('%-16s %8s %10s' % ('operation', 'nodes', 'seconds'))
+  for row in ret:
+    print('%-16s %8d %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('structure')
+def bench_structure(size):
+  '''
+  Times the JSON rendering of a catalog with ``2 * size`` endpoints
+  and ``size / 2`` types, i.e. 2000 endpoints and 500 types by
+  default.
+  '''
+  from pyramid_describe.describer import Describer
+  desc = Describer(settings={'access.default.endpoint': 'public'})
+  catalog = desc.analyze(makeApp(( size * 2 + 2 ) // 3))
+  catalog.endpoints = catalog.endpoints[:size * 2]
+  addTypes(catalog, max(1, size // 2))
+  ret = [('json', len(catalog.endpoints), len(catalog.typereg.typeNames()),
+          timeit(lambda: desc.render(catalog, format='json')))]
+  print('%-16s %8s %8s %10s' % ('format', 'endpoints', 'types', 'seconds'))
+  for row in ret:
+    print('%-16s %8d %8d %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('stream')
+def bench_stream(size):
+  '''
+  Compares the time to the first byte, and the largest string held in
+  memory, of the rendered and the streamed JSON output of the same
+  catalog as the ``structure`` benchmark.
+  '''
+  from pyramid_describe.describer import Describer
+  desc = Describer(settings={'access.default.endpoint': 'public'})
+  catalog = desc.analyze(makeApp(( size * 2 + 2 ) // 3))
+  catalog.endpoints = catalog.endpoints[:size * 2]
+  addTypes(catalog, max(1, size // 2))
+  ret = []
+  start = time.time()
+  out = desc.render(catalog, format='json')
+  ret.append(('render', time.time() - start, time.time() - start, len(out)))
+  del out
+  start = time.time()
+  first = None
+  largest = 0
+  for chunk in desc.stream_json(catalog):
+    if first is None:
+      first = time.time() - start
+    largest = max(largest, len(chunk))
+  ret.append(('stream', first, time.time() - start, largest))
+  print('%-16s %10s %10s %12s' % ('mode', 'first', 'seconds', 'max-bytes'))
+  for row in ret:
+    print('%-16s %10.3f %10.3f %12d' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('yaml')
+def bench_yaml(size):
+  '''
+  Compares the YAML rendering time of the pure-python and LibYAML
+  dumpers (rendered and streamed), as well as the JSON rendering time,
+  on the ``doc/example.yaml`` application mounted `size` / 10 times.
+  '''
+  from pyramid_describe.describer import Describer, PyYamlDumper, CYamlDumper
+  from pyramid_describe.test_example import RootController
+  class Root(Controller):
+    'The root.'
+  root = Root()
+  for idx in range(max(1, size // 10)):
+    setattr(root, 'app%d' % (idx,), RootController())
+  desc = Describer(settings={'access.default.endpoint': 'public'})
+  catalog = desc.analyze(root)
+  ret = [('json', timeit(lambda: desc.render(catalog, format='json')))]
+  for label, dumper in (('yaml (python)', PyYamlDumper), ('yaml (libyaml)', CYamlDumper)):
+    if dumper is None:
+      continue
+    desc.yamlDumper = dumper
+    ret.append((label, timeit(lambda: desc.render(catalog, format='yaml'))))
+    ret.append((label + ' stream', timeit(
+      lambda: b''.join(desc.stream_yaml(catalog)))))
+  print('%-24s %10s' % ('format (%d endpoints)' % (len(catalog.endpoints),), 'seconds'))
+  for row in ret:
+    print('%-24s %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('html')
+def bench_html(size):
+  '''
+  Compares the HTML rendering time of the direct doctree-to-HTML path
+  with that of serializing the doctree to reStructuredText and parsing
+  it again (the pre-0.6.0 implementation) for a catalog with ``size /
+  20`` branches.
+  '''
+  from pyramid_describe.describer import Describer
+  from pyramid_describe import rst
+  desc = Describer(settings={
+    'access.default.endpoint': 'public', 'format.default.rstMax': True})
+  catalog = desc.analyze(makeApp(max(1, size // 20)))
+  catalog.options.context.request.update(host_url='http://localhost', url=None)
+  def _reparse():
+    text = desc.render(catalog, format='rst', override_options=dict(rstMax=True))
+    return desc._renderAs(
+      catalog, 'html', None, lambda data: rst.rst2html(data, text))
+  ret = [
+    ('reparse', len(catalog.endpoints), timeit(_reparse)),
+    ('direct', len(catalog.endpoints), timeit(
+      lambda: desc.render(catalog, format='html'))),
+  ]
+  print('%-16s %8s %10s' % ('path', 'endpoints', 'seconds'))
+  for row in ret:
+    print('%-16s %8d %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('publish')
+def bench_publish(size):
+  '''
+  Compares the average time per rendering of a small catalog (a single
+  branch, i.e. 10 entries) to RST and to HTML with the shared docutils
+  settings (see :func:`pyramid_describe.rst.getSettings`) and with the
+  settings being rebuilt for every rendering. The `size` is the number
+  of renderings averaged over.
+  '''
+  from pyramid_describe.describer import Describer
+  from pyramid_describe import rst
+  desc = Describer(settings={
+    'access.default.endpoint': 'public', 'format.default.rstMax': True})
+  catalog = desc.analyze(makeApp(1))
+  catalog.options.context.request.update(host_url='http://localhost', url=None)
+  count = max(1, size // 10)
+  ret = []
+  for format in ('rst', 'html'):
+    for label, clear in (('rebuilt', True), ('shared', False)):
+      def _render():
+        for idx in range(count):
+          if clear:
+            rst._settings.clear()
+          desc.render(catalog, format=format)
+      ret.append((format, label, timeit(_render) / count * 1000))
+  print('%-8s %-10s %10s' % ('format', 'settings', 'ms/render'))
+  for row in ret:
+    print('%-8s %-10s %10.2f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('typereg')
+def bench_typereg(size):
+  '''
+  Compares the average time to construct and to clone a default
+  TypeRegistry with the HTTP error response types shared across
+  registries (see :func:`pyramid_describe.typereg._getHttpTemplates`)
+  and with them being rebuilt for every registry. The `size` is the
+  number of registries averaged over.
+  '''
+  from pyramid_describe import typereg
+  count = max(1, size)
+  ret = []
+  for label, clear in (('rebuilt', True), ('shared', False)):
+    def _create():
+      for idx in range(count):
+        if clear:
+          typereg._httpTemplates = None
+        typereg.TypeRegistry()
+    reg = typereg.TypeRegistry()
+    def _clone():
+      for idx in range(count):
+        reg.clone()
+    ret.append((label, timeit(_create) / count * 1000, timeit(_clone) / count * 1000))
+  print('%-10s %12s %12s' % ('http-types', 'ms/create', 'ms/clone'))
+  for row in ret:
+    print('%-10s %12.3f %12.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('intern')
+def bench_intern(size):
+  '''
+  Compares the number and memory of the distinct type objects that
+  are referenced by the endpoints of an API whose ``4 * size`` methods
+  declare the same parameter shapes (see :func:`makeDocApp`), and the
+  time to analyze it, with and without interning the endpoint types
+  (see the ``type.intern`` setting).
+  '''
+  from pyramid_describe.describer import Describer, _allEntries
+  from pyramid_describe.typereg import Type, TypeRef
+  app = makeDocApp(max(1, size // 4))
+  def _types(catalog):
+    seen = dict()
+    def _walk(typ):
+      if id(typ) in seen:
+        return
+      seen[id(typ)] = typ
+      for sub in typ.children:
+        _walk(sub)
+    for entry in _allEntries(catalog.endpoints):
+      for channel in ('params', 'returns', 'raises'):
+        if getattr(entry, channel, None):
+          _walk(getattr(entry, channel))
+    return list(seen.values())
+  ret = []
+  for label, intern in (('copies', False), ('interned', True)):
+    desc = Describer(settings={
+      'type.intern': intern, 'access.default.endpoint': 'public'})
+    types = _types(desc.analyze(app))
+    ret.append((
+      label, len(types),
+      sum(sys.getsizeof(typ) for typ in types),
+      timeit(lambda: desc.analyze(app), repeat=1)))
+  print('%-10s %8s %12s %10s' % ('types', 'objects', 'bytes', 'seconds'))
+  for row in ret:
+    print('%-10s %8d %12d %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('reachable')
+def bench_reachable(size):
+  '''
+  Compares the number of types, size and rendering time of the JSON
+  and RST documentation of an API with `size` endpoints (each
+  returning its own declared type, of which only every fourth one is
+  public) for the "public" and the "internal" access groups, with and
+  without restricting the rendered types to the ones that are
+  reachable from the visible endpoints (see the ``type.reachable``
+  setting).
+  '''
+  import json
+  from aadict import aadict
+  from pyramid_describe.describer import Describer
+  class Root(Controller):
+    'The root.'
+  root = Root()
+  for idx in range(max(1, size)):
+    class Group(Controller):
+      @expose
+      def get(self, request):
+        pass
+    Group.get.__func__.__doc__ = '''
+      %sReturns the entry.
+
+      :Returns:
+
+      Entry%d
+
+        id : int
+
+          The ID.
+
+        name : str
+
+          The name.
+    ''' % ('' if idx % 4 == 0 else '@INTERNAL: ', idx)
+    setattr(root, 'g%d' % (idx,), Group())
+  def _acl(request, *args, **kw):
+    return request.params.access.split(',')
+  ret = []
+  for label, reachable in (('all', False), ('reachable', True)):
+    desc = Describer(settings={
+      'type.reachable'          : reachable,
+      'access.control'          : _acl,
+      'access.default.endpoint' : 'public',
+      'access.default.type'     : 'public',
+    })
+    for access in ('public', 'public,internal'):
+      context = dict(request=aadict(
+        params=aadict(access=access), host_url='http://localhost', url=None))
+      def _describe(format):
+        return desc.describe(root, context=context, format=format, root='/').content
+      types = len(json.loads(_describe('json'))['application'].get('types', []))
+      for format in ('json', 'rst'):
+        ret.append((
+          label, access, format, types, len(_describe(format)),
+          timeit(lambda: _describe(format))))
+  print('%-10s %-16s %-6s %6s %10s %10s' % (
+    'types', 'access', 'format', 'count', 'bytes', 'seconds'))
+  for row in ret:
+    print('%-10s %-16s %-6s %6d %10d %10.3f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+def parseCorpus():
+  '''
+  Returns the list of ``(spec, complete)`` type specifications that
+  are parsed by the numpydoc syntax tests (the "corpus").
+  '''
+  import unittest
+  from pyramid_describe import typereg
+  from pyramid_describe.syntax.numpydoc import test, test_parser
+  ret = []
+  parseType = typereg.TypeRegistry.parseType
+  def _parseType(self, spec, complete=True):
+    ret.append((spec, complete))
+    return parseType(self, spec, complete=complete)
+  typereg.TypeRegistry.parseType = _parseType
+  try:
+    unittest.TestSuite([
+      unittest.defaultTestLoader.loadTestsFromModule(mod)
+      for mod in (test, test_parser)]).run(unittest.TestResult())
+  finally:
+    typereg.TypeRegistry.parseType = parseType
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('parse')
+def bench_parse(size):
+  '''
+  Compares the average time to parse the type specifications of the
+  numpydoc test corpus (see :func:`parseCorpus`) with and without the
+  parse result cache (see :data:`pyramid_describe.typereg.parseCache`).
+  The `size` is the number of passes over the corpus.
+  '''
+  from pyramid_describe import typereg
+  corpus = parseCorpus()
+  reg    = typereg.TypeRegistry()
+  cache  = typereg.parseCache
+  count  = max(1, size)
+  def _parse():
+    for idx in range(count):
+      for spec, complete in corpus:
+        try:
+          reg.parseType(spec, complete=complete)
+        except ValueError:
+          pass
+  ret = []
+  for label, enabled in (('uncached', False), ('cached', True)):
+    cache.clear()
+    cache.enabled = enabled
+    cache.hits = cache.misses = 0
+    try:
+      elapsed = timeit(_parse)
+    finally:
+      cache.enabled = True
+    total = cache.hits + cache.misses
+    ret.append((
+      label, len(corpus), len(set(corpus)),
+      elapsed / ( count * len(corpus) ) * 1000000,
+      100.0 * cache.hits / total if total else 0.0))
+  print('%-10s %8s %8s %10s %8s' % ('cache', 'specs', 'unique', 'us/spec', 'hits%'))
+  for row in ret:
+    print('%-10s %8d %8d %10.2f %8.1f' % row)
+  return ret
+
+#------------------------------------------------------------------------------
+@benchmark('tokenize')
+def bench_tokenize(size):
+  '''
+  Measures the throughput of the type specification scanner (see
+  :class:`pyramid_describe.typereg.TypeSpecScanner`) and of the
+  (uncached) parser built on it, over the type specifications of the
+  numpydoc test corpus (see :func:`parseCorpus`). The `size` is the
+  number of passes over the corpus.
+  '''
+  from pyramid_describe import typereg
+  corpus = parseCorpus()
+  reg    = typereg.TypeRegistry()
+  count  = max(1, size)
+  chars  = sum(len(spec) for spec, complete in corpus)
+  tokens = [0]
+  def _scan():
+    tokens[0] = 0
+    for idx in range(count):
+      for spec, complete in corpus:
+        src = typereg.TypeSpecScanner(spec, reg._token_cre)
+        while src.token()[0] != 'end':
+          src.read(len(src.token()[1]))
+          tokens[0] += 1
+  def _parse():
+    for idx in range(count):
+      for spec, complete in corpus:
+        try:
+          reg._parseTypeUncached(spec, complete)
+        except ValueError:
+          pass
+  ret = []
+  for label, func in (('scan', _scan), ('parse', _parse)):
+    elapsed = timeit(func)
+    ret.append((
+      label, len(corpus),
+      elapsed / ( count * len(corpus) ) * 1000000,
+      count * chars / elapsed / 1000000))
+  print('%-10s %8s %10s %10s' % ('stage', 'specs', 'us/spec', 'Mchars/s'))
+  for row in ret:
+    print('%-10s %8d %10.2f %10.3f' % row)
+  print('%d tokens per pass' % (tokens[0] / count,))
+  return ret
+
+#------------------------------------------------------------------------------
+def main(argv=None):
+  cli = argparse.ArgumentParser(
+    description='Runs pyramid-describe benchmarks.')
+  cli.add_argument(
+    '--size', metavar='SIZE', type=int, default=1000,
+    help='the benchmark problem size (default: %(default)s)')
+  cli.add_argument(
+    'names', metavar='NAME', nargs='*',
+    help='the benchmarks to run: {}'.format(', '.join(BENCHMARKS)))
+  options = cli.parse_args(argv)
+  for name in options.names or BENCHMARKS.keys():
+    if name not in BENCHMARKS:
+      cli.error('unknown benchmark: %r' % (name,))
+    print('--- %s' % (name,))
+    BENCHMARKS[name](options.size)
+  return 0
+
+#------------------------------------------------------------------------------
+if __name__ == '__main__':
+  sys.exit(main())
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
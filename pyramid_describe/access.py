@@ -13,6 +13,7 @@ access control policies.
 '''
 
 import logging
+import copy
 
 from aadict import aadict
 import asset
@@ -29,6 +30,12 @@ log = logging.getLogger(__name__)
 DEFAULT_ACCESS_PUBLIC   = 'public'
 GLOBAL_ACCESS           = '*'
 
+# the request environ key that, if set, holds the access groups of a
+# request that were resolved in advance (e.g. for rendering in the
+# background, when the original request is no longer active), in
+# which case the access control callback is not called.
+REQUEST_GROUPS_KEY      = 'pyramid_describe.access.groups'
+
 #------------------------------------------------------------------------------
 @asset.plugin('pyramid_describe.plugins.entry.filters', 'access')
 def entry_filter(entry, context):
@@ -96,29 +103,48 @@ def _type_filter(type, context, options, inherit_classes=None):
       options.request.classes):
     return None
 
+  # note: `type` may be shared with the cached analysis and other
+  #       requests (see TypeRegistry.clone), so it is never modified:
+  #       if anything needs to change, a modified copy is returned
+  #       and registered as its replacement, so that other references
+  #       to `type` resolve to the same copy.
+  typereg = context.catalog.typereg
+  type = typereg.current(type)
+  ret  = type
   if isinstance(type, Type):
     children = list(type.children)
     if children:
       filtered = []
       for child in children:
-        if isinstance(child, Type) and context.catalog.typereg.get(child.name):
+        if isinstance(child, Type) and typereg.peek(child.name):
           filtered.append(child)
         else:
           filtered.append(
             _type_filter(child, context, options, inherit_classes=inherit_classes))
-      type.setChildren(filter(None, filtered))
+      if any(cur is not new for cur, new in zip(children, filtered)):
+        ret = copy.copy(type)
+        ret.setChildren(filter(None, filtered))
   elif isinstance(type, TypeRef):
     sub_classes = classes or inherit_classes or default_classes
-    type.type = _type_filter(
+    sub = _type_filter(
       type.type, context, options, inherit_classes=sub_classes)
-    if not type.type:
+    if not sub:
       return None
+    if sub is not type.type:
+      ret = copy.copy(type)
+      ret.type = sub
   else:
     raise ValueError('unknown type: %r' % (type,))
 
-  type.doc = _text_filter(type.doc, context, options)
+  doc = _text_filter(type.doc, context, options)
+  if doc != type.doc:
+    if ret is type:
+      ret = copy.copy(type)
+    ret.doc = doc
 
-  return type
+  if ret is not type:
+    typereg.replace(type, ret)
+  return ret
 
 #------------------------------------------------------------------------------
 def _text_filter(text, context, options):
@@ -179,6 +205,29 @@ def _hasUnion(setA, setB):
 def _defaultAccessControl(request, *args, **kw):
   return [DEFAULT_ACCESS_PUBLIC]
 
+#------------------------------------------------------------------------------
+def getRequestGroups(control, request, context=None):
+  '''
+  Returns a sorted tuple of the access groups that the `request` has
+  access to, as determined by the `control` callback (i.e. the
+  ``access.control`` setting, which can also be a resolvable symbol
+  name). This is primarily useful for determining the "variant" of
+  the documentation that a request will receive without needing to
+  generate it.
+  '''
+  if not control:
+    return (DEFAULT_ACCESS_PUBLIC,)
+  if control == GLOBAL_ACCESS:
+    return (GLOBAL_ACCESS,)
+  return tuple(sorted(set(_callControl(control, request, context) or [])))
+
+#------------------------------------------------------------------------------
+def _callControl(control, request, context):
+  environ = getattr(request, 'environ', None) or {}
+  if REQUEST_GROUPS_KEY in environ:
+    return list(environ[REQUEST_GROUPS_KEY])
+  return asset.symbol(control)(request, context=context)
+
 #------------------------------------------------------------------------------
 def _getOptions(context):
   if __name__ in context:
@@ -222,7 +271,8 @@ def _getOptions(context):
     options.request.groups = options.groups.keys()
   else:
     options.control = asset.symbol(options.control)
-    options.request.groups = options.control(context.request, context=context)
+    options.request.groups = _callControl(
+      options.control, context.request, context)
   # `options.request.classes` = the classes this request has access to
   options.request.classes = [
     options.groups[group]['class']
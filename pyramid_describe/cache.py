@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+This module provides the in-process caches used by pyramid-describe
+to avoid re-analyzing (and re-rendering) an application on every
+request, as well as helpers to coordinate concurrent renderings.
+'''
+
+import os
+import sys
+import time
+import inspect
+import threading
+import collections
+
+import six
+from aadict import aadict
+
+from .util import tobool
+
+#------------------------------------------------------------------------------
+
+EXPIRE_NEVER            = 'never'
+EXPIRE_TTL              = 'ttl'
+EXPIRE_FINGERPRINT      = 'fingerprint'
+
+#------------------------------------------------------------------------------
+def parseExpire(value):
+  '''
+  Parses a cache expiration policy `value` into a tuple of ``(POLICY,
+  TTL)``. The `value` can be one of ``'never'`` (the default),
+  ``'fingerprint'``, or an integer number of seconds, in which case
+  the policy is ``'ttl'``.
+  '''
+  if value is None or value == '' or value == EXPIRE_NEVER:
+    return (EXPIRE_NEVER, None)
+  if value == EXPIRE_FINGERPRINT:
+    return (EXPIRE_FINGERPRINT, None)
+  try:
+    return (EXPIRE_TTL, float(value))
+  except (ValueError, TypeError):
+    raise ValueError('invalid cache expiration policy: %r' % (value,))
+
+#------------------------------------------------------------------------------
+def sourceFiles(objects):
+  '''
+  Returns a sorted list of the python source filenames that define
+  the specified `objects` (which can be classes, instances, functions
+  or methods). Objects whose source cannot be determined are ignored.
+  '''
+  ret = set()
+  for obj in objects:
+    if not inspect.isclass(obj) and not inspect.isroutine(obj):
+      obj = obj.__class__
+    module = sys.modules.get(getattr(obj, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    if not path:
+      continue
+    if path.endswith(('.pyc', '.pyo')):
+      path = path[:-1]
+    ret.add(path)
+  return sorted(ret)
+
+#------------------------------------------------------------------------------
+def fingerprint(files):
+  '''
+  Returns a hashable "fingerprint" of the current state of the
+  specified `files`, currently based on their modification times.
+  '''
+  ret = []
+  for path in files:
+    try:
+      ret.append((path, os.stat(path).st_mtime))
+    except OSError:
+      ret.append((path, None))
+  return tuple(ret)
+
+#------------------------------------------------------------------------------
+class AnalysisCache(object):
+  '''
+  A thread-safe cache of analysis results (e.g. the endpoints and type
+  registry generated by a :class:`pyramid_describe.Describer`). The
+  stored values are considered immutable "masters" -- it is the
+  caller's responsibility to clone them before modifying them.
+
+  :Parameters:
+
+  enabled : bool, optional, default: true
+
+    Whether or not caching is enabled. If disabled, every call to
+    :meth:`get` will invoke the factory.
+
+  expire : str, optional, default: 'never'
+
+    The cache invalidation policy -- see :func:`parseExpire`.
+
+  sources : callable, optional
+
+    For the ``'fingerprint'`` expiration policy, a callable that is
+    passed a newly generated value and must return the list of source
+    files that it was generated from. If any of these files change,
+    the value is regenerated.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, enabled=True, expire=None, sources=None, *args, **kw):
+    super(AnalysisCache, self).__init__(*args, **kw)
+    self.enabled  = enabled
+    self.policy, self.ttl = parseExpire(expire)
+    self.sources  = sources
+    self._records = dict()
+    self._version = 0
+    self._lock    = threading.Lock()
+    self._flight  = SingleFlight()
+
+  #----------------------------------------------------------------------------
+  @classmethod
+  def fromSettings(klass, settings, prefix='cache.analysis', **kw):
+    return klass(
+      enabled = tobool(str(settings.get(prefix, 'true'))),
+      expire  = settings.get(prefix + '.expire', None),
+      **kw)
+
+  #----------------------------------------------------------------------------
+  def get(self, key, factory):
+    '''
+    Returns the value stored for `key`, calling `factory` (with no
+    arguments) to generate it if it is missing or has expired.
+    '''
+    return self.getRecord(key, factory).value
+
+  #----------------------------------------------------------------------------
+  def getRecord(self, key, factory):
+    '''
+    Same as :meth:`get`, but returns the cache record, which has the
+    following attributes:
+
+    * `value`:    the cached value.
+    * `created`:  the epoch timestamp at which `value` was generated.
+    * `version`:  a cache-unique integer that changes every time the
+                  value is regenerated.
+
+    The lock is only held while looking up and storing records:
+    concurrent requests for the same `key` are coalesced so that
+    `factory` runs only once, but different keys are generated in
+    parallel.
+    '''
+    if not self.enabled:
+      return self._makeRecord(factory())
+    record = self._lookup(key)
+    if record is not None:
+      return record
+    def _generate():
+      record = self._lookup(key)
+      if record is None:
+        record = self._makeRecord(factory())
+        with self._lock:
+          self._records[key] = record
+      return record
+    return self._flight.do(key, _generate)
+
+  #----------------------------------------------------------------------------
+  def _lookup(self, key):
+    with self._lock:
+      record = self._records.get(key)
+    if record is None or self.isExpired(record):
+      return None
+    return record
+
+  #----------------------------------------------------------------------------
+  def _makeRecord(self, value):
+    with self._lock:
+      self._version += 1
+      version = self._version
+    record = aadict(value=value, created=time.time(), version=version)
+    if self.policy == EXPIRE_FINGERPRINT and self.sources:
+      record.files       = self.sources(value)
+      record.fingerprint = fingerprint(record.files)
+    return record
+
+  #----------------------------------------------------------------------------
+  def isExpired(self, record):
+    if self.policy == EXPIRE_TTL:
+      return ( time.time() - record.created ) >= self.ttl
+    if self.policy == EXPIRE_FINGERPRINT and record.files is not None:
+      return fingerprint(record.files) != record.fingerprint
+    return False
+
+  #----------------------------------------------------------------------------
+  def clear(self):
+    with self._lock:
+      self._records.clear()
+
+#------------------------------------------------------------------------------
+class RenderCache(object):
+  '''
+  A thread-safe, size-bounded, least-recently-used cache of rendered
+  output. Each value is stored along with its size (typically the
+  length of the rendered content), and the least-recently used values
+  are evicted whenever the total size exceeds `maxsize`.
+
+  :Parameters:
+
+  enabled : bool, optional, default: true
+
+    Whether or not caching is enabled.
+
+  maxsize : int, optional, default: 16777216
+
+    The maximum total size (typically in bytes) of all cached values.
+    Values that are larger than `maxsize` are never cached.
+  '''
+
+  DEFAULT_MAXSIZE = 16 * 1024 * 1024
+
+  #----------------------------------------------------------------------------
+  def __init__(self, enabled=True, maxsize=None, *args, **kw):
+    super(RenderCache, self).__init__(*args, **kw)
+    self.enabled  = enabled
+    self.maxsize  = self.DEFAULT_MAXSIZE if maxsize is None else int(maxsize)
+    self.size     = 0
+    self.hits     = 0
+    self.misses   = 0
+    self._records = collections.OrderedDict()
+    self._lock    = threading.RLock()
+
+  #----------------------------------------------------------------------------
+  @classmethod
+  def fromSettings(klass, settings, prefix='cache.render', **kw):
+    return klass(
+      enabled = tobool(str(settings.get(prefix, 'true'))),
+      maxsize = settings.get(prefix + '.size', None),
+      **kw)
+
+  #----------------------------------------------------------------------------
+  def get(self, key, default=None):
+    '''
+    Returns the value stored for `key`, or `default` if not cached.
+    '''
+    if not self.enabled:
+      return default
+    with self._lock:
+      record = self._records.pop(key, None)
+      if record is None:
+        self.misses += 1
+        return default
+      self._records[key] = record
+      self.hits += 1
+      return record[0]
+
+  #----------------------------------------------------------------------------
+  def put(self, key, value, size):
+    '''
+    Stores `value` (which has a size of `size`) under `key`, evicting
+    the least-recently used values as needed.
+    '''
+    if not self.enabled or size > self.maxsize:
+      return
+    with self._lock:
+      if key in self._records:
+        self.size -= self._records.pop(key)[1]
+      self._records[key] = (value, size)
+      self.size += size
+      while self.size > self.maxsize:
+        self.size -= self._records.popitem(last=False)[1][1]
+
+  #----------------------------------------------------------------------------
+  def __len__(self):
+    return len(self._records)
+
+  #----------------------------------------------------------------------------
+  def clear(self):
+    with self._lock:
+      self._records.clear()
+      self.size = 0
+
+#------------------------------------------------------------------------------
+class SingleFlight(object):
+  '''
+  Coalesces concurrent calls for the same key: while a call for a
+  given key is in progress, any other callers for the same key wait
+  for it to complete and receive the same result (or exception)
+  instead of repeating the work.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, *args, **kw):
+    super(SingleFlight, self).__init__(*args, **kw)
+    self._calls = dict()
+    self._lock  = threading.Lock()
+
+  #----------------------------------------------------------------------------
+  def do(self, key, func):
+    '''
+    Returns the result of calling `func` (with no arguments), unless a
+    call for `key` is already in progress, in which case its result
+    is returned when it completes.
+    '''
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+      if leader:
+        call = aadict(event=threading.Event(), value=None, error=None)
+        self._calls[key] = call
+    if not leader:
+      call.event.wait()
+      if call.error is not None:
+        six.reraise(*call.error)
+      return call.value
+    try:
+      call.value = func()
+    except Exception:
+      call.error = sys.exc_info()
+      raise
+    finally:
+      with self._lock:
+        del self._calls[key]
+      call.event.set()
+    return call.value
+
+#------------------------------------------------------------------------------
+class Limiter(object):
+  '''
+  A counting semaphore that limits the number of concurrent holders
+  to `limit` and supports acquisition timeouts. A `limit` of zero (or
+  ``None``) means unlimited.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, limit=None, *args, **kw):
+    super(Limiter, self).__init__(*args, **kw)
+    self.limit  = int(limit or 0)
+    self.active = 0
+    self._cond  = threading.Condition(threading.Lock())
+
+  #----------------------------------------------------------------------------
+  def acquire(self, timeout=None):
+    '''
+    Acquires a slot, waiting at most `timeout` seconds (or forever if
+    ``None``). Returns ``True`` if the slot was acquired.
+    '''
+    if not self.limit:
+      return True
+    end = None if timeout is None else time.time() + timeout
+    with self._cond:
+      while self.active >= self.limit:
+        if end is None:
+          self._cond.wait()
+          continue
+        remaining = end - time.time()
+        if remaining <= 0:
+          return False
+        self._cond.wait(remaining)
+      self.active += 1
+      return True
+
+  #----------------------------------------------------------------------------
+  def release(self):
+    if not self.limit:
+      return
+    with self._cond:
+      self.active -= 1
+      self._cond.notify()
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -6,7 +6,7 @@
 # copy: (C) Copyright 2013 Cadit Health Inc., All Rights Reserved.
 #------------------------------------------------------------------------------
 
-import sys, argparse, six
+import sys, argparse, contextlib, six
 import pyramid_iniherit.install
 from pyramid.request import Request
 from pyramid.paster import bootstrap
@@ -27,12 +27,45 @@ def describe_from_app(app, output, root=None, format=None, settings=None, contex
   # todo: is this necessary?
   root = root or '/'
 
-  from pyramid.scripts.pviews import PViewsCommand
-  pvcomm = PViewsCommand([])
-  view = pvcomm._find_view(root, app.registry)
+  view = _find_view(app, root)
   from .describer import Describer
   desc = Describer(settings=settings)
   res = desc.describe(view, context=context, format=format, root=root).content
+  _write(output, res)
+
+#------------------------------------------------------------------------------
+def snapshot_from_config(config, output, root=None, settings=None):
+  env  = bootstrap(config)
+  root = root or '/'
+  view = _find_view(env['app'], root)
+  from .describer import Describer
+  desc = Describer(settings=settings)
+  desc.saveSnapshot(
+    view, output, context=dict(request=env['request']), root=root)
+
+#------------------------------------------------------------------------------
+def describe_from_snapshot(input, output, format=None, settings=None):
+  # note: a minimal registry is needed for the template-based renderers
+  from pyramid.config import Configurator
+  config = Configurator(settings={})
+  config.commit()
+  request = Request.blank('/')
+  request.registry = config.registry
+  from .describer import Describer
+  desc = Describer(settings=settings)
+  snap = desc.loadSnapshot(input)
+  res  = desc.describe(
+    snap, context=dict(request=request), format=format, root=snap.root).content
+  _write(output, res)
+
+#------------------------------------------------------------------------------
+def _find_view(app, root):
+  from pyramid.scripts.pviews import PViewsCommand
+  pvcomm = PViewsCommand([])
+  return pvcomm._find_view(root, app.registry)
+
+#------------------------------------------------------------------------------
+def _write(output, res):
   if isinstance(res, six.string_types):
     # todo: encoding the PDF output to UTF-8 is generating the follow error:
     #         UnicodeDecodeError: 'ascii' codec can't decode byte 0xfe in
@@ -108,8 +141,24 @@ def main(argv=None):
     dest='format', action='store_const', const='xml',
     help=_('output an XML document ("--format xml")'))
 
+  cli.add_argument(
+    _('--save-snapshot'), metavar=_('FILENAME'),
+    dest='save_snapshot', action='store', default=None,
+    help=_('instead of rendering the documentation, save a snapshot of'
+           ' the analyzed application to FILENAME ("-" for STDOUT) that'
+           ' can later be rendered with "--snapshot"'))
+
+  cli.add_argument(
+    _('--snapshot'), metavar=_('FILENAME'),
+    dest='snapshot', action='store', default=None,
+    help=_('render the documentation from a snapshot previously saved'
+           ' with "--save-snapshot" ("-" for STDIN) instead of loading'
+           ' the application; the CONFIG and ROOT-URL arguments must'
+           ' then be omitted'))
+
   cli.add_argument(
     'config', metavar=_('CONFIG'),
+    nargs='?', default=None,
     help=_('PasteDeploy configuration file in "FILENAME#APPNAME" format,'
            ' where "#APPNAME" can be omitted and will default to "#main"'))
 
@@ -128,10 +177,34 @@ def main(argv=None):
     cli.error('the setting "%r" is invalid - it must be specified'
               ' exactly as "KEY=VALUE"' % (options.settings,))
 
+  if options.snapshot:
+    if options.config or options.save_snapshot:
+      cli.error('"--snapshot" cannot be combined with CONFIG or "--save-snapshot"')
+    with _open(options.snapshot, 'r', sys.stdin) as input:
+      return describe_from_snapshot(
+        input, sys.stdout, format=options.format, settings=options.settings)
+
+  if not options.config:
+    cli.error('the CONFIG argument is required unless "--snapshot" is used')
+
+  if options.save_snapshot:
+    with _open(options.save_snapshot, 'w', sys.stdout) as output:
+      return snapshot_from_config(
+        options.config, output, root=options.url, settings=options.settings)
+
   describe_from_config(
     options.config, sys.stdout, root=options.url, format=options.format,
     settings=options.settings)
 
+#------------------------------------------------------------------------------
+@contextlib.contextmanager
+def _open(filename, mode, stdio):
+  if filename == '-':
+    yield stdio
+    return
+  with open(filename, mode) as fp:
+    yield fp
+
 #------------------------------------------------------------------------------
 # end of $Id$
 #------------------------------------------------------------------------------
@@ -7,12 +7,23 @@
 #------------------------------------------------------------------------------
 
 import os, six
-import re
+import json
+import calendar
+import hashlib
 from six.moves import urllib
-from pyramid.httpexceptions import HTTPFound, HTTPNotFound
+from pyramid.httpexceptions import \
+  HTTPFound, HTTPAccepted, HTTPNotFound, HTTPNotModified, \
+  HTTPInternalServerError, HTTPServiceUnavailable
 from pyramid.settings import asbool, aslist
+from pyramid.request import Request
+from pyramid.response import FileIter
+from pyramid.threadlocal import manager
 from pyramid_controllers import Controller, index, ExposeDecorator, expose
+from pyramid_controllers.util import getVersion
 from .describer import Describer
+from .cache import RenderCache, SingleFlight, Limiter
+from .jobs import JobPool, ArtifactCache, JOB_DONE, JOB_FAILED
+from .access import getRequestGroups, REQUEST_GROUPS_KEY
 from .util import adict, pick, tobool
 
 #------------------------------------------------------------------------------
@@ -24,34 +35,44 @@ class DescribeController(Controller):
     if doc is not None:
       self.__doc__ = doc
     self.settings  = adict(settings or {})
-    # todo: note that below there are several mentions of
-    #       "settings.inspect" being improperly implemented... that is
-    #       correct. the idea of `settings.inspect` is that it defines
-    #       the path to begin traversal during reflection. instead, we
-    #       are using a `settings.include` workaround. the problem
-    #       with this workaround is performance...
     self.params    = adict(
-      # todo: revert this when settings.inspect is properly implemented:
-      #   view = view or self.settings.get('inspect') or '/',
       view = view or '/',
-      # todo: revert this when settings.inspect is properly implemented:
-      #   root = root or self.settings.get('inspect') or '/',
       root = root or '/',
     )
     # todo: enforce that `self.params.root` be a str...
-    # todo: enforce that `self.params.inspect` be a str...
-    # todo: remove this when settings.inspect is properly implemented:
-    if self.settings.get('inspect') and self.settings.inspect != '/':
-      path = self.settings.inspect
-      if 'include' in self.settings:
-        raise NotImplementedError()
-      else:
-        self.settings['include'] = []
-      if path.endswith('/'):
-        path = path[:-1]
-      self.settings['include'].append(
-        re.compile('^' + re.escape(path) + '(/.*)?$'))
+    # note: `settings.inspect` is implemented by the Describer, which
+    #       prunes the traversal to the inspected subtree.
     self.describer = Describer(settings=self.settings)
+    self.rcache    = RenderCache.fromSettings(self.settings)
+    if not self.describer.cache.enabled:
+      # without a cached analysis there is no version to detect when
+      # the rendered output is stale, so never cache it.
+      self.rcache.enabled = False
+    self.roptions  = self._getRequestOptionNames()
+    self.etag      = tobool(str(self.settings.get('cache.etag', 'true')))
+    self.confhash  = self._getConfigHash()
+    # setup the render coalescing and concurrency limiting
+    self.flight    = SingleFlight()
+    self.limiter   = Limiter(self.settings.get('render.concurrency', None))
+    self.limited   = set(aslist(
+      self.settings.get('render.concurrency.formats', 'pdf html')))
+    self.ltimeout  = self.settings.get('render.concurrency.timeout', None)
+    if self.ltimeout is not None:
+      self.ltimeout = float(self.ltimeout)
+    self.streamed  = set(aslist(self.settings.get('render.stream', '')))
+    # setup the background rendering
+    self.asyncs    = set(aslist(self.settings.get('render.async', '')))
+    self.jobs      = None
+    self.artifacts = None
+    self.jobname   = self.settings.get('render.async.status', 'job')
+    if self.asyncs:
+      self.jobs      = JobPool(
+        workers = self.settings.get('render.async.workers', 2),
+        queue   = self.settings.get('render.async.queue', 16))
+      self.artifacts = ArtifactCache(
+        directory = self.settings.get('render.async.directory', None),
+        maxcount  = self.settings.get('render.async.keep', None))
+      self.handle_job = expose(name=self.jobname)(self.handle_job)
     # setup which extensions to handle
     self.fullname  = self.settings.get('fullname', 'application')
     self.handle_full = expose(
@@ -88,7 +109,58 @@ class DescribeController(Controller):
 
   #----------------------------------------------------------------------------
   def describe(self, request, format):
-    context = adict(request=request)
+    context = adict(
+      request     = request,
+      get_options = self._makeOptionGetter(request),
+    )
+    if format is None:
+      format = context.get_options(None).get('format', None)
+    variant = self._getVariant(request, context, format)
+    record  = None
+    if self.settings.get('access.control'):
+      # the output depends on the caller's access groups, and must
+      # therefore not be shared by caches (e.g. proxies) across callers.
+      request.response.cache_control.private = True
+    if self.describer.cache.enabled:
+      record = self.describer.getAnalysis(
+        self.params.view, context, format=variant[0], root=self.params.root)
+      if self.etag:
+        request.response.etag = self._getETag(variant, record)
+        request.response.last_modified = int(record.created)
+        if self._isNotModified(request, record):
+          request.response.status_code = HTTPNotModified.code
+          request.response.headers.pop('Content-Type', None)
+          return request.response
+    if variant[0] in self.asyncs:
+      return self._describeAsync(request, context, variant)
+    if variant[0] in self.streamed \
+        and hasattr(self.describer, 'stream_' + variant[0]):
+      # note: streamed output is neither cached nor coalesced, since
+      #       that would require buffering it.
+      res = self.describer.describe(
+        self.params.view, context, format=variant[0], root=self.params.root,
+        stream=True)
+    else:
+      key = variant + (record.version if record else None,)
+      res = self.rcache.get(key)
+      if res is None:
+        res = self.flight.do(key, lambda: self._render(context, key))
+    if res.content_type:
+      request.response.content_type = res.content_type
+    if res.charset:
+      request.response.charset = res.charset
+    if res.app_iter is not None:
+      request.response.app_iter = res.app_iter
+      return request.response
+    return res.content
+
+  #----------------------------------------------------------------------------
+  def _makeOptionGetter(self, request):
+    '''
+    Returns a function that returns the rendering options that
+    `request` specifies for a given format (or ``None`` for all
+    formats) as allowed by the ``format.request`` settings.
+    '''
     def get_options(fmt):
       rset = None
       if fmt is not None:
@@ -102,16 +174,255 @@ class DescribeController(Controller):
           return request.params
       except ValueError: pass
       return pick(request.params, *aslist(rset))
-    if format is None:
-      format = get_options(None).get('format', None)
-    context.get_options = get_options
-    res = self.describer.describe(
+    return get_options
+
+  #----------------------------------------------------------------------------
+  def warmup(self, registry=None):
+    '''
+    Pre-populates the analysis cache and, optionally, the rendered
+    output cache as specified by the ``warmup`` setting. This is
+    typically called once at application startup (see
+    :func:`pyramid_describe.integration.includeme`).
+
+    The ``warmup`` setting can be a boolean, in which case only the
+    analysis is performed, or a list of variants to render. Each
+    variant is a format optionally followed by a "?" and a query
+    string, e.g. ``html?showInfo=false``. Each variant is rendered for
+    a blank request (attached to `registry`) with the specified
+    query string, so the access groups are whatever the
+    ``access.control`` callback returns for such a request.
+    '''
+    spec = self.settings.get('warmup', 'false')
+    try:
+      if not tobool(str(spec), force=False):
+        return
+      variants = []
+    except ValueError:
+      variants = aslist(spec)
+    if self.describer.cache.enabled:
+      self.describer.getAnalysis(self.params.view, root=self.params.root)
+    for variant in variants:
+      format, query = ( variant.split('?', 1) + [''] )[:2]
+      request = Request.blank('/?' + query)
+      if registry is not None:
+        request.registry = registry
+      self.describe(request, format or None)
+
+  #----------------------------------------------------------------------------
+  def _render(self, context, key):
+    format = key[0]
+    limit  = format in self.limited
+    if limit and not self.limiter.acquire(self.ltimeout):
+      raise HTTPServiceUnavailable(
+        'too many concurrent "%s" documentation renderings' % (format,))
+    try:
+      res = self.describer.describe(
+        self.params.view, context, format=format, root=self.params.root)
+    finally:
+      if limit:
+        self.limiter.release()
+    content = res.content or b''
+    if isinstance(content, six.text_type):
+      # note: the cache size is in bytes, not characters.
+      content = content.encode(res.charset or 'utf-8')
+    self.rcache.put(key, res, len(content))
+    return res
+
+  #----------------------------------------------------------------------------
+  def _describeAsync(self, request, context, variant):
+    '''
+    Returns the rendered artifact for `variant` if it is available,
+    and otherwise enqueues a background rendering job for it and
+    returns a "202 Accepted" response that references the job status
+    URL (see :meth:`handle_job`).
+    '''
+    format = variant[0]
+    record = self.describer.getAnalysis(
       self.params.view, context, format=format, root=self.params.root)
-    if res.content_type:
-      request.response.content_type = res.content_type
-    if res.charset:
-      request.response.charset = res.charset
-    return res.content
+    # note: the artifact key is the same as the ETag, i.e. it is
+    #       derived from the analysis hash and the variant.
+    key    = self._getETag(variant, record)
+    path   = self.artifacts.path(key, format)
+    if path is not None:
+      try:
+        artifact = open(path, 'rb')
+        size     = os.fstat(artifact.fileno()).st_size
+      except (IOError, OSError):
+        # note: the artifact was pruned (e.g. by a concurrent `put`)
+        #       after `path` found it, so it is simply re-rendered.
+        path = None
+    if path is not None:
+      ctdef = self.describer.content_types.get(format)
+      request.response.content_type   = ctdef[0]
+      if ctdef[1]:
+        request.response.charset      = ctdef[1]
+      request.response.content_length = size
+      request.response.app_iter       = FileIter(artifact)
+      return request.response
+    job = self.jobs.get(key)
+    if job is not None and job.status == JOB_FAILED:
+      self.jobs.discard(key)
+      raise HTTPInternalServerError(
+        'background "%s" documentation rendering failed: %s'
+        % (format, job.error))
+    if job is None or job.status == JOB_DONE:
+      # note: a "done" job whose artifact has since been evicted is
+      #       simply re-submitted.
+      self.jobs.discard(key)
+      detached = self._detachContext(request, variant)
+      job = self.jobs.submit(
+        key, lambda: self._renderArtifact(detached, format, key))
+    if job is None:
+      raise HTTPServiceUnavailable(
+        'too many pending "%s" documentation renderings' % (format,))
+    url = request.path_url
+    if not url.endswith('/') and not url.endswith('.' + format):
+      url += '/'
+    url = urllib.parse.urljoin(url, self.jobname) + '?id=' + key
+    request.response.status_code = HTTPAccepted.code
+    request.response.etag = None
+    request.response.last_modified = None
+    request.response.headers['Location'] = url
+    request.response.content_type = 'application/json'
+    request.response.text = six.text_type(json.dumps(
+      self._getJobStatus(job, url)))
+    return request.response
+
+  #----------------------------------------------------------------------------
+  def _detachContext(self, request, variant):
+    '''
+    Returns a rendering context for `variant` that does not reference
+    `request`, which is no longer active once the "202 Accepted"
+    response has been sent. Instead, it uses a synthetic request for
+    the same URL and registry, whose access groups are the ones that
+    were resolved for `request` (see :func:`getRequestGroups`).
+    '''
+    req = Request.blank(request.url)
+    req.registry = request.registry
+    req.environ[REQUEST_GROUPS_KEY] = variant[1]
+    return adict(request=req, get_options=self._makeOptionGetter(req))
+
+  #----------------------------------------------------------------------------
+  def _renderArtifact(self, context, format, key):
+    # note: this runs in a worker thread, i.e. outside of the request's
+    #       threadlocal scope, which templates and renderers rely on.
+    manager.push(dict(request=context.request, registry=context.request.registry))
+    try:
+      res = self.describer.describe(
+        self.params.view, context, format=format, root=self.params.root)
+    finally:
+      manager.pop()
+    content = res.content
+    if isinstance(content, six.text_type):
+      content = content.encode(res.charset or 'UTF-8')
+    self.artifacts.put(key, format, content)
+
+  #----------------------------------------------------------------------------
+  def _getJobStatus(self, job, url=None):
+    ret = dict(id=job.key, status=job.status)
+    if url:
+      ret['url'] = url
+    if job.error:
+      ret['error'] = job.error
+    return ret
+
+  #----------------------------------------------------------------------------
+  # NOTE: this method is OPTIONALLY exposed dynamically at run-time in __init__
+  def handle_job(self, request):
+    '''
+    Returns the status of the background rendering job identified by
+    the ``id`` request parameter as a JSON object with the attributes
+    `id`, `status` (one of "pending", "running", "done" or "failed")
+    and, for failed jobs, `error`.
+    '''
+    key = request.params.get('id')
+    job = self.jobs.get(key) if key else None
+    if job is None:
+      raise HTTPNotFound('no such documentation rendering job')
+    request.response.content_type = 'application/json'
+    request.response.text = six.text_type(json.dumps(self._getJobStatus(job)))
+    return request.response
+
+  #----------------------------------------------------------------------------
+  def _getRequestOptionNames(self):
+    '''
+    Returns the set of request parameters that can affect the output
+    for any format, or ``None`` if any request parameter can.
+    '''
+    ret = set()
+    for key, rset in self.settings.items():
+      if key != 'format.request' \
+          and not ( key.startswith('format.') and key.endswith('.request') ):
+        continue
+      try:
+        if tobool(str(rset), force=False):
+          return None
+        continue
+      except ValueError: pass
+      ret.update(aslist(rset))
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _getVariant(self, request, context, format):
+    '''
+    Returns a canonical tuple that identifies the output "variant"
+    that `request` will receive for a given analysis, i.e. the
+    combination of format, access groups, and request options.
+    '''
+    format = format or self.describer.defformat
+    groups = getRequestGroups(
+      self.settings.get('access.control'), request, context=context)
+    params = tuple(sorted(
+      (key, value) for key, value in request.params.items()
+      if self.roptions is None or key in self.roptions))
+    return (format, groups, params)
+
+  #----------------------------------------------------------------------------
+  def _getETag(self, variant, record):
+    '''
+    Returns a strong entity tag for the specified `variant` of the
+    analysis `record`. Note that the tag is derived from the content
+    of the analysis, not from the rendered output, so that it can be
+    determined without rendering.
+    '''
+    data = repr((
+      getVersion('pyramid_describe'), self.confhash, record.value.hash, variant))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+  #----------------------------------------------------------------------------
+  def _getConfigHash(self):
+    '''
+    Returns a hex digest of the configuration that affects the
+    rendered output, i.e. the settings and the resolved default and
+    override options of all formats, so that entity tags change when
+    only the configuration changes. Callables (e.g. the
+    ``access.control`` callback) are represented by their names so
+    that the digest is stable across processes.
+    '''
+    def _stable(value):
+      if six.callable(value):
+        return '%s:%s' % (
+          getattr(value, '__module__', None),
+          getattr(value, '__name__', value.__class__.__name__))
+      return repr(value)
+    def _table(table):
+      return {str(key): value for key, value in table.items()}
+    data = dict(
+      settings = _table(self.settings),
+      options  = _table(self.describer.options),
+      override = _table(self.describer.override),
+    )
+    return hashlib.sha1(
+      json.dumps(data, sort_keys=True, default=_stable).encode('utf-8')).hexdigest()
+
+  #----------------------------------------------------------------------------
+  def _isNotModified(self, request, record):
+    if request.if_none_match:
+      return request.response.etag in request.if_none_match
+    if request.if_modified_since:
+      since = calendar.timegm(request.if_modified_since.utctimetuple())
+      return int(record.created) <= since
+    return False
 
   #----------------------------------------------------------------------------
   @index(forceSlash=False)
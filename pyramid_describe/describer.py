@@ -7,16 +7,17 @@
 #------------------------------------------------------------------------------
 
 import re
+import copy
 import logging
 import inspect
 import binascii
+import hashlib
 import types
 import json
 
 import six
 import yaml
 from six.moves import urllib
-from docutils.core import publish_from_doctree
 from pyramid.interfaces import IMultiView
 from pyramid.settings import asbool, truthy
 from pyramid.renderers import render as pyramid_render
@@ -27,10 +28,15 @@ import asset
 from aadict import aadict
 import morph
 
-from .entry import Entry
+from .entry import Entry, CompactEntry
 from .scope import Scope
-from .typereg import TypeRegistry
+from .cache import AnalysisCache, sourceFiles
+from .snapshot import Snapshot
+from . import snapshot
+from .typereg import TypeRegistry, Type, TypeRef, _copyParsed
 from .util import adict, isstr, tolist, resolve, pick, reparse, runFilters, tag
+from .reparse import literalPrefix, subtreePrefix
+from .rst import publish_from_doctree
 from . import rst, doctree, render
 from .i18n import _
 
@@ -43,55 +49,169 @@ FORMATS   = ('html', 'txt', 'rst', 'json', 'wadl', 'yaml', 'xml')
 
 DEFAULT_METHODS_ORDER = ('post', 'get', 'put', 'delete')
 
+# the default line width of the YAML emitter
+YAML_WIDTH = 80
+
 try:
   import pdfkit
   FORMATS += ('pdf',)
 except ImportError:
   pdfkit = None
 
+#------------------------------------------------------------------------------
+class TreeNode(object):
+  '''
+  A lightweight view of an entry as a node in the tree generated by
+  :attr:`DescriberCatalog.tree_entries`. All entry attributes are
+  available directly on the node, and the following tree attributes
+  are added:
+
+  * `entry`:    the underlying entry.
+  * `parent`:   the parent TreeNode (or ``None``).
+  * `children`: the list of child TreeNode objects.
+  * `real`:     whether or not the entry is being described (as
+                opposed to being a branch that is only shown to
+                complete the tree).
+  * `last`:     whether or not this node is the last of its siblings.
+
+  Other attributes (e.g. the ``_dline`` attributes that custom
+  templates used to set on the entries) can be set on the node, in
+  which case they shadow the entry's.
+  '''
+
+  # note: `__dict__` is included so that, as with the entries that
+  #       `tree_entries` used to return, arbitrary attributes can be set.
+  __slots__ = ('entry', 'parent', 'children', 'real', 'last', '__dict__')
+
+  def __init__(self, entry, parent, real):
+    self.entry    = entry
+    self.parent   = parent
+    self.children = []
+    self.real     = real
+    self.last     = False
+    if parent is not None:
+      parent.children.append(self)
+
+  def __getattr__(self, name):
+    return getattr(self.entry, name)
+
+  @property
+  def parents(self):
+    node = self.parent
+    while node is not None:
+      yield node
+      node = node.parent
+
+  @property
+  def rparents(self):
+    return reversed(list(self.parents))
+
+  # backward-compatible (and writable) aliases of the attributes that
+  # `tree_entries` used to set on the entries themselves
+  def _alias(name):
+    return property(
+      lambda self: getattr(self, name),
+      lambda self, value: setattr(self, name, value))
+  _dreal      = _alias('real')
+  _dlast      = _alias('last')
+  _dchildren  = _alias('children')
+  del _alias
+
 #------------------------------------------------------------------------------
 class DescriberCatalog(adict):
+  def typeNames(self):
+    '''
+    Returns the sorted names of the types that should be rendered,
+    i.e. only those in `typegraph` (the types that are reachable from
+    the endpoints, see :meth:`TypeRegistry.reachable`) unless the
+    ``type.reachable`` setting is falsy.
+    '''
+    if self.get('typegraph') is None or not self.describer.reachableTypes:
+      return self.typereg.typeNames()
+    return self.typegraph.names
+
+  #----------------------------------------------------------------------------
   @property
   def tree_entries(self):
-    # todo: make this a bit more "rigorous"...
-    '''
-    Generates a "complete" set of entries that includes all branch
-    entries. These branch entries, however, should not have their
-    documentation shown. Also sorts the entries by name unless RESTful
-    - this is so that RESTful methods show up first (since they
-    technically don't exist in the URL path). The following Entry
-    attributes are added:
-      * _dreal
-      * _dlast
-      * _dchildren
-    '''
-    fullset = []
+    '''
+    Generates a "complete" list of :class:`TreeNode` objects for the
+    endpoints that includes all branch entries. These branch entries,
+    however, should not have their documentation shown (i.e. their
+    `real` attribute is false). RESTful methods are listed directly
+    after their controller (since they technically don't exist in the
+    URL path). The entries themselves are not modified.
+    '''
+    nodes = dict()
+    ret   = []
+    def _add(entry, parent, real):
+      node = TreeNode(entry, parent, real)
+      nodes[id(entry)] = node
+      ret.append(node)
+      return node
     for entry in self.endpoints:
-      entry._dreal = True
-      if entry.parent and entry.parent not in fullset:
-        toadd = []
-        for parent in entry.parents:
-          if parent not in fullset:
-            toadd.append(parent)
-            continue
-          break
-        fullset.extend(reversed(toadd))
-      fullset.append(entry)
+      node = nodes.get(id(entry))
+      if node is not None:
+        node.real = True
+      else:
+        parent = None
+        if entry.parent:
+          toadd = []
+          for ent in entry.parents:
+            parent = nodes.get(id(ent))
+            if parent is not None:
+              break
+            toadd.append(ent)
+          for ent in reversed(toadd):
+            parent = _add(ent, parent, False)
+        node = _add(entry, parent, True)
       if entry.isRest and entry.isController and entry.methods:
         for method in entry.methods:
-          method._dreal = True
-          fullset.append(method)
-    entries = fullset
-    # decorate entries with '_dlast' attribute...
-    for entry in entries:
-      if entry.parent:
-        if entry.parent._dchildren is None:
-          entry.parent._dchildren = []
-        entry.parent._dchildren.append(entry)
-    for entry in entries:
-      if entry._dchildren:
-        entry._dchildren[-1]._dlast = True
-    return entries
+          _add(method, node, True)
+    for node in ret:
+      if node.children:
+        node.children[-1].last = True
+    return ret
+
+#------------------------------------------------------------------------------
+class _YamlNoAliases(object):
+  # the type structures are shared (see `Describer.structure_render`),
+  # which must not be rendered as YAML anchors & aliases
+  def ignore_aliases(self, data):
+    return True
+
+# note: these are based on the full (i.e. not the "safe") dumpers,
+#       like the default of `yaml.dump`, so that the output (e.g. the
+#       ``!!python/unicode`` tags) is unchanged and any values that
+#       custom parsers add to the entries can still be represented.
+class PyYamlDumper(_YamlNoAliases, yaml.Dumper):
+  'The pure-python YAML dumper used for the "yaml" format.'
+
+# the LibYAML-based dumper is much faster, but is only available if
+# PyYAML was built against LibYAML
+CYamlDumper = None
+if getattr(yaml, '__with_libyaml__', False):
+  class CYamlDumper(_YamlNoAliases, yaml.CDumper):
+    'The LibYAML-based YAML dumper used for the "yaml" format.'
+
+#------------------------------------------------------------------------------
+def chunked(chunks, chunkSize):
+  '''
+  Re-groups the `chunks` (a sequence of strings) into UTF-8 encoded
+  chunks of at least `chunkSize` bytes (except for the last one).
+  '''
+  buf  = []
+  size = 0
+  for chunk in chunks:
+    if isinstance(chunk, six.text_type):
+      chunk = chunk.encode('utf-8')
+    buf.append(chunk)
+    size += len(chunk)
+    if size >= chunkSize:
+      yield b''.join(buf)
+      buf  = []
+      size = 0
+  if buf:
+    yield b''.join(buf)
 
 #------------------------------------------------------------------------------
 def extract(settings, prefix):
@@ -111,6 +231,25 @@ def tocallables(spec, attr):
     e if six.callable(e) else getattr(e, attr)
     for e in ret]
 
+#------------------------------------------------------------------------------
+def _allEntries(endpoints):
+  '''
+  Generates all entries reachable from `endpoints`, i.e. including
+  their parents and methods, exactly once.
+  '''
+  seen = set()
+  stack = list(endpoints)
+  while stack:
+    entry = stack.pop()
+    if id(entry) in seen:
+      continue
+    seen.add(id(entry))
+    yield entry
+    if entry.parent is not None:
+      stack.append(entry.parent)
+    if entry.methods:
+      stack.extend(entry.methods)
+
 #------------------------------------------------------------------------------
 def methOrderKey(methods):
   methods = [m.lower() for m in methods]
@@ -233,6 +372,25 @@ class Describer(object):
 '''),
   )
 
+  # the YAML dumper class used by the "yaml" format
+  yamlDumper = CYamlDumper or PyYamlDumper
+
+  # the options that affect the endpoint & type analysis, and therefore
+  # must be part of the analysis cache key
+  analysis_options = (
+    'showUnderscore',
+    'showBranches',
+    'pruneIndex',
+    'showRest',
+    'showDynamic',
+    'maxdepth',
+    'restVerbs',
+    'stubFormat',
+    'dynamicFormat',
+    'restFormat',
+    'commentToken',
+  )
+
   # TODO: support per-format system defaults...
   # todo: then, change cssPath to be html-only.
 
@@ -243,6 +401,18 @@ class Describer(object):
                       for expr in tolist(self.settings.include or '')]
     self.exclude   = [reparse(expr) if isstr(expr) else expr
                       for expr in tolist(self.settings.exclude or '')]
+    self.entryClass = CompactEntry \
+      if asbool(self.settings.get('entry.compact', False)) else Entry
+    self.internTypes = asbool(self.settings.get('type.intern', False))
+    self.sharedEntries = asbool(self.settings.get('entry.shared', True))
+    self.reachableTypes = asbool(self.settings.get('type.reachable', True))
+    self.inspect   = None
+    if self.settings.inspect and self.settings.inspect != '/':
+      path = self.settings.inspect
+      if path.endswith('/'):
+        path = path[:-1]
+      self.inspect = re.compile('^' + re.escape(path) + '(/.*)?$')
+    self._setupPruning()
     self.formats   = tolist(self.settings.formats or '') or FORMATS
     self.defformat = self.settings.get('format.default', self.formats[0])
     # load the renderer, default and override options
@@ -292,9 +462,55 @@ class Describer(object):
     tropts['commentToken'] = self.settings.get(
       'commentToken', dict(self.str_options).get('commentToken'))
     self.typereg = TypeRegistry(tropts)
+    self.cache   = AnalysisCache.fromSettings(
+      self.settings, sources=self._getCatalogSources)
+
+  #----------------------------------------------------------------------------
+  def _setupPruning(self):
+    # the traversal pruning is based on the literal prefixes of the
+    # `inspect` and `include` expressions (all included paths must
+    # start with one of them) and on `exclude` expressions that exclude
+    # an entire subtree, i.e. are in the format "^PATH(/.*)?$".
+    self._pruneRequire = []
+    if self.inspect:
+      self._pruneRequire.append([literalPrefix(self.inspect)])
+    if self.include:
+      prefixes = [literalPrefix(expr) for expr in self.include]
+      if None not in prefixes:
+        self._pruneRequire.append(prefixes)
+    self._pruneExclude = [
+      prefix + '/' for prefix in
+      [subtreePrefix(expr) for expr in self.exclude]
+      if prefix]
+
+  #----------------------------------------------------------------------------
+  def isPrunable(self, path):
+    '''
+    Returns truthy if no entry at or below the URL `path` can possibly
+    pass the `inspect`, `include`, and `exclude` filters, in which case
+    the subtree does not need to be traversed at all.
+    '''
+    for prefixes in self._pruneRequire:
+      for prefix in prefixes:
+        if path.startswith(prefix) or prefix.startswith(path):
+          break
+      else:
+        return True
+    for prefix in self._pruneExclude:
+      if path.startswith(prefix):
+        return True
+    return False
 
   #----------------------------------------------------------------------------
-  def describe(self, view, context=None, format=None, root=None):
+  def describe(self, view, context=None, format=None, root=None, stream=False):
+    '''
+    Renders the documentation for `view` in the specified `format`
+    and returns an object with the attributes `content`,
+    `content_type` and `charset`. If `stream` is truthy and the format
+    supports streaming (i.e. there is a ``stream_{FORMAT}`` method),
+    then `content` is ``None`` and the object instead has an
+    `app_iter` attribute, which is an iterable of encoded chunks.
+    '''
     context = adict(context or {})
     if context.request is None:
       # this is really not the "right thing", but it makes a lot of other
@@ -305,6 +521,11 @@ class Describer(object):
     options = self._getOptions(context, [format]).update(view=view, root=root)
     catalog = self._makeDescriberCatalog(context, view, root, options, format)
     ctdef   = self.content_types.get(format)
+    streamer = getattr(self, 'stream_' + format, None) if stream else None
+    if streamer is not None:
+      return aadict(
+        content=None, app_iter=streamer(catalog),
+        content_type=ctdef[0], charset=ctdef[1])
     return aadict(
       content=self.render(catalog), content_type=ctdef[0], charset=ctdef[1])
 
@@ -325,25 +546,44 @@ class Describer(object):
       options   = options,
       legend    = legend,
     )
-    catalog.typereg   = catalog.options.typereg #.clone()
+    analysis          = self.getCachedCatalog(options)
+    catalog.typereg   = options.typereg = analysis.typereg
     # todo: further decorate `context`...
     context = Scope(
       catalog = catalog,
       options = options,
       request = options.context.request,
     )
-    # TODO: clone endpoints once caching is enabled
     catalog.endpoints = sorted(
-      self.getFilteredEndpoints(options, context), key=lambda e: e.path)
+      self.getFilteredEndpoints(options, context, analysis.endpoints),
+      key=lambda e: e.path)
     # TODO: deprecate `catalog.types` (since `catalog.typereg` will be cloned)
-    catalog.types     = filter(None, [
-      options.tfilters.filter(typ, context=context)
-      for typ in catalog.typereg.types()])
+    # note: using `filterTypes` avoids copying the (shared) types that
+    #       the filters do not modify (see TypeRegistry.clone).
+    catalog.types     = catalog.typereg.filterTypes(
+      lambda typ: options.tfilters.filter(typ, context=context))
     # TODO: re-bind `catalog.endpoints` type references...
     # TODO: re-bind inter-type references...
     catalog = options.cfilters.filter(catalog, context=context)
+    if catalog is not None:
+      catalog.typegraph = self._getTypeGraph(catalog)
+      if self.reachableTypes:
+        catalog.types = [
+          typ for typ in catalog.types if typ.name in catalog.typegraph]
     return catalog
 
+  #----------------------------------------------------------------------------
+  def _getTypeGraph(self, catalog):
+    # note: only the filtered endpoints and methods (and the filtered
+    #       types) are considered, so that types that are only
+    #       referenced by hidden endpoints or types are not reachable.
+    def _roots():
+      for entry in catalog.endpoints:
+        for ent in [entry] + list(entry.methods or []):
+          for channel in ('params', 'returns', 'raises'):
+            yield getattr(ent, channel, None)
+    return catalog.typereg.reachable(_roots(), types=catalog.types)
+
   #----------------------------------------------------------------------------
   def analyze(self, view):
     # TODO: this is a hack. it was created for unit testing the
@@ -423,8 +663,10 @@ class Describer(object):
     return ret
 
   #----------------------------------------------------------------------------
-  def getFilteredEndpoints(self, options, context):
-    for entry in self.getCachedEndpoints(options):
+  def getFilteredEndpoints(self, options, context, endpoints=None):
+    if endpoints is None:
+      endpoints = self.getCachedEndpoints(options)
+    for entry in endpoints:
       if entry.methods:
         entry.methods = filter(None, [
           options.efilters.filter(e, context)
@@ -435,10 +677,102 @@ class Describer(object):
 
   #----------------------------------------------------------------------------
   def getCachedEndpoints(self, options):
-    # TODO: implement caching...
-    #       *** IMPORTANT *** when caching is implemented, make sure that
-    #       the typereg and the endpoints are cloned pre filtering!...
+    '''
+    Returns a private copy of the analyzed endpoints for
+    `options.view`, and sets `options.typereg` to the matching private
+    copy of the type registry. See :meth:`getCachedCatalog` for
+    details.
+    '''
+    catalog = self.getCachedCatalog(options)
+    options.typereg = catalog.typereg
+    return catalog.endpoints
+
+  #----------------------------------------------------------------------------
+  def getCachedCatalog(self, options):
+    '''
+    Returns a `DescriberCatalog` with the `endpoints` and `typereg`
+    attributes set to the result of analyzing `options.view`. The
+    analysis is cached (see the ``cache.analysis`` settings) and the
+    returned catalog is always a clone of the cached version, so the
+    caller is free to filter and otherwise modify it.
+    '''
+    master = self.cache.get(
+      self._getCacheKey(options), lambda: self._analyze(options))
+    if not self.cache.enabled:
+      return master
+    return self._cloneCatalog(master)
+
+  #----------------------------------------------------------------------------
+  def getAnalysis(self, view, context=None, format=None, root=None):
+    '''
+    Returns the analysis cache record (see
+    :meth:`pyramid_describe.cache.AnalysisCache.getRecord`) for the
+    specified parameters, which are the same as for :meth:`describe`.
+    The record's `value` is the cached master catalog, which must not
+    be modified. This is primarily intended to allow callers to detect
+    when the analysis has been regenerated (via the record's `version`
+    attribute) without needing to filter or render the catalog.
+    '''
+    context = adict(context or {})
+    if context.request is None:
+      context.request = adict()
+    options = self._getOptions(context, [format or self.defformat]).update(
+      view=view, root=root)
+    return self.cache.getRecord(
+      self._getCacheKey(options), lambda: self._analyze(options))
+
+  #----------------------------------------------------------------------------
+  def saveSnapshot(self, view, output, context=None, root=None):
+    '''
+    Analyzes `view` (or uses the cached analysis) and writes a JSON
+    snapshot of it to the file-like `output`. The snapshot can later
+    be loaded with :meth:`loadSnapshot` and rendered without the
+    application. See :mod:`pyramid_describe.snapshot` for details.
+    '''
+    record = self.getAnalysis(view, context=context, root=root)
+    snapshot.save(record.value, output, root=root)
+
+  #----------------------------------------------------------------------------
+  def loadSnapshot(self, input):
+    '''
+    Loads a JSON snapshot (as written by :meth:`saveSnapshot`) from
+    the file-like `input` and returns a
+    :class:`pyramid_describe.snapshot.Snapshot` object, which can be
+    passed as the `view` parameter to :meth:`describe`, e.g.:
+
+    .. code:: python
+
+      snap = describer.loadSnapshot(open('app-snapshot.json'))
+      describer.describe(snap, format='html', root=snap.root)
+    '''
+    return snapshot.read(input, self.typereg, entryClass=self.entryClass)
+
+  #----------------------------------------------------------------------------
+  def clearCache(self):
+    '''
+    Discards all cached analysis results.
+    '''
+    self.cache.clear()
+
+  #----------------------------------------------------------------------------
+  def _getCacheKey(self, options):
+    # note: when `view` is not a string, the key uses its `id`, which is
+    # safe because the cached catalog holds a reference to the view.
+    view = options.view if isstr(options.view) else id(options.view)
+    return (view, options.root) + tuple(
+      tuple(sorted(options[name]))
+      if isinstance(options[name], (set, list, tuple)) else options[name]
+      for name in self.analysis_options)
+
+  #----------------------------------------------------------------------------
+  def _analyze(self, options):
     # TODO: rearchitect this so that it is shared w _makeDescriberCatalog
+    view       = options.view
+    if isinstance(view, Snapshot):
+      ret = self._cloneCatalog(view.catalog)
+      ret.view = view
+      return ret
+    options    = adict(options).update(typereg=self.typereg.clone())
     context    = Scope(options=options)
     catalog    = DescriberCatalog(
       options    = options,
@@ -451,7 +785,75 @@ class Describer(object):
     #       fix!
     for typ in options.typereg.types():
       options.tparsers.filter(typ, context=context)
-    return context.catalog.endpoints
+    if self.internTypes:
+      self._internTypes(options.typereg, context.catalog.endpoints)
+    # note: `options` is intentionally not retained since it references
+    # the (request-specific) context.
+    ret = DescriberCatalog(
+      view       = view,
+      endpoints  = context.catalog.endpoints,
+      typereg    = options.typereg,
+    )
+    ret.hash = self._getCatalogHash(ret)
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _internTypes(self, typereg, endpoints):
+    # note: this must be done after all parsers have run, since they
+    #       may modify the entry types in-place (the filters, in
+    #       contrast, return modified copies).
+    for entry in _allEntries(endpoints):
+      for channel in ('params', 'returns', 'raises'):
+        typ = getattr(entry, channel, None)
+        if typ:
+          setattr(entry, channel, typereg.intern(typ))
+
+  #----------------------------------------------------------------------------
+  def _cloneCatalog(self, catalog):
+    # the entries and types are deep-copied in a single pass so that
+    # references between them are preserved, but the views themselves
+    # (i.e. the controllers and their methods) are shared.
+    memo = dict()
+    for entry in _allEntries(catalog.endpoints):
+      memo[id(entry.view)] = entry.view
+    # note: the endpoints must be copied first, so that the (otherwise
+    #       shared) types that they reference are adopted by the clone
+    #       of the type registry (see TypeRegistry.clone).
+    endpoints = copy.deepcopy(catalog.endpoints, memo)
+    return DescriberCatalog(
+      view       = catalog.view,
+      hash       = catalog.hash,
+      typereg    = catalog.typereg.clone(memo=memo),
+      endpoints  = endpoints,
+    )
+
+  #----------------------------------------------------------------------------
+  def _getCatalogHash(self, catalog):
+    '''
+    Returns a hex digest of the content of the (unfiltered) `catalog`,
+    i.e. of its entries and types. The digest is stable across
+    processes, and therefore excludes the views themselves.
+    '''
+    memo = {}
+    def _struct(value):
+      if isinstance(value, (Type, TypeRef)):
+        return value.tostruct(memo=memo)
+      return '<' + value.__class__.__name__ + '>'
+    data = dict(
+      endpoints = [
+        {key: value for key, value in entry.items()
+         if key not in ('parent', 'methods', 'view') and not key.startswith('_')}
+        for entry in sorted(_allEntries(catalog.endpoints), key=lambda e: e.path)],
+      types     = [typ.tostruct(memo=memo) for typ in catalog.typereg.types()],
+    )
+    return hashlib.sha1(
+      json.dumps(data, sort_keys=True, default=_struct)).hexdigest()
+
+  #----------------------------------------------------------------------------
+  def _getCatalogSources(self, catalog):
+    return sourceFiles(
+      entry.view for entry in _allEntries(catalog.endpoints)
+      if entry.view is not None)
 
   #----------------------------------------------------------------------------
   def getEndpoints(self, options, context):
@@ -480,78 +882,179 @@ class Describer(object):
         log.exception('invalid target for pyramid-describe: %r', options.view)
         raise TypeError(_('the URL "{}" does not point to a pyramid_controllers.Controller', options.root))
     # todo: further decorate `context`...
+    parsed = dict()
     for entry in self._walkEntries(options, None):
-      if entry.methods:
-        entry.methods = filter(None, [
-          options.eparsers.filter(e, context)
-          for e in entry.methods])
-        entry.methods = sorted(entry.methods, key=self.methOrderKey)
-      entry = options.eparsers.filter(entry, context)
+      key = options._origins.get(id(entry), (None, None))
+      key = key[1] if key[0] is entry else None
+      if key is not None and key in parsed:
+        # the same view at another mount point (see `_listAllEntries`)
+        entry = self._adoptParsed(options, entry, parsed[key])
+      else:
+        if entry.methods:
+          entry.methods = filter(None, [
+            options.eparsers.filter(e, context)
+            for e in entry.methods])
+          entry.methods = sorted(entry.methods, key=self.methOrderKey)
+        entry = options.eparsers.filter(entry, context)
+        if key is not None:
+          parsed[key] = entry
       if entry:
         yield entry
+    options._templates = None
+    options._origins   = None
 
   #----------------------------------------------------------------------------
-  def _walkEntries(self, options, entry):
-    # todo: what about detecting circular references?...
+  def _walkEntries(self, options, entry, ancestors=frozenset()):
+    # `ancestors` is the set of controller instances (by id) that are
+    # mounted above the children of `entry`: a child controller that
+    # is in that set is a circular reference, which is reported and
+    # described, but not descended into.
+    if entry is None:
+      options._templates = dict() if self.sharedEntries else None
+      options._origins   = dict()
+    elif entry.isController:
+      ancestors = ancestors | frozenset([id(entry.view)])
     for ent in self._listAllEntries(options, entry):
+      if ent.isController and id(ent.view) in ancestors:
+        log.warning(
+          'circular controller reference at "%s" (not descending)', ent.path)
+        ent.isCycle = True
       fent = self.filterEntry(options, ent)
       if fent and ( ent.isEndpoint or options.showBranches ):
         yield ent
-      # todo: this maxdepth application is inefficient...
-      if options.maxdepth is not None \
-          and len(list(ent.parents)) >= options.maxdepth:
+      if ent.isCycle:
         continue
-      for subent in self._walkEntries(options, ent):
+      if options.maxdepth is not None:
+        depth = ent.depth
+        if depth is None:
+          depth = ent.setAncestry().depth
+        if depth >= options.maxdepth:
+          continue
+      for subent in self._walkEntries(options, ent, ancestors):
         fsubent = self.filterEntry(options, subent)
         if fsubent and ( subent.isEndpoint or options.showBranches ):
           yield subent
 
   #----------------------------------------------------------------------------
-  def _listAllEntries(self, options, entry):
+  def _listAllEntries(self, options, entry, methodsOnly=False):
     if entry is None:
       yield self.controller2entry(options, '', options.view, None)
       return
     if not entry.isController:
       return
-    for name, attr in options.dispatcher.getEntries(entry.view, includeIndirect=True):
+    isRest = isinstance(entry.view, RestController)
+    templates = options._templates
+    prefix = entry.path if entry.path.endswith('/') else entry.path + '/'
+    if templates is None:
+      children = options.dispatcher.getEntries(entry.view, includeIndirect=True)
+    else:
+      children = templates.get(('children', id(entry.view)))
+      if children is None:
+        children = templates[('children', id(entry.view))] = list(
+          options.dispatcher.getEntries(entry.view, includeIndirect=True))
+    for name, attr in children:
       if not options.showUnderscore and name.startswith('_'):
         continue
       if options.pruneIndex and name == Dispatcher.NAME_INDEX:
         continue
-      # todo: DRY! see dispatcher for sharing...
-      if isinstance(attr, Controller):
-        subent = self.controller2entry(options, name, attr, entry)
-        if subent:
-          yield subent
+      isMethod = isRest and name in options.restVerbs \
+        and not isinstance(attr, Controller) \
+        and type(attr) not in (types.TypeType, types.ClassType)
+      if methodsOnly and not isMethod:
         continue
-      # todo: DRY! see dispatcher for sharing...
-      if type(attr) in (types.TypeType, types.ClassType):
-        subent = self.class2entry(options, name, attr, entry)
-        if subent:
-          yield subent
+      if not isMethod and self.isPrunable(prefix + name):
+        continue
+      # controllers that are mounted at multiple paths are only
+      # converted & decorated once, regardless of their parents (hence
+      # the key of a controller is its own identity, whereas other
+      # attributes are keyed by their owner): the other mount points
+      # get re-based copies of the initial (un-parsed) entry, and
+      # adopt its parse results (see `getEndpoints`).
+      owner = attr if isinstance(attr, Controller) else entry.view
+      key = ( id(owner), name, bool(options.showRest) )
+      template = templates.get(key) if templates is not None else None
+      if template is not None and template.view == attr:
+        subent = self._rebaseEntry(options, template, entry)
+        options._origins[id(subent)] = (subent, key)
+        yield subent
         continue
-      subent = self.method2entry(options, name, attr, entry)
+      subent = self._makeEntry(options, name, attr, entry)
       if subent:
+        if templates is not None:
+          templates[key] = self._rebaseEntry(options, subent, None)
+          options._origins[id(subent)] = (subent, key)
         yield subent
 
+  #----------------------------------------------------------------------------
+  def _makeEntry(self, options, name, attr, parent):
+    # todo: DRY! see dispatcher for sharing...
+    if isinstance(attr, Controller):
+      return self.controller2entry(options, name, attr, parent)
+    # todo: DRY! see dispatcher for sharing...
+    if type(attr) in (types.TypeType, types.ClassType):
+      return self.class2entry(options, name, attr, parent)
+    return self.method2entry(options, name, attr, parent)
+
+  #----------------------------------------------------------------------------
+  def _rebaseEntry(self, options, entry, parent):
+    '''
+    Returns a copy of `entry` (and of its methods) that is attached
+    to `parent`, with the location-dependent attributes recomputed.
+    If `parent` is ``None``, the copy is a detached "template".
+    '''
+    ret = entry.__class__(entry)
+    ret.parent = parent
+    if parent is not None:
+      self._placeEntry(options, ret)
+    if entry.methods is not None:
+      ret.methods = [self._rebaseEntry(options, meth, ret)
+                     for meth in entry.methods]
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _adoptParsed(self, options, entry, parsed):
+    '''
+    Returns `entry` (an un-parsed entry) updated with the attributes of
+    `parsed`, the parse result of the same view at another mount point
+    (or ``None`` if the parsers removed it). The location-dependent
+    attributes of `entry` are retained, and the types are copied so
+    that the mount points do not share them.
+    '''
+    if parsed is None:
+      return None
+    keep = ('parent', 'methods', 'path', 'dpath', 'id', 'depth', 'isCycle')
+    for key in list(entry.keys()):
+      if key not in keep and key not in parsed:
+        entry.pop(key, None)
+    for key, value in list(parsed.items()):
+      if key not in keep:
+        entry[key] = _copyParsed(value)
+    if parsed.methods is not None:
+      entry.methods = [
+        self._adoptParsed(options, self._rebaseEntry(options, meth, entry), meth)
+        for meth in parsed.methods]
+    return entry
+
   #----------------------------------------------------------------------------
   def controller2entry(self, options, name, controller, parent):
     'Creates a describer `Entry` object for the specified Controller instance.'
-    ret = Entry(name         = name,
-                parent       = parent,
-                view         = controller,
-                isController = True,
-                isEndpoint   = True,
-                isStub       = not controller._pyramid_controllers.expose,
-                isRest       = isinstance(controller, RestController),
-                )
+    ret = self.entryClass(
+      name         = name,
+      parent       = parent,
+      view         = controller,
+      isController = True,
+      isEndpoint   = True,
+      isStub       = not controller._pyramid_controllers.expose,
+      isRest       = isinstance(controller, RestController),
+    )
     ret = self.decorateEntry(options, ret)
-    for entry in self._listAllEntries(adict(options).update(showRest=True), ret):
-      if ret.isRest and entry.isMethod:
-        if ret.methods is None:
-          ret.methods = []
-        ret.methods.append(entry)
-        continue
+    if ret.isRest:
+      for entry in self._listAllEntries(
+          adict(options).update(showRest=True), ret, methodsOnly=True):
+        if entry.isMethod:
+          if ret.methods is None:
+            ret.methods = []
+          ret.methods.append(entry)
     if ret.isRest:
       ret.isEndpoint = True
     else:
@@ -573,7 +1076,7 @@ class Describer(object):
     'Converts an uninstantiated class to an entry.'
     if not options.showDynamic:
       return None
-    ret = Entry(
+    ret = self.entryClass(
       name         = name,
       parent       = parent,
       view         = klass,
@@ -586,7 +1089,7 @@ class Describer(object):
   #----------------------------------------------------------------------------
   def method2entry(self, options, name, method, parent):
     'Converts an object method to an entry.'
-    ret = Entry(
+    ret = self.entryClass(
       name         = name,
       parent       = parent,
       view         = method,
@@ -611,6 +1114,8 @@ class Describer(object):
     (potentially modified) or ``None``. In the latter case, the entry
     will be removed from the output.
     '''
+    if self.inspect and not self.inspect.match(entry.path):
+      return None
     if self.include:
       match = False
       for include in self.include:
@@ -646,6 +1151,12 @@ class Describer(object):
     See :class:`pyramid_describer.entry.Entry` for details on built-in
     provided attributes, and the list of attributes that are recognized
     but cannot be provided by the default implementation.
+
+    Note that when the same controller instance is mounted at multiple
+    paths, its sub-entries are only decorated (and parsed) at the first
+    mount point: the other mount points receive copies with only the
+    location-dependent attributes (`path`, `dpath`, `id`, etc)
+    recomputed, unless the ``entry.shared`` setting is disabled.
     '''
 
     # determine the implementation path & type to this entry
@@ -679,6 +1190,20 @@ class Describer(object):
     else:
       entry.dname = entry.name
 
+    self._placeEntry(options, entry)
+
+    # get the docstring
+    entry.doc = inspect.getdoc(entry.view)
+    if options.pruneIndex and entry.isController:
+      meta = options.dispatcher.getMeta(entry.view)
+      for handler in meta.index or []:
+        entry.doc = inspect.getdoc(handler) or entry.doc
+
+    return entry
+
+  #----------------------------------------------------------------------------
+  def _placeEntry(self, options, entry):
+    entry.setAncestry()
     # determine the full path (plain and "decorated") to this entry
     if not entry.parent:
       entry.path  = options.root
@@ -705,23 +1230,14 @@ class Describer(object):
     else:
       entry.id = 'endpoint-{}'.format(tag(entry.path))
 
-    # get the docstring
-    entry.doc = inspect.getdoc(entry.view)
-    if options.pruneIndex and entry.isController:
-      meta = options.dispatcher.getMeta(entry.view)
-      for handler in meta.index or []:
-        entry.doc = inspect.getdoc(handler) or entry.doc
-
-    return entry
-
   #----------------------------------------------------------------------------
-  def structure_entry(self, options, entry, dentry, dict=dict):
+  def structure_entry(self, options, entry, dentry, dict=dict, memo=None):
     if entry.params is not None:
-      dentry['params'] = entry.params.tostruct(ref=True)
+      dentry['params'] = entry.params.tostruct(ref=True, memo=memo)
     if entry.returns is not None:
-      dentry['returns'] = entry.returns.tostruct(ref=True)
+      dentry['returns'] = entry.returns.tostruct(ref=True, memo=memo)
     if entry.raises is not None:
-      dentry['raises'] = entry.raises.tostruct(ref=True)
+      dentry['raises'] = entry.raises.tostruct(ref=True, memo=memo)
     if options.showExtra and entry.extra:
       try:
         for k, v in entry.extra.items():
@@ -732,50 +1248,64 @@ class Describer(object):
       except AttributeError: pass
     return dentry
 
+  #----------------------------------------------------------------------------
+  def structure_endpoint(self, catalog, entry, dict=dict, includeEntry=False,
+                         memo=None):
+    endpoint = dict(path=entry.path)
+    if catalog.options.showIds:
+      endpoint['id'] = entry.id
+    if catalog.options.showName:
+      endpoint['name'] = entry.name
+    if catalog.options.showDecorated:
+      if catalog.options.showName:
+        endpoint['decoratedName'] = entry.dname
+      endpoint['decoratedPath'] = entry.dpath
+    if includeEntry:
+      endpoint['entry'] = entry
+    if catalog.options.showInfo and entry.doc:
+      endpoint['doc'] = entry.doc
+    if catalog.options.showMethods and entry.methods:
+      endpoint['methods'] = []
+      for meth in entry.methods:
+        dmeth = dict(name=meth.method)
+        if catalog.options.showIds and meth.id:
+          dmeth['id'] = meth.id
+        if meth.doc:
+          dmeth['doc'] = meth.doc
+        if includeEntry:
+          dmeth['entry'] = meth
+        endpoint['methods'].append(self.structure_entry(
+          catalog.options, meth, dmeth, dict=dict, memo=memo))
+    if catalog.options.showExtra and entry.extra:
+      try:
+        for k, v in entry.extra.items():
+          if v is None:
+            endpoint.pop(k, None)
+          else:
+            endpoint[k] = v
+      except AttributeError: pass
+    return endpoint
+
   #----------------------------------------------------------------------------
   def structure_render(self, catalog, dict=dict, includeEntry=False):
+    '''
+    Returns the structural representation of `catalog` used by the
+    JSON, YAML, XML and WADL renderers. Note that the type structures
+    are generated once per call and shared, i.e. a type that is
+    referenced by multiple endpoints has a single representation.
+    '''
     root = dict(application=dict(url=catalog.options.context.request.host_url))
     app = root['application']
+    memo = {}
     if catalog.endpoints:
-      app['endpoints'] = []
-    for entry in catalog.endpoints:
-      endpoint = dict(path=entry.path)
-      if catalog.options.showIds:
-        endpoint['id'] = entry.id
-      if catalog.options.showName:
-        endpoint['name'] = entry.name
-      if catalog.options.showDecorated:
-        if catalog.options.showName:
-          endpoint['decoratedName'] = entry.dname
-        endpoint['decoratedPath'] = entry.dpath
-      if includeEntry:
-        endpoint['entry'] = entry
-      if catalog.options.showInfo and entry.doc:
-        endpoint['doc'] = entry.doc
-      if catalog.options.showMethods and entry.methods:
-        endpoint['methods'] = []
-        for meth in entry.methods:
-          dmeth = dict(name=meth.method)
-          if catalog.options.showIds and meth.id:
-            dmeth['id'] = meth.id
-          if meth.doc:
-            dmeth['doc'] = meth.doc
-          if includeEntry:
-            dmeth['entry'] = meth
-          endpoint['methods'].append(self.structure_entry(catalog.options, meth, dmeth, dict=dict))
-      if catalog.options.showExtra and entry.extra:
-        try:
-          for k, v in entry.extra.items():
-            if v is None:
-              endpoint.pop(k, None)
-            else:
-              endpoint[k] = v
-        except AttributeError: pass
-      app['endpoints'].append(endpoint)
-      tnames = catalog.typereg.typeNames()
+      app['endpoints'] = [
+        self.structure_endpoint(
+          catalog, entry, dict=dict, includeEntry=includeEntry, memo=memo)
+        for entry in catalog.endpoints]
+      tnames = catalog.typeNames()
       if tnames:
         app['types'] = [
-          catalog.typereg.get(name).tostruct() for name in tnames]
+          catalog.typereg.get(name).tostruct(memo=memo) for name in tnames]
 
     # todo: filter...
     # todo: what about formatting `doc`...
@@ -799,31 +1329,44 @@ class Describer(object):
   #----------------------------------------------------------------------------
   def render(self, data, format=None, override_options=None):
     if format is not None:
-      # todo: this is *ugly*... basically, the problem is that data.options
-      #       is format-specific, and therefore i need to regenerate one if
-      #       it is changed. ugh.
-      keep_fmt = data.format
-      keep_opt = data.options
-      formatstack = [format] + data.options.formatstack
-      data.format = format
-      data.options = self._getOptions(keep_opt.context, formatstack).update(
-        view=keep_opt.view, root=keep_opt.root)
-      if override_options:
-        data.options.update(override_options)
-      ret = self.render(data)
+      return self._renderAs(data, format, override_options, self.render)
+    return getattr(self, 'render_' + data.format, self.template_render)(data)
+
+  #----------------------------------------------------------------------------
+  def _renderAs(self, data, format, override_options, renderer):
+    # todo: this is *ugly*... basically, the problem is that data.options
+    #       is format-specific, and therefore i need to regenerate one if
+    #       it is changed. ugh.
+    keep_fmt = data.format
+    keep_opt = data.options
+    formatstack = [format] + data.options.formatstack
+    data.format = format
+    data.options = self._getOptions(keep_opt.context, formatstack).update(
+      view=keep_opt.view, root=keep_opt.root, typereg=keep_opt.typereg)
+    if override_options:
+      data.options.update(override_options)
+    try:
+      return renderer(data)
+    finally:
       data.format  = keep_fmt
       data.options = keep_opt
-      return ret
-    return getattr(self, 'render_' + data.format, self.template_render)(data)
 
   #----------------------------------------------------------------------------
-  def render_rst(self, data):
+  def rst_doctree(self, data):
+    '''
+    Returns the filtered docutils document that the "rst" format is
+    serialized from (and that the "html" format is rendered from).
+    '''
     doc = self.doctree_render(data)
     # todo: should this runFilters be moved int doctree_render?...
     #       currently it is only being called from here, so not much
     #       of an issue, but if ever it isn't, then this behaviour might
     #       not be expected.
-    doc = runFilters(data.options.filters, doc, data)
+    return runFilters(data.options.filters, doc, data)
+
+  #----------------------------------------------------------------------------
+  def render_rst(self, data):
+    doc = self.rst_doctree(data)
     writer = resolve(data.options.rstWriter)()
     settings = dict(
       doctitle_xform       = False,
@@ -839,10 +1382,10 @@ class Describer(object):
 
   #----------------------------------------------------------------------------
   def render_html(self, data):
-    text = self.render(data, format='rst', override_options=dict({
-      'rstMax': True,
-    }))
-    return rst.rst2html(data, text)
+    # note: the "rst" doctree is rendered directly to HTML, i.e. without
+    #       serializing it to reStructuredText and parsing it again.
+    doc = self._renderAs(data, 'rst', dict(rstMax=True), self.rst_doctree)
+    return rst.doctree2html(data, doctree.normalize(doc))
 
   #----------------------------------------------------------------------------
   def render_pdf(self, data):
@@ -859,9 +1402,81 @@ class Describer(object):
   def render_json(self, data):
     return json.dumps(self.structure_render(data))
 
+  #----------------------------------------------------------------------------
+  def stream_json(self, data, chunkSize=65536):
+    '''
+    Generates the same output as :meth:`render_json`, but as a
+    sequence of encoded chunks of about `chunkSize` bytes that are
+    generated endpoint by endpoint (and type by type), so that neither
+    the full structure nor the full output are ever held in memory.
+    '''
+    encode = json.JSONEncoder().encode
+    # note: the `app` keys are set in the same order as by
+    #       `structure_render` so that they are iterated (and therefore
+    #       output) in the same order as by `json.dumps`.
+    app = dict(url=data.options.context.request.host_url)
+    tnames = None
+    if data.endpoints:
+      app['endpoints'] = None
+      tnames = data.typeNames()
+      if tnames:
+        app['types'] = None
+    def _items(key):
+      if key == 'endpoints':
+        for entry in data.endpoints:
+          yield self.structure_endpoint(data, entry)
+      else:
+        for name in tnames:
+          yield data.typereg.get(name).tostruct()
+    def _chunks():
+      yield '{' + encode('application') + ': {'
+      for idx, key in enumerate(app.keys()):
+        yield ( ', ' if idx else '' ) + encode(key) + ': '
+        if app[key] is not None or key not in ('endpoints', 'types'):
+          yield encode(app[key])
+          continue
+        yield '['
+        for cnt, item in enumerate(_items(key)):
+          yield ( ', ' if cnt else '' ) + encode(item)
+        yield ']'
+      yield '}}'
+    return chunked(_chunks(), chunkSize)
+
   #----------------------------------------------------------------------------
   def render_yaml(self, data):
-    return yaml.dump(self.structure_render(data))
+    return yaml.dump(self.structure_render(data), Dumper=self.yamlDumper)
+
+  #----------------------------------------------------------------------------
+  def stream_yaml(self, data, chunkSize=65536):
+    '''
+    Generates the same output as :meth:`render_yaml`, but as a
+    sequence of encoded chunks -- see :meth:`stream_json`. Each
+    endpoint and type is dumped individually (one level less indented
+    and with a correspondingly narrower line width) and then indented
+    into place.
+    '''
+    if not data.endpoints:
+      return chunked([self.render_yaml(data)], chunkSize)
+    def _dump(value):
+      text = yaml.dump(value, Dumper=self.yamlDumper, width=YAML_WIDTH - 2)
+      if isinstance(text, six.binary_type):
+        text = text.decode('utf-8')
+      return u''.join(u'  ' + line for line in text.splitlines(True))
+    def _chunks():
+      url = data.options.context.request.host_url
+      tnames = data.typeNames()
+      yield u'application:\n'
+      # note: the keys are output in the same (sorted) order as by
+      #       `yaml.dump`, i.e. "endpoints", "types" and then "url".
+      yield u'  endpoints:\n'
+      for entry in data.endpoints:
+        yield _dump([self.structure_endpoint(data, entry)])
+      if tnames:
+        yield u'  types:\n'
+        for name in tnames:
+          yield _dump([data.typereg.get(name).tostruct()])
+      yield _dump(dict(url=url))
+    return chunked(_chunks(), chunkSize)
 
   #----------------------------------------------------------------------------
   def render_xml(self, catalog):
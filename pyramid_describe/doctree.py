@@ -12,20 +12,30 @@ a docutils "doctree".
 '''
 
 import collections
+import hashlib
 import json
+import sys
 import uuid
 
 import six
 import yaml
 from docutils import utils, nodes, core
-from docutils.core import publish_from_doctree
 from docutils.parsers.rst.directives.html import MetaBody
 from pyramid_controllers.util import getVersion
 
 from .i18n import _
 from .typereg import Type, TypeRef
+from .cache import RenderCache
+from .rst import getSettings, publish_from_doctree
 from . import params
 
+#------------------------------------------------------------------------------
+
+# the parsed fragments of the most recently used documentation strings,
+# keyed by content hash (see `rst2fragments`). the size is an estimate,
+# in bytes, of the memory held by the parsed nodes (see `fragmentsize`).
+fragmentCache = RenderCache(maxsize=8 * 1024 * 1024)
+
 #------------------------------------------------------------------------------
 def rtitle(text, *args, **kw):
   return nodes.title('', '', text, *args, **kw)
@@ -70,11 +80,11 @@ def rst2document(text, promote=False):
 
   # NOTE: this is also used by `.render.render()`
 
-  settings = dict(
+  settings = getSettings(
     doctitle_xform       = promote,
     sectsubtitle_xform   = promote,
   )
-  return core.publish_doctree(text, settings_overrides=settings)
+  return core.publish_doctree(text, settings=settings)
 
 #------------------------------------------------------------------------------
 def document2rst(doc):
@@ -94,10 +104,41 @@ def document2rst(doc):
 
 #------------------------------------------------------------------------------
 def rst2fragments(text):
+  '''
+  Returns the list of top-level nodes that the reStructuredText `text`
+  parses to. The parsed nodes are cached by content (see
+  `fragmentCache`) and the caller always receives a private deep copy
+  that it is free to modify.
+  '''
   if not text:
     return []
-  # TODO: see rst2document for error handling notes...
-  return list(rst2document(text))
+  key = hashlib.sha1(
+    text.encode('utf-8') if isinstance(text, six.text_type) else text).digest()
+  frags = fragmentCache.get(key)
+  if frags is None:
+    # TODO: see rst2document for error handling notes...
+    frags = list(rst2document(text))
+    fragmentCache.put(key, frags, fragmentsize(frags))
+  return [frag.deepcopy() for frag in frags]
+
+#------------------------------------------------------------------------------
+def fragmentsize(frags):
+  '''
+  Returns an estimate of the number of bytes of memory held by the
+  docutils nodes `frags`, i.e. the objects themselves, their attribute
+  dictionaries and their text. Shared objects (e.g. interned strings
+  and the source references) are not counted.
+  '''
+  size = 0
+  for frag in frags:
+    for node in frag.traverse():
+      size += sys.getsizeof(node)
+      if isinstance(node, nodes.Text):
+        continue
+      size += sys.getsizeof(node.__dict__) + sys.getsizeof(node.children)
+      for name, value in node.attributes.items():
+        size += sys.getsizeof(value)
+  return size
 
 # TODO: perhaps all these functions would be much simpler if rstMax was
 #       checked once, at exit, and if false, all classes and ids were
@@ -111,6 +152,43 @@ def walk(node):
     for sub in walk(child):
       yield sub
 
+#------------------------------------------------------------------------------
+def normalize(doc):
+  '''
+  Normalizes the rendered document `doc`, in-place, to the structure
+  that serializing it to reStructuredText (with
+  :class:`pyramid_describe.writers.rst.Writer`) and parsing it again
+  would produce, which allows `doc` to be published directly to other
+  formats (e.g. HTML). Specifically:
+
+  * containers are replaced by their children (the first of which
+    inherits the container's classes and IDs), and
+
+  * sections without IDs are given the implicit ID that the parser
+    would derive from their title.
+  '''
+  for node in list(doc.traverse(nodes.container)):
+    children = list(node.children)
+    if children and isinstance(children[0], nodes.Element):
+      children[0]['classes'].extend(node['classes'])
+      children[0]['ids'].extend(node['ids'])
+    node.replace_self(children)
+  # note: the implicit IDs are generated in a scratch document so that
+  #       sections that already have IDs allocate (and then discard)
+  #       their implicit ID, exactly as the parser would.
+  scratch = utils.new_document('<pyramid_describe.normalize>')
+  for node in doc.traverse(nodes.section):
+    for nid in node['ids']:
+      scratch.ids[nid] = node
+    target = nodes.section(
+      names=[nodes.fully_normalize_name(node[0].astext())] if len(node) else [])
+    scratch.note_implicit_target(target, target)
+    if not node['ids']:
+      node['ids'] = target['ids']
+      for nid in node['ids']:
+        doc.ids[nid] = node
+  return doc
+
 #------------------------------------------------------------------------------
 def render(data):
   doc = utils.new_document('<pyramid_describe.document>')
@@ -151,7 +229,7 @@ def render(data):
       legend['target-ids'] = legend['ids']
       legend['classes'] = ['legend']
     for item, desc in data.legend:
-      section = rsect(item, rpara(rtext(desc)))
+      section = rsect(item, *rst2fragments(desc))
       if data.options.rstMax:
         section['ids'] = ['legend-item-' + data.options.idEncoder(item)]
         section['target-ids'] = section['ids']
@@ -6,10 +6,60 @@
 # copy: (C) Copyright 2013 Cadit Health Inc., All Rights Reserved.
 #------------------------------------------------------------------------------
 
+import copy
+
+from six.moves import intern
+
 from .util import adict
 
 #------------------------------------------------------------------------------
-class Entry(adict):
+class EntryBase(object):
+  '''
+  The implementation-independent behavior of :class:`Entry` and
+  :class:`CompactEntry`.
+  '''
+
+  __slots__ = ()
+
+  def setAncestry(self):
+    '''
+    Sets the `depth` of this entry and caches its chain of parents
+    (used by `parents` and `rparents`), based on the current `parent`.
+    The parent's chain is re-used if it is cached, which makes this
+    an O(1) operation when entries are set up from the root down. It
+    must be called again if the `parent` changes.
+    '''
+    if not self.parent:
+      ancestry = ()
+    else:
+      ancestry = self.parent._getAncestry() + (self.parent,)
+    self._saveAncestry(ancestry)
+    self.depth = len(ancestry)
+    return self
+
+  def _getAncestry(self):
+    ancestry = self._loadAncestry()
+    if ancestry is not None \
+        and ( ancestry[-1] if ancestry else None ) is ( self.parent or None ):
+      return ancestry
+    return tuple(reversed(list(self._walkParents())))
+
+  def _walkParents(self):
+    entry = self
+    while entry.parent:
+      yield entry.parent
+      entry = entry.parent
+
+  @property
+  def parents(self):
+    return reversed(self._getAncestry())
+
+  @property
+  def rparents(self):
+    return iter(self._getAncestry())
+
+#------------------------------------------------------------------------------
+class Entry(EntryBase, adict):
   '''
   Represents an entry in the describe hierarchy. Entries can have the
   following attributes:
@@ -53,14 +103,19 @@ class Entry(adict):
 
     The name of the HTTP method for RESTful verb entries.
 
-  parents : generator
+  parents : iterator
 
-    A generator of entry parents, starting with the closest first.
+    An iterator of entry parents, starting with the closest first.
 
-  rparents : generator
+  rparents : iterator
 
     A reversed version of `parents`, ie. starting at the root first.
 
+  depth : int
+
+    The number of parents of this entry (i.e. zero for the root
+    Entry). This is set by :meth:`setAncestry`.
+
   doc : str | dict
 
     The documentation for this entry. During initial loading, is
@@ -107,6 +162,12 @@ class Entry(adict):
     True IFF this is a forceSlash-only endpoint (i.e. a suffixed
     '/' when sending requests to this endpoint).
 
+  isCycle : bool
+
+    True IFF this controller is a circular reference, i.e. it is also
+    one of this entry's parents. Such entries are described, but their
+    children are not (since they already are at the parent).
+
   :Extension Attributes:
 
   The following attributes are *recognized*, but not produced, by the
@@ -145,19 +206,14 @@ class Entry(adict):
     different kinds of errors, this will be a Type.ONEOF instance.
   '''
 
-  @property
-  def parents(self):
-    entry = self
-    while entry.parent:
-      yield entry.parent
-      entry = entry.parent
+  def _loadAncestry(self):
+    return self.__dict__.get('_ancestry')
 
-  @property
-  def rparents(self):
-    if self.parent:
-      for parent in self.parent.rparents:
-        yield parent
-      yield self.parent
+  def _saveAncestry(self, ancestry):
+    # note: the chain is stored as an instance attribute (instead of
+    #       as an item) so that it is neither copied by ``Entry(entry)``
+    #       nor serialized.
+    self.__dict__['_ancestry'] = ancestry
 
   def __eq__(self, other):
     # note: not quite sure exactly why, but the line
@@ -167,6 +223,177 @@ class Entry(adict):
     #       is not here...
     return self is other
 
+#------------------------------------------------------------------------------
+class CompactEntry(EntryBase):
+  '''
+  A memory-compact alternative to :class:`Entry` for very large
+  catalogs, which provides the same attribute and mapping API, i.e.
+  unset attributes evaluate to ``None``, and ``items()``, ``get()``,
+  ``update()``, etc. are supported.
+
+  The well-known attributes (see :class:`Entry`) are stored in slots,
+  and any other (e.g. parser-added) attributes are stored in a
+  dictionary that is only allocated when needed. Furthermore, string
+  values of the name and path attributes are interned, so that, for
+  example, the `ipath` of controllers mounted at many paths, or a
+  `dpath` that is identical to the `path`, is only stored once.
+  '''
+
+  FIELDS = (
+    'name', 'dname', 'path', 'dpath', 'ipath', 'itype', 'id', 'method',
+    'parent', 'view', 'methods', 'doc', 'depth', 'classes',
+    'params', 'returns', 'raises',
+    'isController', 'isMethod', 'isEndpoint', 'isStub', 'isRest',
+    'isDynamic', 'isIndex', 'isCycle',
+  )
+  INTERNED = frozenset((
+    'name', 'dname', 'path', 'dpath', 'ipath', 'itype', 'id', 'method'))
+
+  __slots__ = FIELDS + ('_extra', '_ancestry')
+
+  _fieldset = frozenset(FIELDS)
+
+  def __init__(self, *args, **kw):
+    object.__setattr__(self, '_extra', None)
+    object.__setattr__(self, '_ancestry', None)
+    self.update(*args, **kw)
+
+  def _loadAncestry(self):
+    return self._ancestry
+
+  def _saveAncestry(self, ancestry):
+    object.__setattr__(self, '_ancestry', ancestry)
+
+  def __getattr__(self, name):
+    # note: only called for unset slots and non-field attributes
+    if name.startswith('__'):
+      raise AttributeError(name)
+    if self._extra is None:
+      return None
+    return self._extra.get(name)
+
+  def __setattr__(self, name, value):
+    if name in self._fieldset:
+      if name in self.INTERNED and type(value) is str:
+        value = intern(value)
+      object.__setattr__(self, name, value)
+      return
+    if self._extra is None:
+      object.__setattr__(self, '_extra', dict())
+    self._extra[name] = value
+
+  def __delattr__(self, name):
+    if name in self._fieldset:
+      try:
+        object.__delattr__(self, name)
+      except AttributeError:
+        pass
+      return
+    if self._extra is not None:
+      self._extra.pop(name, None)
+
+  def __getitem__(self, key):
+    if key not in self:
+      raise KeyError(key)
+    return getattr(self, key)
+
+  __setitem__ = __setattr__
+
+  def __delitem__(self, key):
+    if key not in self:
+      raise KeyError(key)
+    delattr(self, key)
+
+  def __contains__(self, key):
+    if key in self._fieldset:
+      return self._isSet(key)
+    return self._extra is not None and key in self._extra
+
+  def _isSet(self, key):
+    try:
+      object.__getattribute__(self, key)
+      return True
+    except AttributeError:
+      return False
+
+  def _setFields(self):
+    ret = []
+    for key in self.FIELDS:
+      try:
+        object.__getattribute__(self, key)
+      except AttributeError:
+        continue
+      ret.append(key)
+    return ret
+
+  def keys(self):
+    return self._setFields() + list(self._extra or ())
+
+  def __iter__(self):
+    return iter(self.keys())
+
+  def __len__(self):
+    return len(self.keys())
+
+  def items(self):
+    return [(key, self[key]) for key in self.keys()]
+
+  def values(self):
+    return [self[key] for key in self.keys()]
+
+  def get(self, key, default=None):
+    return self[key] if key in self else default
+
+  def pop(self, key, *default):
+    if key not in self:
+      if default:
+        return default[0]
+      raise KeyError(key)
+    ret = self[key]
+    delattr(self, key)
+    return ret
+
+  def setdefault(self, key, default=None):
+    if key not in self:
+      self[key] = default
+    return self[key]
+
+  def update(self, *args, **kw):
+    for arg in args:
+      for key, value in ( arg.items() if hasattr(arg, 'items') else arg ):
+        self[key] = value
+    for key, value in kw.items():
+      self[key] = value
+    return self
+
+  def copy(self):
+    return self.__class__(self)
+
+  def __getstate__(self):
+    return (dict(self.items()), self._ancestry)
+
+  def __setstate__(self, state):
+    self.__init__(state[0])
+    self._saveAncestry(state[1])
+
+  def __deepcopy__(self, memo):
+    ret = self.__class__.__new__(self.__class__)
+    memo[id(self)] = ret
+    object.__setattr__(ret, '_extra', None)
+    object.__setattr__(ret, '_ancestry', None)
+    for key in self._setFields():
+      object.__setattr__(
+        ret, key, copy.deepcopy(object.__getattribute__(self, key), memo))
+    if self._extra is not None:
+      object.__setattr__(ret, '_extra', copy.deepcopy(self._extra, memo))
+    if self._ancestry is not None:
+      ret._saveAncestry(tuple(
+        copy.deepcopy(entry, memo) for entry in self._ancestry))
+    return ret
+
+  def __repr__(self):
+    return '<CompactEntry %s>' % (self.path or self.name,)
+
 #------------------------------------------------------------------------------
 # end of $Id$
 #------------------------------------------------------------------------------
@@ -6,16 +6,25 @@
 # copy: (C) Copyright 2013 Cadit Health Inc., All Rights Reserved.
 #------------------------------------------------------------------------------
 
+import logging
+import threading
+
 from pyramid.settings import asbool, aslist
 from .controller import DescribeController
 from .util import pick, resolve
 
+log = logging.getLogger(__name__)
+
 GLOBAL_PREFIX           = 'describe'
 OPTION_PREFIXES_NAME    = GLOBAL_PREFIX + '.prefixes'
 OPTION_PREFIXES_DEFAULT = 'describe'
 OPTION_CLASS_NAME       = GLOBAL_PREFIX + '.class'
 OPTION_CLASS_DEFAULT    = DescribeController
 
+# the warm-up must be executed after all other configuration actions
+# so that the views are registered and resolvable
+WARMUP_ORDER            = 1 << 20
+
 def includeme(config):
   '''
   Includes pyramid-describe functionality into the pyramid application
@@ -35,6 +44,25 @@ def includeme(config):
       curset.get('name', 'DescribeController-' + str(idx + 1)),
       curset.get('attach', '/describe'),
       controller)
+    if curset.get('warmup') and callable(getattr(controller, 'warmup', None)):
+      config.action(
+        None, _makeWarmup(config.registry, controller, curset),
+        order=WARMUP_ORDER)
+
+#------------------------------------------------------------------------------
+def _makeWarmup(registry, controller, settings):
+  def _warmup():
+    try:
+      controller.warmup(registry)
+    except Exception:
+      log.exception('pyramid-describe warm-up failed')
+  def _action():
+    if not asbool(settings.get('warmup.background', 'false')):
+      return _warmup()
+    thread = threading.Thread(target=_warmup, name='pyramid-describe-warmup')
+    thread.daemon = True
+    thread.start()
+  return _action
 
 #------------------------------------------------------------------------------
 # end of $Id$
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+This module provides the background rendering support used by the
+DescribeController for formats that are too expensive to render
+within a request (typically PDF): a bounded pool of worker threads
+that execute rendering jobs, and an on-disk cache of the rendered
+artifacts.
+'''
+
+import os
+import time
+import shutil
+import atexit
+import logging
+import tempfile
+import threading
+import collections
+
+from six.moves import queue
+from aadict import aadict
+
+#------------------------------------------------------------------------------
+
+log = logging.getLogger(__name__)
+
+JOB_PENDING     = 'pending'
+JOB_RUNNING     = 'running'
+JOB_DONE        = 'done'
+JOB_FAILED      = 'failed'
+
+#------------------------------------------------------------------------------
+class JobPool(object):
+  '''
+  A pool of `workers` background threads that execute jobs, each
+  identified by a key. At most `queue` jobs can be waiting for a
+  worker at any time, and the states of the last `history` finished
+  jobs are retained so that they can be queried with :meth:`get`.
+
+  The worker threads are daemon threads that are only started when
+  the first job is submitted.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, workers=2, queue=16, history=256, *args, **kw):
+    super(JobPool, self).__init__(*args, **kw)
+    self.workers  = max(1, int(workers))
+    self.maxqueue = max(0, int(queue))
+    self.history  = max(1, int(history))
+    self.jobs     = collections.OrderedDict()
+    self._queue   = None
+    self._threads = []
+    self._lock    = threading.Lock()
+
+  #----------------------------------------------------------------------------
+  def get(self, key):
+    '''
+    Returns the job for `key` (an object with the attributes `key`,
+    `status`, `error`, `created` and `finished`), or ``None`` if no
+    such job was submitted or it has since been forgotten.
+    '''
+    return self.jobs.get(key)
+
+  #----------------------------------------------------------------------------
+  def submit(self, key, func):
+    '''
+    Enqueues a job that calls `func` (with no arguments) under the
+    identifier `key` and returns it. If a pending, running, or
+    completed job for `key` already exists, it is returned instead. If
+    all workers are busy and `queue` jobs are already waiting,
+    ``None`` is returned.
+    '''
+    with self._lock:
+      job = self.jobs.get(key)
+      if job is not None and job.status != JOB_FAILED:
+        return job
+      active = len([job for job in self.jobs.values()
+                    if job.status in (JOB_PENDING, JOB_RUNNING)])
+      if active >= self.workers + self.maxqueue:
+        return None
+      job = aadict(
+        key=key, status=JOB_PENDING, error=None,
+        created=time.time(), finished=None, func=func)
+      self.jobs.pop(key, None)
+      self.jobs[key] = job
+      self._start()
+    self._queue.put(job)
+    return job
+
+  #----------------------------------------------------------------------------
+  def discard(self, key):
+    '''
+    Forgets the finished job for `key`, if any.
+    '''
+    with self._lock:
+      job = self.jobs.get(key)
+      if job is not None and job.status in (JOB_DONE, JOB_FAILED):
+        del self.jobs[key]
+
+  #----------------------------------------------------------------------------
+  def _start(self):
+    # note: must be called with `self._lock` held.
+    if self._queue is None:
+      self._queue = queue.Queue()
+    while len(self._threads) < self.workers:
+      thread = threading.Thread(
+        target=self._work, name='pyramid-describe-worker')
+      thread.daemon = True
+      thread.start()
+      self._threads.append(thread)
+
+  #----------------------------------------------------------------------------
+  def _work(self):
+    while True:
+      job = self._queue.get()
+      job.status = JOB_RUNNING
+      try:
+        job.func()
+        job.status = JOB_DONE
+      except Exception as err:
+        log.exception('background rendering job %r failed', job.key)
+        job.error  = str(err) or err.__class__.__name__
+        job.status = JOB_FAILED
+      finally:
+        job.func     = None
+        job.finished = time.time()
+        self._prune()
+
+  #----------------------------------------------------------------------------
+  def _prune(self):
+    with self._lock:
+      finished = [key for key, job in self.jobs.items()
+                  if job.status in (JOB_DONE, JOB_FAILED)]
+      for key in finished[:max(0, len(finished) - self.history)]:
+        del self.jobs[key]
+
+#------------------------------------------------------------------------------
+class ArtifactCache(object):
+  '''
+  A directory of rendered artifacts, each stored in a file named after
+  its key and extension. Artifacts are written atomically, and only
+  the `maxcount` most recently written artifacts are kept.
+
+  :Parameters:
+
+  directory : str, optional
+
+    The directory to store the artifacts in. Since the cache removes
+    all files in its directory that exceed `maxcount`, the artifacts
+    are actually stored in a private subdirectory of it (see
+    `SUBDIRECTORY`), which is created if it does not exist. By
+    default, a new temporary directory is created when the first
+    artifact is stored, which is removed by :meth:`close` or when the
+    process exits.
+
+  maxcount : int, optional, default: 64
+
+    The maximum number of artifacts to keep.
+  '''
+
+  DEFAULT_MAXCOUNT = 64
+  SUBDIRECTORY     = 'pyramid-describe-artifacts'
+
+  #----------------------------------------------------------------------------
+  def __init__(self, directory=None, maxcount=None, *args, **kw):
+    super(ArtifactCache, self).__init__(*args, **kw)
+    self.directory = None
+    if directory:
+      self.directory = os.path.join(directory, self.SUBDIRECTORY)
+    self.maxcount  = self.DEFAULT_MAXCOUNT if maxcount is None else int(maxcount)
+    self._tempdir  = None
+    self._lock     = threading.Lock()
+
+  #----------------------------------------------------------------------------
+  def path(self, key, ext):
+    '''
+    Returns the path of the artifact for `key` and `ext`, or ``None``
+    if it does not exist.
+    '''
+    if not self.directory:
+      return None
+    path = os.path.join(self.directory, key + '.' + ext)
+    if not os.path.isfile(path):
+      return None
+    return path
+
+  #----------------------------------------------------------------------------
+  def put(self, key, ext, content):
+    '''
+    Stores `content` (a byte string) as the artifact for `key` and
+    `ext` and returns its path.
+    '''
+    with self._lock:
+      if not self.directory:
+        self.directory = self._tempdir = \
+          tempfile.mkdtemp(prefix='pyramid-describe-')
+        atexit.register(self.close)
+      elif not os.path.isdir(self.directory):
+        os.makedirs(self.directory)
+    path = os.path.join(self.directory, key + '.' + ext)
+    fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+    try:
+      with os.fdopen(fd, 'wb') as fp:
+        fp.write(content)
+      os.rename(tmp, path)
+    except Exception:
+      os.unlink(tmp)
+      raise
+    self._prune()
+    return path
+
+  #----------------------------------------------------------------------------
+  def close(self):
+    '''
+    Removes the temporary directory created by this cache, if any,
+    including all artifacts stored in it. A configured `directory` is
+    left untouched.
+    '''
+    with self._lock:
+      if self._tempdir is None:
+        return
+      shutil.rmtree(self._tempdir, ignore_errors=True)
+      if self.directory == self._tempdir:
+        self.directory = None
+      self._tempdir = None
+
+  #----------------------------------------------------------------------------
+  def _prune(self):
+    with self._lock:
+      paths = []
+      for name in os.listdir(self.directory):
+        if name.startswith('.'):
+          continue
+        path = os.path.join(self.directory, name)
+        try:
+          paths.append((os.stat(path).st_mtime, path))
+        except OSError:
+          continue
+      for mtime, path in sorted(paths)[:max(0, len(paths) - self.maxcount)]:
+        try:
+          os.unlink(path)
+        except OSError:
+          pass
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
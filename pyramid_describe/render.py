@@ -199,7 +199,9 @@ def render(data, tspec):
   #       insert references to `doc.type` directives...)
 
   # note: TypeRegistry already sorts this. make sorting configurable?...
-  typstates = [[typ, False, False] for typ in data.typereg.types()]
+  tnames    = set(data.typeNames())
+  typstates = [[typ, False, False] for typ in data.typereg.types()
+               if typ.name in tnames]
 
   for node in doctree.walk(doc):
     if isinstance(node, DocType):
@@ -116,7 +116,7 @@ def render(catalog):
         'elementFormDefault'    : 'qualified',
       }
     }
-    for name in catalog.typereg.typeNames():
+    for name in catalog.typeNames():
       mergeNode(
         data['application']['grammars']['xsd:schema'],
         struct2schema(catalog.typereg.get(name).tostruct(ref=False), ref=False))
@@ -86,19 +86,26 @@ def et2str(data):
     '<?xml version="1.0" encoding="UTF-8"?>')
 
 #------------------------------------------------------------------------------
-def doc2list(node):
+def doc2list(node, seen=None):
   # force 'doc' attribute into a list, which causes dict2node to
   # make it into a node instead of an attribute
+  # note: the type structures may be shared (see `Type.tostruct`), so
+  #       each node is only converted once.
   if isscalar(node) or node is None:
     return
+  if seen is None:
+    seen = set()
+  if id(node) in seen:
+    return
+  seen.add(id(node))
   if islist(node):
     for sub in node:
-      doc2list(sub)
+      doc2list(sub, seen)
     return
   if 'doc' in node:
     node['doc'] = [node['doc']]
   for value in node.values():
-    doc2list(value)
+    doc2list(value, seen)
 
 #------------------------------------------------------------------------------
 @asset.plugin('pyramid_describe.plugins.renderers', 'xml')
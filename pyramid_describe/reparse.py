@@ -74,6 +74,93 @@ def reparse(spec, enhanced=False, accept_multiple=False):
     return expr
   return PatternProxy(expr, sspec, sspec[-1])
 
+#------------------------------------------------------------------------------
+_metachars = '.^$*+?{}[]|()'
+_quantifiers = '?*{'
+
+#------------------------------------------------------------------------------
+def _literalRun(expr, idx):
+  '''
+  Returns a tuple of (LITERAL, INDEX) of the literal characters in
+  `expr` starting at `idx`, and the index of the first non-literal.
+  '''
+  ret = []
+  while idx < len(expr):
+    char = expr[idx]
+    if char == '\\':
+      if idx + 1 >= len(expr) or expr[idx + 1].isalnum():
+        break
+      lit, step = expr[idx + 1], 2
+    elif char in _metachars:
+      break
+    else:
+      lit, step = char, 1
+    if expr[idx + step:idx + step + 1] and expr[idx + step] in _quantifiers:
+      break
+    ret.append(lit)
+    idx += step
+  return ( ''.join(ret), idx )
+
+#------------------------------------------------------------------------------
+def _hasTopLevelAlternation(expr):
+  depth  = 0
+  inset  = False
+  idx    = 0
+  while idx < len(expr):
+    char = expr[idx]
+    if char == '\\':
+      idx += 2
+      continue
+    if inset:
+      inset = char != ']'
+    elif char == '[':
+      inset = True
+    elif char == '(':
+      depth += 1
+    elif char == ')':
+      depth -= 1
+    elif char == '|' and depth == 0:
+      return True
+    idx += 1
+  return False
+
+#------------------------------------------------------------------------------
+def _pattern(expr):
+  if isinstance(expr, six.string_types):
+    return expr
+  if expr.flags & ( re.IGNORECASE | re.VERBOSE ):
+    return None
+  return expr.pattern
+
+#------------------------------------------------------------------------------
+def literalPrefix(expr):
+  '''
+  Returns the literal string that any string matched by the regular
+  expression `expr` (either a string or a compiled expression) must
+  start with, or ``None`` if that cannot be determined. For example,
+  ``^/api/v2(/.*)?$`` returns ``'/api/v2'``. Note that an empty string
+  is a valid return value (e.g. for ``^.*``).
+  '''
+  expr = _pattern(expr)
+  if not expr or not expr.startswith('^') or _hasTopLevelAlternation(expr):
+    return None
+  return _literalRun(expr, 1)[0]
+
+#------------------------------------------------------------------------------
+def subtreePrefix(expr):
+  '''
+  Returns the path ``PATH`` if the regular expression `expr` is
+  exactly of the form ``^PATH(/.*)?$`` (i.e. it matches a URL path and
+  everything below it), otherwise ``None``.
+  '''
+  expr = _pattern(expr)
+  if not expr or not expr.startswith('^') or not expr.endswith('(/.*)?$'):
+    return None
+  lit, idx = _literalRun(expr, 1)
+  if not lit or idx != len(expr) - len('(/.*)?$'):
+    return None
+  return lit
+
 #------------------------------------------------------------------------------
 # end of $Id$
 #------------------------------------------------------------------------------
@@ -6,10 +6,11 @@
 # copy: (C) Copyright 2013 Cadit Health Inc., All Rights Reserved.
 #------------------------------------------------------------------------------
 
-import sys, re
+import sys, re, threading
+import six
 from pyramid.settings import aslist
 from pyramid.path import AssetResolver, DottedNameResolver
-from docutils import nodes, core, io
+from docutils import Component, nodes, core, io
 from docutils.parsers.rst import Directive, directives
 from docutils.transforms import misc
 from six.moves import urllib
@@ -29,13 +30,16 @@ def better_stylesheet_call(self, path):
   content = upath.split(',', 1)[1]
   return self.embedded_stylesheet % (content,)
 def better_starttag(self, node, tagname, *args, **kw):
-  # removes redundant 'classes' from nodes
+  # removes redundant 'classes' from nodes and sorts them, including
+  # the translator-supplied class (the default `starttag` appends that
+  # to the node's classes, i.e. the output would otherwise depend on
+  # whether or not the node had already been translated).
   if hasattr(node, 'attributes'):
-    node['classes'] = sorted(set(node.get('classes', [])))
-    if kw.get('CLASS') in node['classes']:
-      kw.pop('CLASS', None)
-    if kw.get('class') in node['classes']:
-      kw.pop('class', None)
+    classes = set(node.get('classes', []))
+    for key in ('CLASS', 'class'):
+      if kw.get(key):
+        classes.add(kw.pop(key))
+    node['classes'] = sorted(classes)
   return self._real_starttag(node, tagname, *args, **kw)
 def better_visit_list_item(self, node):
   # removes redundant 'first' class, if present
@@ -74,6 +78,74 @@ if not hasattr(HTMLTranslator, 'depart_AsIs'):
 # /TODO
 #------------------------------------------------------------------------------
 
+#------------------------------------------------------------------------------
+# the shared docutils settings, keyed by components and overrides (see
+# `getSettings`), and the lock that serializes their creation.
+_settings     = dict()
+_settingsLock = threading.Lock()
+
+#------------------------------------------------------------------------------
+def _settingsKey(value):
+  if isinstance(value, (list, tuple)):
+    return tuple(_settingsKey(item) for item in value)
+  if isinstance(value, dict):
+    return tuple(sorted((key, _settingsKey(val)) for key, val in value.items()))
+  if isinstance(value, Component):
+    # the settings of a component are defined by its class
+    return value.__class__
+  return value
+
+#------------------------------------------------------------------------------
+def getSettings(reader='standalone', parser='restructuredtext', writer='null',
+                **overrides):
+  '''
+  Returns the docutils settings object for the specified `reader`,
+  `parser` and `writer` components (each either a component name or a
+  component instance) with the specified `overrides` applied, exactly
+  as a ``docutils.core.publish_*`` function would build them from
+  its `settings_overrides` parameter.
+
+  Building a settings object requires building a docutils option
+  parser, which usually costs more than publishing a small document,
+  so the settings are created once per combination of components and
+  overrides and then shared. Since a publisher does not modify its
+  settings, they can be shared across requests and threads -- but the
+  caller must not modify them either.
+  '''
+  # note: `traceback` is the default that the `publish_*` functions
+  #       apply when not given a settings object.
+  overrides.setdefault('traceback', True)
+  key = _settingsKey((reader, parser, writer, overrides))
+  settings = _settings.get(key)
+  if settings is not None:
+    return settings
+  with _settingsLock:
+    settings = _settings.get(key)
+    if settings is None:
+      pub = core.Publisher(
+        reader = None if isinstance(reader, six.string_types) else reader,
+        parser = None if isinstance(parser, six.string_types) else parser,
+        writer = None if isinstance(writer, six.string_types) else writer)
+      pub.set_components(
+        reader if isinstance(reader, six.string_types) else None,
+        parser if isinstance(parser, six.string_types) else None,
+        writer if isinstance(writer, six.string_types) else None)
+      settings = _settings[key] = pub.get_settings(**overrides)
+  return settings
+
+#------------------------------------------------------------------------------
+def publish_from_doctree(document, writer=None, writer_name='pseudoxml',
+                         settings_overrides=None):
+  '''
+  Identical to ``docutils.core.publish_from_doctree``, but uses the
+  shared settings (see :func:`getSettings`) for the `writer` (or
+  `writer_name`) and `settings_overrides`.
+  '''
+  settings = getSettings(
+    'doctree', 'null', writer or writer_name, **(settings_overrides or {}))
+  return core.publish_from_doctree(
+    document, writer=writer, writer_name=writer_name, settings=settings)
+
 #------------------------------------------------------------------------------
 def resolvecss(data, spec):
   if ':' in spec:
@@ -97,14 +169,14 @@ class HtmlDoctreeFixer():
       node['ids'] = node['ids'][1:]
 
 #------------------------------------------------------------------------------
-def rst2html(data, text):
+def htmlSettings(data):
 
   css = [
     urllib.parse.quote('data:text/css;charset=UTF-8,' + resolvecss(data, e))
     for e in aslist(data.options.cssPath or '')]
   # todo: add the docutils default css as well...
 
-  settings = dict(
+  return dict(
     # input_encoding     = 'UTF-8',
     output_encoding      = data.options.encoding,
     embed_stylesheet     = data.options.cssEmbed,
@@ -113,21 +185,43 @@ def rst2html(data, text):
     sectsubtitle_xform   = False,
     )
 
+#------------------------------------------------------------------------------
+def rst2html(data, text):
+  '''
+  Parses the reStructuredText `text` and renders it to HTML -- see
+  :func:`doctree2html`.
+  '''
+
+  settings = htmlSettings(data)
+
   pub = core.Publisher(None, None, None,
                        source_class=io.StringInput,
-                       destination_class=io.NullOutput)
+                       destination_class=io.NullOutput,
+                       settings=getSettings(
+                         'standalone', 'restructuredtext', 'html', **settings))
   pub.set_components('standalone', 'restructuredtext', 'html')
-  pub.process_programmatic_settings(None, settings, None)
   pub.set_source(text, None)
   pub.set_destination(None, None)
   pub.publish(enable_exit_status=False)
 
-  doc = pub.document
+  return doctree2html(data, pub.document, settings=settings)
+
+#------------------------------------------------------------------------------
+def doctree2html(data, doc, settings=None):
+  '''
+  Renders the docutils document `doc` to HTML after applying the
+  :class:`HtmlDoctreeFixer` and the `data.options.filters` to it. Note
+  that `doc` is modified in-place.
+  '''
+
+  if settings is None:
+    settings = htmlSettings(data)
+
   doc.walk(HtmlDoctreeFixer(doc))
-  doc = runFilters(data.options.filters, doc, data)
+  doc = runFilters(data.options.filters, doc, data) or doc
 
-  html = core.publish_from_doctree(
-    pub.document, writer_name='html', settings_overrides=settings)
+  html = publish_from_doctree(
+    doc, writer_name='html', settings_overrides=settings)
 
   return html
 
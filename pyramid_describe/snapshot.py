@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+This module provides serialization of an analyzed (but not yet
+filtered or rendered) catalog to a JSON "snapshot", which allows
+documentation to be rendered later without importing or bootstrapping
+the described application.
+
+The snapshot is a JSON object with the following attributes:
+
+* `snapshot`:   the snapshot format version and generator.
+* `root`:       the URL path that the analysis was rooted at.
+* `hash`:       the content hash of the analysis.
+* `typereg`:    the registered types, auto-types and aliases.
+* `entries`:    the flattened list of all entries.
+* `endpoints`:  the indices (into `entries`) of the endpoints.
+
+Entries reference their parent and methods by index. Types are
+encoded in the same style as :meth:`Type.tostruct`, except that no
+information is lost: each Type is a ``{"@type": {...}}`` object, each
+TypeRef is a ``{"@typeref": {...}}`` object, and references to
+registered types are ``{"@typename": NAME}`` (or ``{"@autotype":
+NAME}``) objects.
+'''
+
+import json
+
+import six
+from aadict import aadict
+from pyramid_controllers.util import getVersion
+
+from .entry import Entry
+from .typereg import Type, TypeRef
+from .util import adict
+
+#------------------------------------------------------------------------------
+
+FORMAT_VERSION  = 1
+
+# these entry attributes are either non-serializable (`view`) or are
+# encoded structurally
+ENTRY_SKIP      = ('view', 'parent', 'methods')
+
+#------------------------------------------------------------------------------
+class Snapshot(object):
+  '''
+  A loaded snapshot, which can be passed as the `view` parameter to
+  :meth:`pyramid_describe.Describer.describe` (and related methods) in
+  place of a controller. The `catalog` attribute holds the loaded
+  analysis, which must not be modified.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, catalog, root=None, *args, **kw):
+    super(Snapshot, self).__init__(*args, **kw)
+    self.catalog = catalog
+    self.root    = root or '/'
+
+#------------------------------------------------------------------------------
+class _Encoder(object):
+
+  #----------------------------------------------------------------------------
+  def __init__(self, typereg):
+    self.names = {id(typ): ('@typename', name)
+                  for name, typ in typereg._types.items()}
+    for name, typ in typereg._autotypes.items():
+      self.names.setdefault(id(typ), ('@autotype', name))
+
+  #----------------------------------------------------------------------------
+  def value(self, value, define=False):
+    if value is None or isinstance(value, (bool, float) + six.integer_types):
+      return value
+    if isinstance(value, six.string_types):
+      return value
+    if isinstance(value, Type):
+      if not define and id(value) in self.names:
+        tag, name = self.names[id(value)]
+        return {tag: name}
+      return {'@type': {
+        key: self.value(val) for key, val in value.items()
+        if val is not None}}
+    if isinstance(value, TypeRef):
+      return {'@typeref': {
+        key: self.value(val) for key, val in value.items()
+        if val is not None}}
+    if isinstance(value, dict):
+      return {key: self.value(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple, set)):
+      return [self.value(val) for val in value]
+    raise ValueError(
+      'unsupported snapshot value type: %r' % (value.__class__.__name__,))
+
+#------------------------------------------------------------------------------
+class _Decoder(object):
+
+  #----------------------------------------------------------------------------
+  def __init__(self, data):
+    self.data  = data
+    self.types = dict(), dict()
+
+  #----------------------------------------------------------------------------
+  def named(self, table, name):
+    types = self.types[0 if table == 'types' else 1]
+    if name not in types:
+      # note: the type is registered *before* being populated so that
+      #       recursive type references resolve to the same object.
+      types[name] = typ = Type()
+      typ.update(self.value(self.data['typereg'][table][name]['@type']))
+      typ.meta = aadict(typ.meta or {})
+    return types[name]
+
+  #----------------------------------------------------------------------------
+  def value(self, value):
+    if isinstance(value, list):
+      return [self.value(val) for val in value]
+    if six.PY2 and isinstance(value, six.text_type):
+      # note: the analysis generates `str` objects in python 2, so
+      #       JSON-decoded `unicode` objects are converted back.
+      return value.encode('utf-8')
+    if not isinstance(value, dict):
+      return value
+    if len(value) == 1:
+      key, val = list(value.items())[0]
+      if key == '@typename':
+        return self.named('types', val)
+      if key == '@autotype':
+        return self.named('autotypes', val)
+      if key == '@type':
+        val = self.value(val)
+        return Type(**val)
+      if key == '@typeref':
+        return TypeRef(**self.value(val))
+    return adict({
+      self.value(key): self.value(val) for key, val in value.items()})
+
+#------------------------------------------------------------------------------
+def dump(catalog, root=None):
+  '''
+  Returns a JSON-serializable snapshot of the specified analyzed
+  `catalog` (which must have an `endpoints` and a `typereg`
+  attribute).
+  '''
+  from .describer import _allEntries
+  typereg  = catalog.typereg
+  encoder  = _Encoder(typereg)
+  entries  = list(_allEntries(catalog.endpoints))
+  index    = {id(entry): idx for idx, entry in enumerate(entries)}
+  dentries = []
+  for entry in entries:
+    dentry = {
+      key: encoder.value(value) for key, value in entry.items()
+      if key not in ENTRY_SKIP and value is not None}
+    if entry.parent is not None:
+      dentry['parent'] = index[id(entry.parent)]
+    if entry.methods is not None:
+      dentry['methods'] = [index[id(meth)] for meth in entry.methods]
+    dentries.append(dentry)
+  return dict(
+    snapshot  = dict(
+      format    = FORMAT_VERSION,
+      generator = 'pyramid-describe/' + getVersion('pyramid_describe')),
+    root      = root or '/',
+    hash      = catalog.hash,
+    typereg   = dict(
+      types     = {name: encoder.value(typ, define=True)
+                   for name, typ in typereg._types.items()},
+      autotypes = {name: encoder.value(typ, define=True)
+                   for name, typ in typereg._autotypes.items()},
+      aliases   = {name: sorted(sources)
+                   for name, sources in typereg._aliases.items()},
+    ),
+    entries   = dentries,
+    endpoints = [index[id(entry)] for entry in catalog.endpoints],
+  )
+
+#------------------------------------------------------------------------------
+def load(data, typereg, entryClass=Entry):
+  '''
+  Returns a :class:`Snapshot` for the snapshot `data` (as generated by
+  :func:`dump`). The `typereg` is used as a template for the type
+  registry (i.e. for its options), and is not modified. The entries
+  are created as instances of `entryClass`.
+  '''
+  from .describer import DescriberCatalog
+  version = ( data.get('snapshot') or {} ).get('format')
+  if version != FORMAT_VERSION:
+    raise ValueError('unsupported snapshot format: %r' % (version,))
+  decoder = _Decoder(data)
+  typereg = typereg.clone()
+  typereg._types     = {
+    decoder.value(name): decoder.named('types', name)
+    for name in data['typereg']['types']}
+  typereg._autotypes = {
+    decoder.value(name): decoder.named('autotypes', name)
+    for name in data['typereg']['autotypes']}
+  typereg._aliases   = {
+    decoder.value(name): set(decoder.value(sources))
+    for name, sources in data['typereg']['aliases'].items()}
+  typereg._indexAliases()
+  entries = [
+    entryClass(**{decoder.value(key): decoder.value(value)
+             for key, value in dentry.items() if key not in ENTRY_SKIP})
+    for dentry in data['entries']]
+  for entry, dentry in zip(entries, data['entries']):
+    if dentry.get('parent') is not None:
+      entry.parent = entries[dentry['parent']]
+    if dentry.get('methods') is not None:
+      entry.methods = [entries[idx] for idx in dentry['methods']]
+  catalog = DescriberCatalog(
+    endpoints = [entries[idx] for idx in data['endpoints']],
+    typereg   = typereg,
+    hash      = decoder.value(data.get('hash')),
+  )
+  return Snapshot(catalog, root=decoder.value(data.get('root')))
+
+#------------------------------------------------------------------------------
+def save(catalog, output, root=None):
+  '''
+  Writes a JSON snapshot of `catalog` to the file-like `output`.
+  '''
+  json.dump(dump(catalog, root=root), output, sort_keys=True, indent=1)
+
+#------------------------------------------------------------------------------
+def read(input, typereg, entryClass=Entry):
+  '''
+  Reads a JSON snapshot from the file-like `input` -- see :func:`load`.
+  '''
+  return load(json.load(input), typereg, entryClass=entryClass)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -213,12 +213,16 @@ def pyrdesc_doc_link_html_visit(self, node):
     atts['href'] = '#method-' + tag(link.path) + '-' + tag(link.method)
     atts['class'] += ' method'
   self.body.append(self.starttag(node, 'a', '', **atts))
-def pyrdesc_doc_link_html_depart(self, node):
+  # note: relative links are displayed resolved, i.e. the same as when
+  #       the document is rendered via reStructuredText. the text is
+  #       emitted directly (instead of replacing the children of
+  #       `node`) since the doctree may be shared and rendered again.
+  self.body.append(self.encode(':'.join(link.args)))
   self.body.append('</a>')
   if not isinstance(node.parent, nodes.TextElement):
     self.body.append('\n')
+  raise nodes.SkipNode
 HTMLTranslator.visit_pyrdesc_doc_link = pyrdesc_doc_link_html_visit
-HTMLTranslator.depart_pyrdesc_doc_link = pyrdesc_doc_link_html_depart
 
 #------------------------------------------------------------------------------
 # doc.type
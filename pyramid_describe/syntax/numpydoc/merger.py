@@ -268,11 +268,19 @@ def _mergeDocs(context, regs):
     reg.ref.doc = _moveCommonDoc(reg.ref.doc, reg.type.doc, common)
   return common
 
+#------------------------------------------------------------------------------
+def _equal(valA, valB):
+  # note: the types being merged are still being parsed, i.e. they
+  #       are neither interned (see `TypeRegistry.intern`) nor safe to
+  #       hash, so this only short-circuits identical objects and
+  #       otherwise does a full comparison.
+  return valA is valB or valA == valB
+
 #------------------------------------------------------------------------------
 def _mergeDictSameMode(context, typname, typA, typB):
   if typA is None or typB is None:
     return typA or typB or None
-  if typA == typB:
+  if _equal(typA, typB):
     return typA
   return Type(
     base=typA.base, name=typA.name, value=_mergeDictValue(typA.value, typB.value))
@@ -290,10 +298,10 @@ def _mergeDictValue(valA, valB):
   for attrname in attrnames:
     attrA = valA.get(attrname)
     attrB = valB.get(attrname)
-    if not attrA or not attrB or attrA == attrB:
+    if not attrA or not attrB or _equal(attrA, attrB):
       ret.append(attrA or attrB)
       continue
-    if attrA.type != attrB.type:
+    if not _equal(attrA.type, attrB.type):
       raise ValueError(
         'conflicting declaration of attribute "%s" type: %r != %r'
         % (attrname, attrA.type, attrB.type))
@@ -67,6 +67,24 @@ class TestDocref(test_helpers.TestHelper):
         'version' : getVersion('pyramid_describe'),
       }))
 
+  #----------------------------------------------------------------------------
+  def test_html_doctree_unchanged(self):
+    # rendering relative links as HTML must not modify the (shared)
+    # doctree, so that it can be rendered again
+    from docutils import nodes
+    from .. import doctree, rst
+    doc  = doctree.rst2document('See :doc.link:`GET:../b`.')
+    sect = nodes.section(dpath='/a/c')
+    sect.extend(doc.children)
+    doc[:] = [sect]
+    link = sect[0][1]
+    html = rst.publish_from_doctree(doc, writer_name='html')
+    self.assertIn(
+      '<a class="doc-link method" href="#method-2f612f62-474554">GET:/a/b</a>',
+      html)
+    self.assertEqual(link.astext(), 'GET:../b')
+    self.assertEqual(rst.publish_from_doctree(doc, writer_name='html'), html)
+
 #------------------------------------------------------------------------------
 # end of $Id$
 #------------------------------------------------------------------------------
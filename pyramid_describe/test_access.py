@@ -320,6 +320,80 @@ class TestAccess(TestHelper):
       '''
     )
 
+  #----------------------------------------------------------------------------
+  def test_reachable_types(self):
+    import json
+    from pyramid_controllers import Controller, expose
+    from .controller import DescribeController
+    class Controller(Controller):
+      @expose
+      def shape(self, request):
+        '''
+        Returns
+        -------
+        Shape
+          A shape.
+
+          sides : int
+          source : Source
+          author : Author, read-only
+        '''
+      @expose
+      def hidden(self, request):
+        '''
+        @INTERNAL: This is a hidden API.
+
+        Returns
+        -------
+        Secret
+          secret : str
+        '''
+
+    extensions = textwrap.dedent('''\
+      Author
+        @INTERNAL
+
+        name : str
+    ''')
+
+    def acl(request, *args, **kw):
+      return request.params.get('test-access', '').split(',')
+
+    def _root(**settings):
+      root = Controller()
+      root.desc = DescribeController(
+        root,
+        settings=dict({
+          'format.request': 'true',
+          'index-redirect': 'false',
+          'exclude': '|^/desc(/.*)?$|',
+          'access.control': acl,
+          'access.default.endpoint': 'public',
+          'access.default.type': 'public',
+        }, **settings))
+      root.desc.describer.typereg.loadExtensionString(extensions, '<test>')
+      return root
+
+    def _types(root, access):
+      res = self.send(root, '/desc/application.json?test-access=' + access)
+      return [typ['name'] for typ in json.loads(res.body)['application']['types']]
+
+    root = _root()
+    self.assertEqual(_types(root, 'public'), ['Shape', 'Source'])
+    self.assertEqual(
+      _types(root, 'public,internal'), ['Author', 'Secret', 'Shape', 'Source'])
+    rst = self.send(root, '/desc/application.rst?test-access=public').body
+    self.assertIn('Source', rst)
+    self.assertNotIn('Secret', rst)
+    wadl = self.send(root, '/desc/application.wadl?test-access=public').body
+    self.assertIn('name="Source"', wadl)
+    self.assertNotIn('Secret', wadl)
+    self.assertNotIn('Author', wadl)
+    # the previous behavior of rendering all registered types
+    root = _root(**{'type.reachable': 'false'})
+    self.assertEqual(
+      _types(root, 'public'), ['Author', 'Secret', 'Shape', 'Source'])
+
 
 #------------------------------------------------------------------------------
 # end of $Id$
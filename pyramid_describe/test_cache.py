@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import os
+import time
+import tempfile
+import threading
+import unittest
+
+from webtest import TestApp
+from pyramid_controllers import Controller, expose
+from pyramid_controllers.test_helpers import TestHelper
+
+from .cache import AnalysisCache, RenderCache, SingleFlight, Limiter
+from .cache import parseExpire, sourceFiles, fingerprint
+
+#------------------------------------------------------------------------------
+def traceCalls(obj, name):
+  '''
+  Wraps the method `name` of `obj` so that each call is recorded in
+  the returned list.
+  '''
+  calls = []
+  func  = getattr(obj, name)
+  def _trace(*args, **kw):
+    calls.append(1)
+    return func(*args, **kw)
+  setattr(obj, name, _trace)
+  return calls
+
+#------------------------------------------------------------------------------
+class Root(Controller):
+  @expose
+  def shape(self, request):
+    '''
+    Returns
+    -------
+    Shape
+      A shape.
+
+      sides : int
+      created : num, @INTERNAL
+    '''
+  @expose
+  def hidden(self, request):
+    '''
+    @INTERNAL: This is a hidden API.
+    '''
+
+settings_public = {
+  'access.default.endpoint' : 'public',
+  'access.default.type'     : 'public',
+}
+
+def acl(request, *args, **kw):
+  return request.params.get('test-access', '').split(',')
+
+settings_access = {
+  'format.request'          : 'true',
+  'format.default'          : 'rst',
+  'format.default.showLegend' : 'false',
+  'format.default.showMeta' : 'false',
+  'index-redirect'          : 'false',
+  'exclude'                 : '|^/desc(/.*)?$|',
+  'access.control'          : acl,
+  'access.default.endpoint' : 'public',
+  'access.default.type'     : 'public',
+}
+
+#------------------------------------------------------------------------------
+class TestAnalysisCache(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def test_parseExpire(self):
+    self.assertEqual(parseExpire(None), ('never', None))
+    self.assertEqual(parseExpire('never'), ('never', None))
+    self.assertEqual(parseExpire('fingerprint'), ('fingerprint', None))
+    self.assertEqual(parseExpire('30'), ('ttl', 30))
+    with self.assertRaises(ValueError):
+      parseExpire('sometimes')
+
+  #----------------------------------------------------------------------------
+  def test_get(self):
+    calls = []
+    def factory():
+      calls.append(1)
+      return len(calls)
+    cache = AnalysisCache()
+    self.assertEqual(cache.get('a', factory), 1)
+    self.assertEqual(cache.get('a', factory), 1)
+    self.assertEqual(cache.get('b', factory), 2)
+    cache.clear()
+    self.assertEqual(cache.get('a', factory), 3)
+
+  #----------------------------------------------------------------------------
+  def test_disabled(self):
+    calls = []
+    def factory():
+      calls.append(1)
+      return len(calls)
+    cache = AnalysisCache(enabled=False)
+    self.assertEqual(cache.get('a', factory), 1)
+    self.assertEqual(cache.get('a', factory), 2)
+
+  #----------------------------------------------------------------------------
+  def test_expire_ttl(self):
+    calls = []
+    def factory():
+      calls.append(1)
+      return len(calls)
+    cache = AnalysisCache(expire='0.05')
+    self.assertEqual(cache.get('a', factory), 1)
+    self.assertEqual(cache.get('a', factory), 1)
+    time.sleep(0.1)
+    self.assertEqual(cache.get('a', factory), 2)
+
+  #----------------------------------------------------------------------------
+  def test_expire_fingerprint(self):
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+      calls = []
+      def factory():
+        calls.append(1)
+        return len(calls)
+      cache = AnalysisCache(expire='fingerprint', sources=lambda val: [path])
+      self.assertEqual(cache.get('a', factory), 1)
+      self.assertEqual(cache.get('a', factory), 1)
+      mtime = os.stat(path).st_mtime
+      os.utime(path, (mtime + 10, mtime + 10))
+      self.assertEqual(cache.get('a', factory), 2)
+      self.assertEqual(cache.get('a', factory), 2)
+    finally:
+      os.unlink(path)
+
+  #----------------------------------------------------------------------------
+  def test_concurrent(self):
+    # different keys must be generated in parallel, while concurrent
+    # requests for the same key must only invoke the factory once.
+    started = threading.Event()
+    release = threading.Event()
+    calls   = []
+    def slow():
+      calls.append('a')
+      started.set()
+      release.wait(5)
+      return 'A'
+    cache   = AnalysisCache()
+    results = []
+    threads = [
+      threading.Thread(target=lambda: results.append(cache.get('a', slow)))
+      for idx in range(3)]
+    threads[0].start()
+    self.assertTrue(started.wait(5))
+    for thread in threads[1:]:
+      thread.start()
+    other = threading.Thread(
+      target=lambda: results.append(cache.get('b', lambda: 'B')))
+    other.start()
+    other.join(5)
+    self.assertEqual(results, ['B'])
+    release.set()
+    for thread in threads:
+      thread.join(5)
+    self.assertEqual(results, ['B', 'A', 'A', 'A'])
+    self.assertEqual(calls, ['a'])
+
+  #----------------------------------------------------------------------------
+  def test_sourceFiles(self):
+    self.assertEqual(
+      sourceFiles([Root(), Root, Root().shape]),
+      [os.path.splitext(__file__)[0] + '.py'])
+    self.assertEqual(fingerprint([]), ())
+
+#------------------------------------------------------------------------------
+class TestRenderCache(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def test_lru(self):
+    cache = RenderCache(maxsize=10)
+    cache.put('a', 'A', 4)
+    cache.put('b', 'B', 4)
+    self.assertEqual(cache.get('a'), 'A')
+    cache.put('c', 'C', 4)
+    self.assertEqual(cache.get('b'), None)
+    self.assertEqual(cache.get('a'), 'A')
+    self.assertEqual(cache.get('c'), 'C')
+    self.assertEqual(cache.size, 8)
+    self.assertEqual((cache.hits, cache.misses), (3, 1))
+    cache.put('d', 'D', 11)
+    self.assertEqual(cache.get('d'), None)
+    self.assertEqual(len(cache), 2)
+    cache.clear()
+    self.assertEqual((len(cache), cache.size), (0, 0))
+
+  #----------------------------------------------------------------------------
+  def test_disabled(self):
+    cache = RenderCache(enabled=False)
+    cache.put('a', 'A', 1)
+    self.assertEqual(cache.get('a'), None)
+
+#------------------------------------------------------------------------------
+class TestConcurrency(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def test_singleflight(self):
+    flight  = SingleFlight()
+    started = threading.Event()
+    proceed = threading.Event()
+    calls   = []
+    def work():
+      calls.append(1)
+      started.set()
+      proceed.wait()
+      return 'result'
+    results = []
+    def run():
+      results.append(flight.do('key', work))
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=run) for idx in range(3)]
+    for thread in followers:
+      thread.start()
+    time.sleep(0.05)
+    proceed.set()
+    for thread in [leader] + followers:
+      thread.join()
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(results, ['result'] * 4)
+    self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+  #----------------------------------------------------------------------------
+  def test_singleflight_error(self):
+    flight = SingleFlight()
+    def fail():
+      raise ValueError('boom')
+    with self.assertRaises(ValueError):
+      flight.do('key', fail)
+    self.assertEqual(flight.do('key', lambda: 'ok'), 'ok')
+
+  #----------------------------------------------------------------------------
+  def test_limiter(self):
+    limiter = Limiter(2)
+    self.assertTrue(limiter.acquire())
+    self.assertTrue(limiter.acquire())
+    self.assertFalse(limiter.acquire(timeout=0.01))
+    limiter.release()
+    self.assertTrue(limiter.acquire(timeout=0.01))
+    self.assertTrue(Limiter(0).acquire(timeout=0))
+
+#------------------------------------------------------------------------------
+class TestDescriberCache(TestHelper):
+
+  #----------------------------------------------------------------------------
+  def test_analysis_reused(self):
+    from .describer import Describer
+    desc = Describer(settings=settings_public)
+    calls = traceCalls(desc, '_analyze')
+    root = Root()
+    cat1 = desc.analyze(root)
+    cat2 = desc.analyze(root)
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(
+      [e.path for e in cat1.endpoints], [e.path for e in cat2.endpoints])
+    self.assertIsNot(cat1.endpoints[0], cat2.endpoints[0])
+    self.assertIsNot(cat1.typereg, cat2.typereg)
+    self.assertIsNot(cat1.typereg, desc.typereg)
+    desc.clearCache()
+    desc.analyze(root)
+    self.assertEqual(len(calls), 2)
+
+  #----------------------------------------------------------------------------
+  def test_analysis_disabled(self):
+    from .describer import Describer
+    desc = Describer(settings=dict(settings_public, **{'cache.analysis': 'false'}))
+    calls = traceCalls(desc, '_analyze')
+    root = Root()
+    desc.analyze(root)
+    desc.analyze(root)
+    self.assertEqual(len(calls), 2)
+
+  #----------------------------------------------------------------------------
+  def test_clone_preserves_type_references(self):
+    from .describer import Describer
+    desc = Describer(settings=settings_public)
+    catalog = desc.analyze(Root())
+    shape = [e for e in catalog.endpoints if e.path == '/shape'][0]
+    self.assertIs(shape.returns, catalog.typereg.get('Shape'))
+
+  #----------------------------------------------------------------------------
+  def test_clone_shares_unmodified_types(self):
+    from .describer import Describer
+    desc = Describer(settings=settings_public)
+    view = Root()
+    catalog = desc.analyze(view)
+    master = desc.getAnalysis(view, format='rst', root='/').value.typereg
+    # the filtered type is a private copy...
+    self.assertEqual(
+      [ref.name for ref in catalog.typereg.get('Shape').value], ['sides'])
+    self.assertEqual(
+      [ref.name for ref in master.peek('Shape').value], ['sides', 'created'])
+    # ... but the unmodified ones are shared with the cached analysis
+    self.assertIs(
+      catalog.typereg.peek('HTTPForbidden'), master.peek('HTTPForbidden'))
+
+  #----------------------------------------------------------------------------
+  def test_filtering_does_not_leak(self):
+    from .controller import DescribeController
+    root = Root()
+    root.desc = DescribeController(root, settings=settings_access)
+    public = self.send(root, '/desc?test-access=public').body
+    self.assertNotIn('/hidden', public)
+    self.assertNotIn('created', public)
+    internal = self.send(root, '/desc?test-access=public,internal').body
+    self.assertIn('/hidden', internal)
+    self.assertIn('created', internal)
+    self.assertEqual(self.send(root, '/desc?test-access=public').body, public)
+
+  #----------------------------------------------------------------------------
+  def test_render_cache(self):
+    from .controller import DescribeController
+    root = Root()
+    root.desc = DescribeController(
+      root, settings=dict(settings_access, **{'format.request': 'showInfo'}))
+    calls = traceCalls(root.desc.describer, 'describe')
+    res1 = self.send(root, '/desc?test-access=public')
+    res2 = self.send(root, '/desc?test-access=public&showInfo=true')
+    self.assertEqual(len(calls), 2)
+    self.assertEqual(res1.content_type, 'text/x-rst')
+    # `foo` is not a whitelisted request option, and `test-access` is
+    # only relevant via the access groups
+    res3 = self.send(root, '/desc?test-access=public&foo=bar')
+    self.assertEqual(len(calls), 2)
+    self.assertEqual(res3.body, res1.body)
+    self.assertEqual(res3.content_type, 'text/x-rst')
+    self.send(root, '/desc?test-access=internal')
+    self.assertEqual(len(calls), 3)
+    root.desc.describer.clearCache()
+    self.send(root, '/desc?test-access=public')
+    self.assertEqual(len(calls), 4)
+
+  #----------------------------------------------------------------------------
+  def test_render_cache_size(self):
+    # the size of rendered text is measured in bytes, not characters
+    from .controller import DescribeController
+    from .util import adict
+    root = Root()
+    root.desc = DescribeController(root, settings=settings_access)
+    def _describe(*args, **kw):
+      return adict(
+        content=u'caf\u00e9 \u2615', content_type='text/plain',
+        charset='UTF-8', app_iter=None)
+    root.desc.describer.describe = _describe
+    res = self.send(root, '/desc?test-access=public')
+    self.assertEqual(res.text, u'caf\u00e9 \u2615')
+    self.assertEqual(len(root.desc.rcache), 1)
+    self.assertEqual(root.desc.rcache.size, 9)
+
+  #----------------------------------------------------------------------------
+  def test_render_cache_analysis_disabled(self):
+    from .controller import DescribeController
+    root = Root()
+    root.desc = DescribeController(
+      root, settings=dict(settings_access, **{'cache.analysis': 'false'}))
+    self.assertFalse(root.desc.rcache.enabled)
+    res1 = self.send(root, '/desc?test-access=public')
+    self.assertIn('/shape', res1.body)
+    self.assertNotIn('/extra', res1.body)
+    @expose
+    def extra(request):
+      'An endpoint added after the first rendering.'
+    root.extra = extra
+    res2 = self.send(root, '/desc?test-access=public')
+    self.assertIn('/extra', res2.body)
+    self.assertEqual(len(root.desc.rcache), 0)
+    self.assertEqual(root.desc.rcache.size, 0)
+
+  #----------------------------------------------------------------------------
+  def test_conditional_get(self):
+    from .controller import DescribeController
+    root = Root()
+    root.desc = DescribeController(
+      root, settings=dict(settings_access, **{'cache.render': 'false'}))
+    calls = traceCalls(root.desc.describer, 'describe')
+    app = TestApp(self.makeApp(root))
+    res = app.get('/desc?test-access=public')
+    self.assertEqual(res.status_code, 200)
+    etag = res.headers['ETag']
+    self.assertTrue(res.headers['Last-Modified'])
+    self.assertEqual(len(calls), 1)
+    res = app.get('/desc?test-access=public', headers={'If-None-Match': etag})
+    self.assertEqual(res.status_code, 304)
+    self.assertEqual(res.body, '')
+    self.assertEqual(len(calls), 1)
+    res = app.get('/desc?test-access=public',
+                  headers={'If-Modified-Since': res.headers['Last-Modified']})
+    self.assertEqual(res.status_code, 304)
+    self.assertEqual(len(calls), 1)
+    res = app.get('/desc?test-access=internal', headers={'If-None-Match': etag})
+    self.assertEqual(res.status_code, 200)
+    self.assertNotEqual(res.headers['ETag'], etag)
+    self.assertEqual(len(calls), 2)
+    # the etag is determined by the content, not the analysis instance
+    root.desc.describer.clearCache()
+    res = app.get('/desc?test-access=public', headers={'If-None-Match': etag})
+    self.assertEqual(res.status_code, 304)
+    # the output depends on the access groups
+    self.assertIn('private', res.headers['Cache-Control'])
+
+  #----------------------------------------------------------------------------
+  def test_conditional_get_config(self):
+    from .controller import DescribeController
+    def _etag(**settings):
+      root = Root()
+      root.desc = DescribeController(
+        root, settings=dict(settings_access, **settings))
+      res = TestApp(self.makeApp(root)).get('/desc?test-access=public')
+      return res.headers['ETag'], res.headers.get('Cache-Control')
+    etag, cache = _etag()
+    self.assertEqual(_etag(), (etag, cache))
+    # the etag changes when only the configuration changes
+    self.assertNotEqual(_etag(**{'format.default.showLegend': 'true'})[0], etag)
+    self.assertNotEqual(_etag(**{'format.rst.override.showInfo': 'false'})[0], etag)
+    # without access control, the output can be shared by caches
+    root = Root()
+    root.desc = DescribeController(root, settings=settings_public)
+    res = TestApp(self.makeApp(root)).get('/desc')
+    self.assertNotIn('private', res.headers.get('Cache-Control', ''))
+
+  #----------------------------------------------------------------------------
+  def test_render_concurrency_limit(self):
+    from .controller import DescribeController
+    root = Root()
+    root.desc = DescribeController(root, settings=dict(settings_access, **{
+      'render.concurrency'         : '1',
+      'render.concurrency.formats' : 'rst',
+      'render.concurrency.timeout' : '0',
+    }))
+    self.assertEqual(self.send(root, '/desc?test-access=public').status_code, 200)
+    root.desc.limiter.acquire()
+    self.assertEqual(self.send(root, '/desc?test-access=internal').status_code, 503)
+    # cached renderings are not subject to the limit
+    self.assertEqual(self.send(root, '/desc?test-access=public').status_code, 200)
+    root.desc.limiter.release()
+    self.assertEqual(self.send(root, '/desc?test-access=internal').status_code, 200)
+
+  #----------------------------------------------------------------------------
+  def test_warmup(self):
+    from pyramid.config import Configurator
+    from .controller import DescribeController
+    instances = []
+    class RecordingController(DescribeController):
+      def __init__(self, *args, **kw):
+        super(RecordingController, self).__init__(*args, **kw)
+        instances.append(self)
+    config = Configurator(settings={
+      'describe.class'                    : RecordingController,
+      'describe.attach'                   : '/desc',
+      'describe.exclude'                  : '|^/desc(/.*)?$|',
+      'describe.access.default.endpoint'  : 'public',
+      'describe.access.default.type'      : 'public',
+      'describe.warmup'                   : 'rst txt?showLegend=false',
+    })
+    config.include('pyramid_describe')
+    config.add_controller('root', '/', Root())
+    app = TestApp(config.make_wsgi_app())
+    self.assertEqual(len(instances), 1)
+    desc = instances[0]
+    self.assertEqual(len(desc.rcache), 2)
+    self.assertEqual(desc.rcache.hits, 0)
+    res = app.get('/desc/application.rst')
+    self.assertIn('/shape', res.body)
+    self.assertEqual(desc.rcache.hits, 1)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
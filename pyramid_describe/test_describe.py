@@ -32,6 +32,7 @@ from pyramid_controllers.util import getVersion
 from pyramid_describe.util import adict
 from pyramid_describe.rst import AsIs
 from pyramid_describe.controller import DescribeController
+from pyramid_describe.describer import Describer
 from pyramid_describe.typereg import Type, TypeRef
 
 #------------------------------------------------------------------------------
@@ -125,6 +126,122 @@ settings_minRst = {
   'access.default.endpoint': 'public',
 }
 
+#------------------------------------------------------------------------------
+def addTypes(catalog, count):
+  '''
+  Registers `count` generated dict types in the `catalog`\'s type
+  registry (each one referencing an earlier one), and sets the
+  `params` and `returns` of all methods to reference them.
+  '''
+  from .describer import _allEntries
+  from .typereg import Type, TypeRef
+  typereg = catalog.typereg
+  types   = []
+  for idx in range(count):
+    value = [
+      TypeRef(name='id', type=typereg.parseType('int'), doc='The ID.'),
+      TypeRef(name='name', type=typereg.parseType('str'), doc='The name.'),
+    ]
+    if types:
+      value.append(TypeRef(name='parent', type=types[idx // 2], doc='The parent.'))
+    typ = Type(base=Type.DICT, name='Type%d' % (idx,), doc='A type.', value=value)
+    typereg.registerType(typ)
+    types.append(typ)
+  methods = [entry for entry in _allEntries(catalog.endpoints) if entry.isMethod]
+  for idx, entry in enumerate(methods):
+    entry.params  = TypeRef(type=types[idx % count])
+    entry.returns = TypeRef(type=Type(
+      base=Type.COMPOUND, name=Type.LIST, value=types[( idx + 1 ) % count]))
+  # the rendered types are derived from the endpoints (see
+  # `Describer._makeDescriberCatalog`), and must therefore be updated.
+  if catalog.get('typegraph') is not None:
+    catalog.types = ( catalog.types or [] ) + types
+    catalog.typegraph = catalog.describer._getTypeGraph(catalog)
+  return catalog
+
+#------------------------------------------------------------------------------
+def makeDocApp(size):
+  '''
+  Returns a generated controller tree with `size` RESTful collection
+  and item controllers (i.e. ``/c{N}`` and ``/c{N}/item``), whose
+  methods declare identical numpydoc parameter, return value and
+  exception shapes, for a total of ``7 * size + 1`` entries.
+  '''
+  shape = '''
+    :Parameters:
+
+    name : str
+
+      The name.
+
+    size : int, optional, default: 1
+
+      The size.
+
+    tags : list(str), optional
+
+      The tags.
+
+    :Returns:
+
+    dict
+
+      id : int
+
+        The ID.
+
+      state : ( "new" | "done" )
+
+        The state.
+
+    :Raises:
+
+    HTTPNotFound
+
+      The item does not exist.
+  '''
+  class Item(RestController):
+    'An item.'
+    @expose
+    def get(self, request):
+      pass
+    get.__doc__ = 'Returns the item.\n' + shape
+    @expose
+    def put(self, request):
+      pass
+    put.__doc__ = 'Updates the item.\n' + shape
+  class Items(RestController):
+    'A collection of items.'
+    @expose
+    def get(self, request):
+      pass
+    get.__doc__ = 'Lists the items.\n' + shape
+    @expose
+    def post(self, request):
+      pass
+    post.__doc__ = 'Creates an item.\n' + shape
+  class Root(Controller):
+    'The root.'
+  root = Root()
+  for idx in range(size):
+    items = Items()
+    items.item = Item()
+    setattr(root, 'c%d' % (idx,), items)
+  return root
+
+#------------------------------------------------------------------------------
+class TracingDescriber(Describer):
+  '''
+  A Describer that records the path of each decorated entry in `paths`.
+  '''
+  def __init__(self, *args, **kw):
+    super(TracingDescriber, self).__init__(*args, **kw)
+    self.paths = []
+  def decorateEntry(self, options, entry):
+    entry = super(TracingDescriber, self).decorateEntry(options, entry)
+    self.paths.append(entry.path)
+    return entry
+
 #------------------------------------------------------------------------------
 def pdfClean(pdf):
   pdf = re.sub(
@@ -507,6 +624,380 @@ class DescribeTest(TestHelper, pxml.XmlTestMixin):
 └── unknown/?       # A dynamically generated sub-controller.
 ''')
 
+  #----------------------------------------------------------------------------
+  def test_inspect_and_include(self):
+    ## The `inspect` and `include` parameters can be combined
+    root = SimpleRoot()
+    root.desc = DescribeController(
+      root, doc='URL tree description.',
+      settings={
+        'formats': 'txt',
+        'index-redirect': 'false',
+        'inspect': '/rest/',
+        'include': '|^/rest(/.*)?$| |^/sub(/.*)?$|',
+        'access.default.endpoint': 'public',
+      })
+    self.assertResponse(self.send(root, '/desc'), 200, '''\
+/
+└── rest            # A RESTful entry.
+    ├── <POST>      # Creates a new entry.
+    ├── <GET>       # Gets the current value.
+    ├── <PUT>       # Updates the value.
+    └── <DELETE>    # Deletes the entry.
+''')
+
+  #----------------------------------------------------------------------------
+  def test_traversal_pruning(self):
+    ## Subtrees that cannot match `inspect`, `include` or `exclude` are
+    ## never traversed
+    from .reparse import literalPrefix, subtreePrefix
+    self.assertEqual(literalPrefix('^/api/v2(/.*)?$'), '/api/v2')
+    self.assertEqual(literalPrefix(r'^/a\.b?c'), '/a.')
+    self.assertEqual(literalPrefix('^/a|/b'), None)
+    self.assertEqual(literalPrefix('/a'), None)
+    self.assertEqual(literalPrefix(re.compile('^/a', re.IGNORECASE)), None)
+    self.assertEqual(subtreePrefix('^/desc(/.*)?$'), '/desc')
+    self.assertEqual(subtreePrefix('^/desc/.*$'), None)
+    desc = TracingDescriber(settings={
+      'inspect': '/sub', 'access.default.endpoint': 'public'})
+    self.assertEqual(
+      [e.path for e in desc.analyze(SimpleRoot()).endpoints], ['/sub/method'])
+    self.assertEqual(desc.paths, ['/', '/sub', '/sub/method'])
+    desc = TracingDescriber(settings={
+      'include': '|^/sw|', 'exclude': '|^/rest(/.*)?$|',
+      'access.default.endpoint': 'public'})
+    self.assertEqual(
+      [e.path for e in desc.analyze(SimpleRoot()).endpoints], ['/swi'])
+    self.assertEqual(desc.paths, ['/', '/swi'])
+    self.assertFalse(desc.isPrunable('/'))
+    self.assertTrue(desc.isPrunable('/sub'))
+    self.assertFalse(desc.isPrunable('/swi/deeper'))
+
+  #----------------------------------------------------------------------------
+  def test_shared_subtrees(self):
+    ## Controllers mounted at multiple paths are only decorated once
+    class Mount(Controller):
+      'A mounted controller.'
+      rest = Rest()
+    class Root(Controller):
+      'The root.'
+      a = b = Mount()
+    desc = TracingDescriber(settings={'access.default.endpoint': 'public'})
+    endpoints = desc.analyze(Root()).endpoints
+    self.assertEqual(
+      sorted(e.path for e in endpoints), ['/a/rest', '/b/rest'])
+    self.assertEqual(sorted(desc.paths), sorted([
+      '/', '/a', '/a/rest', '/b',
+      '/a/rest?_method=GET', '/a/rest?_method=PUT',
+      '/a/rest?_method=POST', '/a/rest?_method=DELETE']))
+    brest = [e for e in endpoints if e.path == '/b/rest'][0]
+    self.assertEqual(brest.id, 'endpoint-2f622f72657374')
+    self.assertEqual(
+      sorted(m.path for m in brest.methods), [
+        '/b/rest?_method=DELETE', '/b/rest?_method=GET',
+        '/b/rest?_method=POST', '/b/rest?_method=PUT'])
+    arest = [e for e in endpoints if e.path == '/a/rest'][0]
+    for ameth, bmeth in zip(arest.methods, brest.methods):
+      self.assertIs(bmeth.parent, brest)
+      self.assertIsNot(bmeth, ameth)
+      self.assertEqual(bmeth.doc, ameth.doc)
+
+  #----------------------------------------------------------------------------
+  def test_shared_subtrees_parents(self):
+    ## Controllers mounted under different parents are only parsed once
+    from .syntax.numpydoc import plugin
+    class Prefs(RestController):
+      'The preferences.'
+      @expose
+      def get(self, request):
+        '''
+        Returns the preferences.
+
+        :Returns:
+
+        dict
+
+          theme : str
+        '''
+    class Users(Controller):
+      'The users.'
+    class Root(Controller):
+      'The root.'
+    prefs = Prefs()
+    root = Root()
+    root.users = Users()
+    root.me = Users()
+    root.users.prefs = root.me.prefs = prefs
+    docs  = []
+    parse = plugin.FixedNumpyDocString
+    def _parse(doc, *args, **kw):
+      docs.append(doc)
+      return parse(doc, *args, **kw)
+    plugin.FixedNumpyDocString = _parse
+    try:
+      desc = TracingDescriber(settings={'access.default.endpoint': 'public'})
+      endpoints = desc.analyze(root).endpoints
+    finally:
+      plugin.FixedNumpyDocString = parse
+    self.assertEqual(
+      sorted(e.path for e in endpoints), ['/me/prefs', '/users/prefs'])
+    self.assertEqual(sorted(desc.paths), [
+      '/', '/me', '/me/prefs', '/me/prefs?_method=GET', '/users'])
+    self.assertEqual(len([doc for doc in docs if 'Returns the' in doc]), 1)
+    uprefs, mprefs = sorted(endpoints, key=lambda e: e.path, reverse=True)
+    self.assertEqual(mprefs.id, 'endpoint-2f6d652f7072656673')
+    self.assertEqual(mprefs.methods[0].path, '/me/prefs?_method=GET')
+    self.assertIs(mprefs.methods[0].parent, mprefs)
+    self.assertEqual(mprefs.methods[0].doc, uprefs.methods[0].doc)
+    self.assertEqual(mprefs.methods[0].returns, uprefs.methods[0].returns)
+    self.assertIsNot(mprefs.methods[0].returns, uprefs.methods[0].returns)
+
+  #----------------------------------------------------------------------------
+  def test_shared_subtrees_disabled(self):
+    ## Every mount point is decorated and parsed if `entry.shared` is off
+    class Mount(Controller):
+      'A mounted controller.'
+      rest = Rest()
+    class Root(Controller):
+      'The root.'
+      a = b = Mount()
+    desc = TracingDescriber(settings={
+      'access.default.endpoint': 'public', 'entry.shared': 'false'})
+    endpoints = desc.analyze(Root()).endpoints
+    self.assertEqual(
+      sorted(e.path for e in endpoints), ['/a/rest', '/b/rest'])
+    self.assertEqual(sorted(set(desc.paths)), sorted([
+      '/', '/a', '/a/rest', '/b', '/b/rest',
+      '/a/rest?_method=GET', '/a/rest?_method=PUT',
+      '/a/rest?_method=POST', '/a/rest?_method=DELETE',
+      '/b/rest?_method=GET', '/b/rest?_method=PUT',
+      '/b/rest?_method=POST', '/b/rest?_method=DELETE']))
+
+  #----------------------------------------------------------------------------
+  def test_circular_references(self):
+    ## Circular controller references are reported, but not descended
+    from .describer import Describer
+    loop = Sub()
+    loop.again = loop
+    class Root(Controller):
+      'The root.'
+      back = None
+    root = Root()
+    root.loop = loop
+    loop.root = root
+    desc = Describer(settings={
+      'access.default.endpoint': 'public',
+      'format.default.showBranches': 'true'})
+    endpoints = desc.analyze(root).endpoints
+    self.assertEqual(
+      sorted((e.path, bool(e.isCycle)) for e in endpoints), [
+        ('/', False),
+        ('/loop', False),
+        ('/loop/again', True),
+        ('/loop/method', False),
+        ('/loop/root', True),
+      ])
+
+  #----------------------------------------------------------------------------
+  def test_entry_ancestry(self):
+    from .entry import Entry
+    root = Entry(name='').setAncestry()
+    node = Entry(name='a', parent=root).setAncestry()
+    leaf = Entry(name='b', parent=node).setAncestry()
+    self.assertEqual([root.depth, node.depth, leaf.depth], [0, 1, 2])
+    self.assertEqual([e.name for e in leaf.parents], ['a', ''])
+    self.assertEqual([e.name for e in leaf.rparents], ['', 'a'])
+    self.assertEqual(list(root.parents), [])
+    # a changed parent invalidates the cached chain
+    leaf.parent = root
+    self.assertEqual([e.name for e in leaf.parents], [''])
+    self.assertEqual(Entry(leaf).depth, 2)
+    self.assertEqual(Entry(leaf).setAncestry().depth, 1)
+
+  #----------------------------------------------------------------------------
+  def test_maxdepth(self):
+    ## The `maxdepth` option is applied to deep controller trees
+    from .describer import Describer
+    class Node(Controller):
+      @expose
+      def leaf(self, request):
+        'A leaf.'
+    root = node = Node()
+    for idx in range(30):
+      node.child = Node()
+      node = node.child
+    desc = Describer(settings={
+      'access.default.endpoint': 'public', 'format.default.maxdepth': '5'})
+    self.assertEqual(
+      [(e.path, e.depth) for e in desc.analyze(root).endpoints], [
+        ('/child/child/child/child/leaf', 5),
+        ('/child/child/child/leaf', 4),
+        ('/child/child/leaf', 3),
+        ('/child/leaf', 2),
+        ('/leaf', 1),
+      ])
+    desc = Describer(settings={'access.default.endpoint': 'public'})
+    self.assertEqual(len(desc.analyze(root).endpoints), 31)
+
+  #----------------------------------------------------------------------------
+  def test_tree_entries(self):
+    ## The tree nodes are separate from (and do not modify) the entries
+    from .describer import Describer
+    desc = Describer(settings={'access.default.endpoint': 'public'})
+    catalog = desc.analyze(SimpleRoot())
+    def _tree():
+      return [
+        (node.path, node.real, node.last, len(node.children),
+         [p.path for p in node.rparents])
+        for node in catalog.tree_entries]
+    tree = _tree()
+    self.assertEqual(tree, [
+      ('/', True, False, 4, []),
+      ('/rest', True, False, 4, ['/']),
+      ('/rest?_method=POST', True, False, 0, ['/', '/rest']),
+      ('/rest?_method=GET', True, False, 0, ['/', '/rest']),
+      ('/rest?_method=PUT', True, False, 0, ['/', '/rest']),
+      ('/rest?_method=DELETE', True, True, 0, ['/', '/rest']),
+      ('/sub', False, False, 1, ['/']),
+      ('/sub/method', True, True, 0, ['/', '/sub']),
+      ('/swi', True, False, 0, ['/']),
+      ('/unknown', True, True, 0, ['/']),
+    ])
+    self.assertEqual(_tree(), tree)
+    for entry in catalog.endpoints:
+      self.assertNotIn('_dreal', entry)
+      self.assertNotIn('_dchildren', entry)
+    # templates can still set attributes (as they used to on the entries)
+    node = catalog.tree_entries[1]
+    node._dline = '|--'
+    node._dlast = True
+    self.assertEqual(node._dline, '|--')
+    self.assertTrue(node.last)
+    self.assertEqual(node.doc, node.entry.doc)
+    self.assertNotIn('_dline', node.entry)
+
+  #----------------------------------------------------------------------------
+  def test_structure_shared_types(self):
+    ## Types referenced by multiple endpoints are rendered correctly
+    from .describer import Describer
+    from .test_entry import makeApp
+    desc = Describer(settings={'access.default.endpoint': 'public'})
+    catalog = addTypes(desc.analyze(makeApp(2)), 3)
+    data = json.loads(desc.render(catalog, format='json'))
+    self.assertEqual(
+      [t['name'] for t in data['application']['types']],
+      ['Type0', 'Type1', 'Type2'])
+    params = [m['params'] for e in data['application']['endpoints']
+              for m in e.get('methods', [])]
+    self.assertEqual(len(params), 10)
+    self.assertEqual(params[0], params[3])
+    self.assertNotIn('&id', desc.render(catalog, format='yaml'))
+    xml = desc.render(catalog, format='xml')
+    self.assertEqual(xml.count('<doc>The parent.</doc>'), 2)
+
+  #----------------------------------------------------------------------------
+  def test_intern_types(self):
+    ## Identical endpoint types are shared, without changing the output
+    from .describer import Describer
+    # interning changes the entry filter contract, and is opt-in
+    self.assertFalse(Describer().internTypes)
+    app = makeDocApp(2)
+    out = []
+    for intern in (False, True):
+      desc = Describer(settings={
+        'type.intern': intern, 'access.default.endpoint': 'public'})
+      catalog = desc.analyze(app)
+      methods = [m for e in catalog.endpoints for m in e.methods or []]
+      self.assertEqual(len(methods), 8)
+      for channel in ('params', 'returns', 'raises'):
+        self.assertEqual(
+          len(set(id(getattr(m, channel)) for m in methods)), 1 if intern else 8)
+      out.append([desc.render(catalog, format=fmt) for fmt in ('json', 'yaml', 'rst')])
+    self.assertEqual(out[0], out[1])
+    self.assertNotIn('&id', out[1][1])
+
+  #----------------------------------------------------------------------------
+  def test_stream_json(self):
+    ## Streamed JSON is identical to the rendered JSON
+    from .describer import Describer
+    from .test_entry import makeApp
+    desc = Describer(settings={'access.default.endpoint': 'public'})
+    catalog = addTypes(desc.analyze(makeApp(20)), 5)
+    chunks = list(desc.stream_json(catalog, chunkSize=1024))
+    self.assertGreater(len(chunks), 5)
+    self.assertEqual(b''.join(chunks), desc.render(catalog, format='json'))
+    catalog.endpoints = []
+    self.assertEqual(
+      b''.join(desc.stream_json(catalog)), desc.render(catalog, format='json'))
+
+  #----------------------------------------------------------------------------
+  def test_stream_yaml(self):
+    ## Streamed YAML is identical to the rendered YAML
+    from .describer import Describer, PyYamlDumper, CYamlDumper
+    from .test_entry import makeApp
+    desc = Describer(settings={'access.default.endpoint': 'public'})
+    catalog = addTypes(desc.analyze(makeApp(20)), 5)
+    catalog.endpoints[0].doc = 'A long line that must be wrapped. ' * 10
+    for dumper in filter(None, (PyYamlDumper, CYamlDumper)):
+      desc.yamlDumper = dumper
+      chunks = list(desc.stream_yaml(catalog, chunkSize=1024))
+      self.assertGreater(len(chunks), 5)
+      self.assertEqual(b''.join(chunks), desc.render(catalog, format='yaml'))
+      self.assertEqual(
+        yaml.safe_load(b''.join(chunks)),
+        json.loads(desc.render(catalog, format='json')))
+    catalog.endpoints = []
+    self.assertEqual(
+      b''.join(desc.stream_yaml(catalog)), desc.render(catalog, format='yaml'))
+
+  #----------------------------------------------------------------------------
+  def test_render_yaml_compatible(self):
+    ## YAML is rendered like `yaml.dump`, including non-plain values
+    from .describer import Describer, PyYamlDumper, CYamlDumper
+    from .test_entry import makeApp
+    desc = Describer(settings={'access.default.endpoint': 'public'})
+    catalog = desc.analyze(makeApp(1))
+    catalog.endpoints[0].doc = u'A unicode docstring.'
+    catalog.endpoints[0].extra = dict(custom=adict(key='value'))
+    dumpers = ((PyYamlDumper, yaml.Dumper), (CYamlDumper, yaml.CDumper))
+    for dumper, base in dumpers:
+      if dumper is None:
+        continue
+      desc.yamlDumper = dumper
+      out = desc.render(catalog, format='yaml')
+      self.assertIn('!!python/unicode', out)
+      self.assertIn('key: value', out)
+      self.assertEqual(
+        out, yaml.dump(desc.structure_render(catalog), Dumper=base))
+
+  #----------------------------------------------------------------------------
+  def test_stream_json_response(self):
+    ## The `render.stream` option streams the response
+    settings = {
+      'formats': 'json txt',
+      'index-redirect': 'false',
+      'exclude': '|^/desc(/.*)?$|',
+      'access.default.endpoint': 'public',
+    }
+    root = SimpleRoot()
+    root.desc = DescribeController(root, doc='URL tree description.',
+                                   settings=settings)
+    chk = self.send(root, '/desc/application.json')
+    res = root.desc.describer.describe(
+      root, format='json', root='/', stream=True)
+    self.assertIsNone(res.content)
+    self.assertEqual(res.content_type, 'application/json')
+    root = SimpleRoot()
+    root.desc = DescribeController(root, doc='URL tree description.',
+                                   settings=dict(settings, **{'render.stream': 'json txt'}))
+    res = self.send(root, '/desc/application.json')
+    self.assertEqual(res.status_code, 200)
+    self.assertEqual(res.content_type, 'application/json')
+    self.assertEqual(res.body, chk.body)
+    self.assertEqual(len(root.desc.rcache), 0)
+    self.send(root, '/desc/application.txt')
+    self.assertEqual(len(root.desc.rcache), 1)
+
   #----------------------------------------------------------------------------
   @staticmethod
   def custom_filter(entry, options):
@@ -1831,9 +2322,7 @@ body {{
      </div>
      <div class="section source-pyramid-httpexceptions typereg-type" id="typereg-type-48545450556e617574686f72697a6564">
       <h3 class="section-title">HTTPUnauthorized</h3>
-      <p>This server could not verify that you are authorized to access the document you
-requested.  Either you supplied the wrong credentials (e.g., bad password), or
-your browser does not understand how to supply the credentials required.</p>
+      <p>This server could not verify that you are authorized to access the document you requested.  Either you supplied the wrong credentials (e.g., bad password), or your browser does not understand how to supply the credentials required.</p>
       <div class="attr section" id="id4">
        <h4 class="section-title">code</h4>
        <p class="spec"><tt class="docutils literal">401</tt></p>
@@ -1848,8 +2337,7 @@ your browser does not understand how to supply the credentials required.</p>
      <h2 class="section-title">Legend</h2>
      <div class="legend-item section" id="legend-item-7b4e414d457d">
       <h3 class="section-title">{{NAME}}</h3>
-      <p>Placeholder -- usually replaced with an ID or other identifier of a RESTful
-object.</p>
+      <p>Placeholder -- usually replaced with an ID or other identifier of a RESTful object.</p>
      </div>
      <div class="legend-item section" id="legend-item-3c4e414d453e">
       <h3 class="section-title">&lt;NAME&gt;</h3>
@@ -1857,20 +2345,15 @@ object.</p>
      </div>
      <div class="legend-item section" id="legend-item-4e414d452f3f">
       <h3 class="section-title">NAME/?</h3>
-      <p>Dynamically evaluated endpoint; no further information can be determined
-without request-specific details.</p>
+      <p>Dynamically evaluated endpoint; no further information can be determined without request-specific details.</p>
      </div>
      <div class="legend-item section" id="legend-item-2a">
       <h3 class="section-title">*</h3>
-      <p>This endpoint is a <cite>default</cite> handler, and is therefore free to interpret path
-arguments dynamically; no further information can be determined without
-request-specific details.</p>
+      <p>This endpoint is a <cite>default</cite> handler, and is therefore free to interpret path arguments dynamically; no further information can be determined without request-specific details.</p>
      </div>
      <div class="legend-item section" id="legend-item-2e2e2e">
       <h3 class="section-title">...</h3>
-      <p>This endpoint is a <cite>lookup</cite> handler, and is therefore free to interpret path
-arguments dynamically; no further information can be determined without
-request-specific details.</p>
+      <p>This endpoint is a <cite>lookup</cite> handler, and is therefore free to interpret path arguments dynamically; no further information can be determined without request-specific details.</p>
      </div>
     </div>
    </div>
@@ -1881,6 +2364,31 @@ request-specific details.</p>
     self.assertEqual(res.status_code, 200)
     self.assertXmlEqual(res.body, chk)
 
+  #----------------------------------------------------------------------------
+  def test_format_html_direct(self):
+    ## The HTML is rendered directly from the doctree, equivalent to parsing the reST output
+    from .describer import Describer
+    from . import rst
+    from .test_example import RootController
+    desc = Describer(settings={
+      'entry.parsers': 'pyramid_describe.test_describe.docsEnhancer',
+      'access.default.endpoint': 'public',
+      'format.default.rstMax': 'true',
+      'format.html.default.cssPath': None,
+    })
+    for root in (SimpleRoot(), RootController()):
+      catalog = desc.analyze(root)
+      catalog.options.context.request.update(
+        host_url='http://localhost', url='http://localhost/desc')
+      html = desc.render(catalog, format='html')
+      text = desc.render(catalog, format='rst', override_options={'rstMax': True})
+      catalog.options = desc._getOptions(
+        catalog.options.context, ['html']).update(
+          view=catalog.options.view, root=catalog.options.root,
+          typereg=catalog.options.typereg)
+      chk = rst.rst2html(catalog, text)
+      self.assertEqual(re.sub(r'\s+', ' ', html), re.sub(r'\s+', ' ', chk))
+
   #----------------------------------------------------------------------------
   def test_format_html_unicode(self):
     from docutils import nodes, utils
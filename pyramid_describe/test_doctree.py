@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import unittest
+
+from docutils import nodes
+
+from . import doctree
+
+#------------------------------------------------------------------------------
+class TestDoctree(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def setUp(self):
+    doctree.fragmentCache.clear()
+
+  #----------------------------------------------------------------------------
+  def test_rst2fragments_cache(self):
+    text = 'Some *text*.\n\nAnother paragraph.'
+    frags1 = doctree.rst2fragments(text)
+    misses = doctree.fragmentCache.misses
+    frags2 = doctree.rst2fragments(text)
+    self.assertEqual(doctree.fragmentCache.misses, misses)
+    self.assertEqual(len(frags1), 2)
+    self.assertEqual(
+      [frag.pformat() for frag in frags1], [frag.pformat() for frag in frags2])
+    for frag1, frag2 in zip(frags1, frags2):
+      self.assertIsNot(frag1, frag2)
+    # modifying the returned nodes does not affect the cache
+    frags1[0]['classes'].append('modified')
+    frags1[0].append(nodes.Text(' more.'))
+    frags3 = doctree.rst2fragments(text)
+    self.assertEqual(frags3[0]['classes'], [])
+    self.assertEqual(frags3[0].astext(), 'Some text.')
+    self.assertEqual(doctree.rst2fragments(u'Some *text*.')[0].astext(), 'Some text.')
+    self.assertEqual(doctree.rst2fragments(''), [])
+
+  #----------------------------------------------------------------------------
+  def test_rst2fragments_size(self):
+    text = 'Some *text*.\n\nAnother paragraph.'
+    doctree.rst2fragments(text)
+    size = doctree.fragmentCache.size
+    # the parsed nodes are much larger than the source text
+    self.assertGreater(size, 10 * len(text))
+    doctree.rst2fragments(text + '\n\nMore.')
+    self.assertGreater(doctree.fragmentCache.size - size, size)
+
+  #----------------------------------------------------------------------------
+  def test_rst2document_settings(self):
+    doc1 = doctree.rst2document('Title\n=====\n\ntext', promote=True)
+    doc2 = doctree.rst2document('Title\n=====\n\ntext', promote=False)
+    self.assertEqual(doc1.get('title'), 'Title')
+    self.assertIsInstance(doc2[0], nodes.section)
+    self.assertIs(
+      doctree.rst2document('text').settings,
+      doctree.rst2document('other').settings)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
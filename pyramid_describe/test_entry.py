@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import sys
+import copy
+import unittest
+
+import six
+from pyramid_controllers import Controller, RestController, expose
+
+from .entry import Entry, CompactEntry
+
+#------------------------------------------------------------------------------
+def sizeof(objects):
+  '''
+  Returns the approximate total memory, in bytes, used by `objects`
+  (a list of entries), including their attribute storage and string
+  values. Each distinct object is only counted once, so interned
+  strings are only counted once.
+  '''
+  seen = set()
+  def _size(obj):
+    if id(obj) in seen:
+      return 0
+    seen.add(id(obj))
+    return sys.getsizeof(obj)
+  total = 0
+  for obj in objects:
+    total += _size(obj)
+    for store in (getattr(obj, '__dict__', None), getattr(obj, '_extra', None)):
+      if store:
+        total += _size(store)
+    for key, value in obj.items():
+      total += _size(key)
+      if isinstance(value, six.string_types):
+        total += _size(value)
+      elif isinstance(value, list):
+        total += _size(value)
+  return total
+
+#------------------------------------------------------------------------------
+def makeApp(size):
+  '''
+  Returns a generated controller tree with `size` branches, each with
+  a RESTful collection and item controller (i.e. ``/b{N}/items`` and
+  ``/b{N}/items/item``), for a total of ``9 * size + 1`` entries.
+  '''
+  class Item(RestController):
+    'An item.'
+    @expose
+    def get(self, request):
+      'Returns the item.'
+    @expose
+    def put(self, request):
+      'Updates the item.'
+    @expose
+    def delete(self, request):
+      'Deletes the item.'
+  class Items(RestController):
+    'A collection of items.'
+    @expose
+    def get(self, request):
+      'Lists the items.'
+    @expose
+    def post(self, request):
+      'Creates an item.'
+  class Branch(Controller):
+    'A branch.'
+    @expose
+    def status(self, request):
+      'Returns the branch status.'
+  class Root(Controller):
+    'The root.'
+  root = Root()
+  for idx in range(size):
+    branch = Branch()
+    branch.items = Items()
+    branch.items.item = Item()
+    setattr(root, 'b%d' % (idx,), branch)
+  return root
+
+#------------------------------------------------------------------------------
+class TestCompactEntry(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def test_attributes(self):
+    entry = CompactEntry(name='foo', path='/foo')
+    self.assertEqual(entry.name, 'foo')
+    self.assertIsNone(entry.doc)
+    self.assertIsNone(entry.someParserAttribute)
+    entry.someParserAttribute = ['x']
+    entry.doc = None
+    self.assertEqual(entry.someParserAttribute, ['x'])
+    self.assertEqual(
+      sorted(entry.keys()), ['doc', 'name', 'path', 'someParserAttribute'])
+    del entry.someParserAttribute
+    del entry.doc
+    self.assertEqual(sorted(entry.keys()), ['name', 'path'])
+
+  #----------------------------------------------------------------------------
+  def test_mapping(self):
+    entry = CompactEntry(dict(name='foo'), isRest=True)
+    self.assertEqual(dict(entry.items()), dict(name='foo', isRest=True))
+    self.assertEqual(dict(Entry(entry)), dict(name='foo', isRest=True))
+    self.assertEqual(entry['name'], 'foo')
+    self.assertIn('name', entry)
+    self.assertNotIn('path', entry)
+    self.assertNotIn('other', entry)
+    self.assertRaises(KeyError, lambda: entry['path'])
+    self.assertEqual(entry.get('path', 'none'), 'none')
+    entry['other'] = 1
+    self.assertEqual(entry.pop('other'), 1)
+    self.assertEqual(entry.pop('other', None), None)
+    self.assertEqual(entry.setdefault('path', '/foo'), '/foo')
+    self.assertEqual(len(entry), 3)
+    self.assertEqual(sorted(entry.copy()), ['isRest', 'name', 'path'])
+
+  #----------------------------------------------------------------------------
+  def test_intern(self):
+    name = ''.join(['f', 'oo'])
+    entry = CompactEntry(name=name, path='/' + name, dpath='/' + name)
+    self.assertIs(entry.path, entry.dpath)
+
+  #----------------------------------------------------------------------------
+  def test_deepcopy(self):
+    root = CompactEntry(name='', path='/').setAncestry()
+    node = CompactEntry(name='a', path='/a', parent=root).setAncestry()
+    node.extra = dict(key='value')
+    root.methods = [node]
+    croot = copy.deepcopy(root)
+    cnode = croot.methods[0]
+    self.assertIsNot(cnode, node)
+    self.assertIs(cnode.parent, croot)
+    self.assertEqual(cnode.extra, dict(key='value'))
+    self.assertIsNot(cnode.extra, node.extra)
+    self.assertEqual(list(cnode.parents), [croot])
+    self.assertEqual(cnode.depth, 1)
+
+  #----------------------------------------------------------------------------
+  def test_memory(self):
+    from .describer import Describer, _allEntries
+    app = makeApp(20)
+    sizes = []
+    for compact in (False, True):
+      desc = Describer(settings={
+        'entry.compact': compact, 'access.default.endpoint': 'public'})
+      entries = list(_allEntries(desc.analyze(app).endpoints))
+      self.assertEqual(len(entries), 181)
+      sizes.append(sizeof(entries))
+    self.assertLess(sizes[1], sizes[0] / 2)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
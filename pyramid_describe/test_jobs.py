@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pyramid_controllers.test_helpers import TestHelper
+
+from .jobs import JobPool, ArtifactCache
+from .test_cache import Root, settings_access
+
+#------------------------------------------------------------------------------
+def waitFor(func, timeout=10):
+  end = time.time() + timeout
+  while not func():
+    if time.time() > end:
+      raise AssertionError('timed out')
+    time.sleep(0.01)
+
+#------------------------------------------------------------------------------
+class TestJobPool(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def test_submit(self):
+    pool = JobPool(workers=1, queue=1)
+    gate = threading.Event()
+    calls = []
+    def _job(name):
+      def _call():
+        gate.wait()
+        calls.append(name)
+      return _call
+    job = pool.submit('a', _job('a'))
+    self.assertIsNotNone(job)
+    self.assertIs(pool.submit('a', _job('a')), job)
+    self.assertIsNotNone(pool.submit('b', _job('b')))
+    # one running and one waiting: the pool is full
+    self.assertIsNone(pool.submit('c', _job('c')))
+    gate.set()
+    waitFor(lambda: pool.get('b').status == 'done')
+    self.assertEqual(job.status, 'done')
+    self.assertEqual(calls, ['a', 'b'])
+    self.assertIsNotNone(pool.submit('c', _job('c')))
+    waitFor(lambda: pool.get('c').status == 'done')
+
+  #----------------------------------------------------------------------------
+  def test_failure(self):
+    pool = JobPool(workers=1)
+    def _fail():
+      raise ValueError('no luck')
+    job = pool.submit('a', _fail)
+    waitFor(lambda: job.status == 'failed')
+    self.assertEqual(job.error, 'no luck')
+    # failed jobs can be re-submitted
+    self.assertIsNot(pool.submit('a', lambda: None), job)
+    waitFor(lambda: pool.get('a').status == 'done')
+    pool.discard('a')
+    self.assertIsNone(pool.get('a'))
+
+  #----------------------------------------------------------------------------
+  def test_history(self):
+    pool = JobPool(workers=1, history=2)
+    for key in 'abc':
+      job = pool.submit(key, lambda: None)
+      waitFor(lambda: job.status == 'done')
+    self.assertEqual(list(pool.jobs.keys()), ['b', 'c'])
+
+#------------------------------------------------------------------------------
+class TestArtifactCache(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def setUp(self):
+    self.directory = tempfile.mkdtemp(prefix='pyramid-describe-test-')
+
+  #----------------------------------------------------------------------------
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  #----------------------------------------------------------------------------
+  def test_put(self):
+    cache = ArtifactCache(os.path.join(self.directory, 'sub'), maxcount=2)
+    self.assertIsNone(cache.path('a', 'pdf'))
+    path = cache.put('a', 'pdf', b'data-a')
+    self.assertEqual(cache.path('a', 'pdf'), path)
+    with open(path, 'rb') as fp:
+      self.assertEqual(fp.read(), b'data-a')
+    self.assertIsNone(cache.path('a', 'txt'))
+    os.utime(path, (time.time() - 20, time.time() - 20))
+    path = cache.put('b', 'pdf', b'data-b')
+    os.utime(path, (time.time() - 10, time.time() - 10))
+    cache.put('c', 'pdf', b'data-c')
+    self.assertIsNone(cache.path('a', 'pdf'))
+    self.assertIsNotNone(cache.path('b', 'pdf'))
+    self.assertIsNotNone(cache.path('c', 'pdf'))
+    self.assertEqual(sorted(os.listdir(cache.directory)), ['b.pdf', 'c.pdf'])
+
+  #----------------------------------------------------------------------------
+  def test_foreign_files(self):
+    for name in ('a.conf', 'b.conf', 'c.conf'):
+      with open(os.path.join(self.directory, name), 'wb') as fp:
+        fp.write(b'data')
+    cache = ArtifactCache(self.directory, maxcount=1)
+    cache.put('a', 'pdf', b'data-a')
+    cache.put('b', 'pdf', b'data-b')
+    self.assertEqual(
+      sorted(os.listdir(self.directory)),
+      ['a.conf', 'b.conf', 'c.conf', ArtifactCache.SUBDIRECTORY])
+    self.assertEqual(os.listdir(cache.directory), ['b.pdf'])
+    cache.close()
+    self.assertTrue(os.path.isdir(cache.directory))
+
+  #----------------------------------------------------------------------------
+  def test_tempdir(self):
+    cache = ArtifactCache()
+    self.assertIsNone(cache.path('a', 'pdf'))
+    path = cache.put('a', 'pdf', b'data')
+    directory = cache.directory
+    try:
+      self.assertEqual(cache.path('a', 'pdf'), path)
+      cache.close()
+      self.assertFalse(os.path.exists(directory))
+      self.assertIsNone(cache.path('a', 'pdf'))
+    finally:
+      shutil.rmtree(directory, ignore_errors=True)
+
+#------------------------------------------------------------------------------
+class TestAsyncRendering(TestHelper):
+
+  #----------------------------------------------------------------------------
+  def setUp(self):
+    super(TestAsyncRendering, self).setUp()
+    self.directory = tempfile.mkdtemp(prefix='pyramid-describe-test-')
+
+  #----------------------------------------------------------------------------
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+    super(TestAsyncRendering, self).tearDown()
+
+  #----------------------------------------------------------------------------
+  def makeRoot(self, **settings):
+    from .controller import DescribeController
+    root = Root()
+    root.desc = DescribeController(root, settings=dict(settings_access, **dict({
+      'render.async'           : 'txt',
+      'render.async.directory' : self.directory,
+    }, **settings)))
+    return root
+
+  #----------------------------------------------------------------------------
+  def test_async(self):
+    root = self.makeRoot()
+    chk = self.send(root, '/desc/application.rst?test-access=public').body
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    self.assertEqual(res.status_code, 202)
+    status = json.loads(res.body)
+    self.assertIn(status['status'], ('pending', 'running', 'done'))
+    self.assertEqual(res.headers['Location'], status['url'])
+    self.assertTrue(
+      status['url'].startswith('http://localhost/desc/job?id='), status['url'])
+    url = status['url'][len('http://localhost'):]
+    waitFor(lambda: json.loads(self.send(root, url).body)['status'] == 'done')
+    self.assertEqual(
+      json.loads(self.send(root, url).body),
+      dict(id=status['id'], status='done'))
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    self.assertEqual(res.status_code, 200)
+    self.assertEqual(res.content_type, 'text/plain')
+    self.assertEqual(
+      res.body,
+      self.send(self.makeRoot(**{'render.async': ''}),
+                '/desc/application.txt?test-access=public').body)
+    self.assertEqual(
+      os.listdir(root.desc.artifacts.directory), [status['id'] + '.txt'])
+    # different access groups are rendered separately
+    res = self.send(root, '/desc/application.txt?test-access=internal')
+    self.assertEqual(res.status_code, 202)
+    self.assertNotEqual(json.loads(res.body)['id'], status['id'])
+    # other formats are not affected
+    self.assertEqual(
+      self.send(root, '/desc/application.rst?test-access=public').body, chk)
+    self.assertEqual(self.send(root, '/desc/job?id=nope').status_code, 404)
+
+  #----------------------------------------------------------------------------
+  def test_async_detached(self):
+    # the background rendering does not use the original request
+    from .test_cache import acl
+    threads = []
+    def _acl(request, *args, **kw):
+      threads.append(threading.current_thread())
+      return acl(request, *args, **kw)
+    root = self.makeRoot(**{'access.control': _acl})
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    self.assertEqual(res.status_code, 202)
+    url = json.loads(res.body)['url'][len('http://localhost'):]
+    waitFor(lambda: json.loads(self.send(root, url).body)['status'] == 'done')
+    self.assertEqual(set(threads), set([threading.current_thread()]))
+    self.assertEqual(
+      self.send(root, '/desc/application.txt?test-access=public').body,
+      self.send(self.makeRoot(**{'render.async': ''}),
+                '/desc/application.txt?test-access=public').body)
+
+  #----------------------------------------------------------------------------
+  def test_async_disabled(self):
+    root = self.makeRoot(**{'render.async': ''})
+    self.assertIsNone(root.desc.jobs)
+    self.assertIsNone(root.desc.artifacts)
+
+  #----------------------------------------------------------------------------
+  def test_async_pruned(self):
+    # an artifact that is pruned after it was found is re-rendered
+    root = self.makeRoot()
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    url = json.loads(res.body)['url'][len('http://localhost'):]
+    waitFor(lambda: json.loads(self.send(root, url).body)['status'] == 'done')
+    artifacts = root.desc.artifacts
+    path = artifacts.path
+    def _path(key, ext):
+      ret = path(key, ext)
+      if ret is not None:
+        os.unlink(ret)
+      return ret
+    artifacts.path = _path
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    self.assertEqual(res.status_code, 202)
+    artifacts.path = path
+    waitFor(lambda: json.loads(self.send(root, url).body)['status'] == 'done')
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    self.assertEqual(res.status_code, 200)
+
+  #----------------------------------------------------------------------------
+  def test_async_index(self):
+    root = self.makeRoot(**{'format.default': 'txt'})
+    res = self.send(root, '/desc?test-access=public')
+    self.assertEqual(res.status_code, 202)
+    self.assertTrue(
+      res.headers['Location'].startswith('http://localhost/desc/job?id='),
+      res.headers['Location'])
+
+  #----------------------------------------------------------------------------
+  def test_async_failure(self):
+    root = self.makeRoot()
+    def _fail(data):
+      raise ValueError('rendering failed')
+    root.desc.describer.render_txt = _fail
+    res = self.send(root, '/desc/application.txt?test-access=public')
+    self.assertEqual(res.status_code, 202)
+    url = json.loads(res.body)['url'][len('http://localhost'):]
+    waitFor(lambda: json.loads(self.send(root, url).body)['status'] == 'failed')
+    self.assertEqual(json.loads(self.send(root, url).body)['error'], 'rendering failed')
+    self.assertEqual(
+      self.send(root, '/desc/application.txt?test-access=public').status_code, 500)
+    # the next request tries again
+    del root.desc.describer.render_txt
+    self.assertEqual(
+      self.send(root, '/desc/application.txt?test-access=public').status_code, 202)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
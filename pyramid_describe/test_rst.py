@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import unittest
+import threading
+
+from docutils import core
+
+from . import rst
+from .writers.rst import Writer
+
+#------------------------------------------------------------------------------
+class TestRst(unittest.TestCase):
+
+  #----------------------------------------------------------------------------
+  def test_getSettings(self):
+    settings = rst.getSettings('doctree', 'null', 'html', stylesheet_path=['a'])
+    self.assertIs(
+      rst.getSettings('doctree', 'null', 'html', stylesheet_path=['a']), settings)
+    self.assertEqual(settings.stylesheet_path, ['a'])
+    self.assertTrue(settings.traceback)
+    self.assertIsNot(
+      rst.getSettings('doctree', 'null', 'html', stylesheet_path=['b']), settings)
+    self.assertIsNot(rst.getSettings('doctree', 'null', 'html'), settings)
+    # component instances are keyed by their class
+    self.assertIs(
+      rst.getSettings('doctree', 'null', Writer(), explicit_title=True),
+      rst.getSettings('doctree', 'null', Writer(), explicit_title=True))
+
+  #----------------------------------------------------------------------------
+  def test_getSettings_threads(self):
+    results = []
+    def _get():
+      results.append(rst.getSettings(
+        'doctree', 'null', 'pseudoxml', test_getSettings_threads=True))
+    threads = [threading.Thread(target=_get) for idx in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(results), 8)
+    self.assertEqual(len(set(id(settings) for settings in results)), 1)
+
+  #----------------------------------------------------------------------------
+  def test_publish_from_doctree(self):
+    text = 'Title\n=====\n\nSome *text*.\n'
+    overrides = dict(doctitle_xform=False)
+    for writer, writer_name in ((None, 'html'), (Writer(), None)):
+      chk = core.publish_from_doctree(
+        core.publish_doctree(text, settings_overrides=overrides),
+        writer=writer, writer_name=writer_name, settings_overrides=overrides)
+      for idx in range(2):
+        out = rst.publish_from_doctree(
+          core.publish_doctree(text, settings_overrides=overrides),
+          writer=writer, writer_name=writer_name, settings_overrides=overrides)
+        self.assertEqual(out, chk)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
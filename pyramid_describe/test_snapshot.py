@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Cadit Health Inc <oss@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2016-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import json
+import unittest
+
+import six
+from pyramid.request import Request
+
+from .describer import Describer
+from .snapshot import Snapshot
+from .test_describe import SimpleRoot
+
+#------------------------------------------------------------------------------
+settings = {
+  'entry.parsers'           : 'pyramid_describe.test_describe.docsEnhancer',
+  'access.default.endpoint' : 'public',
+  'access.default.type'     : 'public',
+  'format.default.showGenerator' : 'false',
+}
+
+#------------------------------------------------------------------------------
+class TestSnapshot(unittest.TestCase):
+
+  maxDiff = None
+
+  #----------------------------------------------------------------------------
+  def snapshot(self, root):
+    buf = six.StringIO()
+    Describer(settings=settings).saveSnapshot(root, buf, root='/')
+    return buf.getvalue()
+
+  #----------------------------------------------------------------------------
+  def test_format(self):
+    data = json.loads(self.snapshot(SimpleRoot()))
+    self.assertEqual(data['snapshot']['format'], 1)
+    self.assertEqual(data['root'], '/')
+    self.assertIn('HTTPForbidden', data['typereg']['types'])
+    paths = [data['entries'][idx]['path'] for idx in data['endpoints']]
+    self.assertIn('/rest', paths)
+    self.assertNotIn('view', data['entries'][0])
+    post = [e for e in data['entries'] if e['path'] == '/rest?_method=POST'][0]
+    self.assertEqual(
+      post['raises']['@type']['value'][0]['@typeref']['type'],
+      {'@typename': 'HTTPUnauthorized'})
+
+  #----------------------------------------------------------------------------
+  def test_roundtrip(self):
+    root = SimpleRoot()
+    text = self.snapshot(root)
+    context = dict(request=Request.blank('/'))
+    for format in ('rst', 'json', 'yaml', 'wadl', 'xml'):
+      desc = Describer(settings=settings)
+      snap = desc.loadSnapshot(six.StringIO(text))
+      self.assertIsInstance(snap, Snapshot)
+      self.assertMultiLineEqual(
+        desc.describe(snap, context=context, format=format, root=snap.root).content,
+        Describer(settings=settings).describe(
+          root, context=context, format=format, root='/').content)
+
+  #----------------------------------------------------------------------------
+  def test_references(self):
+    desc = Describer(settings=settings)
+    snap = desc.loadSnapshot(six.StringIO(self.snapshot(SimpleRoot())))
+    catalog = desc.analyze(snap)
+    post = [e for e in catalog.endpoints if e.path == '/rest'][0].methods[0]
+    self.assertEqual(post.path, '/rest?_method=POST')
+    self.assertEqual(post.parent.path, '/rest')
+    self.assertIs(post.raises.value[0].type, catalog.typereg.get('HTTPUnauthorized'))
+
+  #----------------------------------------------------------------------------
+  def test_cli(self):
+    from .cli import describe_from_snapshot
+    out = six.StringIO()
+    describe_from_snapshot(
+      six.StringIO(self.snapshot(SimpleRoot())), out, format='txt',
+      settings=settings)
+    self.assertIn('<POST>      # Creates a new entry.', out.getvalue())
+
+  #----------------------------------------------------------------------------
+  def test_unsupported_format(self):
+    with self.assertRaises(ValueError):
+      Describer().loadSnapshot(six.StringIO('{"snapshot": {"format": 0}}'))
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -434,6 +434,305 @@ class TestTypeRegistry(TestHelper, pxml.XmlTestMixin):
     self.assertEqual(old.get('Surface').doc, '(old)')
     self.assertEqual(new.get('Surface').doc, '(new)')
 
+  #----------------------------------------------------------------------------
+  def test_addAlias(self):
+    from .typereg import TypeRegistry
+    reg = TypeRegistry()
+    self.assertEqual(reg.resolveAliases('int'), 'integer')
+    self.assertEqual(reg.resolveAliases('integer'), 'integer')
+    self.assertEqual(reg.resolveAliases('HTTPForbidden'), 'HTTPForbidden')
+    self.assertEqual(
+      reg.resolveAliases('pyramid.httpexceptions.HTTPForbidden'), 'HTTPForbidden')
+    # aliases of aliases resolve to the canonical target
+    reg.addAlias('smallint', 'int')
+    self.assertEqual(reg.resolveAliases('smallint'), 'integer')
+    reg.addAlias('smallint', 'int')
+    with self.assertRaises(ValueError) as cm:
+      reg.addAlias('smallint', 'number')
+    self.assertIn("already aliased to 'int'", str(cm.exception))
+    with self.assertRaises(ValueError) as cm:
+      reg.addAlias('integer', 'number')
+    self.assertIn('standalone type', str(cm.exception))
+    with self.assertRaises(ValueError) as cm:
+      reg.addAlias('loop', 'loop')
+    self.assertIn('cyclical', str(cm.exception))
+    self.assertEqual(reg.resolveAliases('loop'), 'loop')
+
+  #----------------------------------------------------------------------------
+  def test_httpTemplates(self):
+    from .typereg import TypeRegistry, _getHttpTemplates
+    aliases, types = _getHttpTemplates()
+    self.assertIs(_getHttpTemplates()[1], types)
+    reg1 = TypeRegistry()
+    reg2 = TypeRegistry()
+    self.assertIs(reg1._autotypes['HTTPForbidden'], types['HTTPForbidden'])
+    self.assertIs(reg2._autotypes['HTTPForbidden'], types['HTTPForbidden'])
+    self.assertIs(reg1.clone()._autotypes['HTTPForbidden'], types['HTTPForbidden'])
+    # accessing a shared type makes a private copy
+    typ = reg1.get('pyramid.httpexceptions.HTTPForbidden')
+    self.assertIsNot(typ, types['HTTPForbidden'])
+    self.assertEqual(typ, types['HTTPForbidden'])
+    self.assertIs(reg1.getAuto('HTTPForbidden'), typ)
+    typ.doc = 'Modified.'
+    typ.value[0].type.value = 999
+    self.assertEqual(reg2.get('HTTPForbidden').value[0].type.value, 403)
+    self.assertNotEqual(reg2.getAuto('HTTPForbidden').doc, 'Modified.')
+    self.assertEqual(TypeRegistry().get('HTTPForbidden').value[0].type.value, 403)
+    self.assertIsNone(TypeRegistry(options=aadict(aliases={})).get('HTTPForbidden'))
+
+  #----------------------------------------------------------------------------
+  def test_indexAliases(self):
+    from .typereg import TypeRegistry
+    reg = TypeRegistry(options=aadict(aliases={}))
+    reg._aliases = {'integer': set(['int']), 'int': set(['i']), 'x': set(['y'])}
+    reg._indexAliases()
+    self.assertEqual(reg.resolveAliases('i'), 'integer')
+    self.assertEqual(reg.resolveAliases('int'), 'integer')
+    self.assertEqual(reg.resolveAliases('y'), 'x')
+    reg._aliases = {'a': set(['b']), 'b': set(['a'])}
+    with self.assertRaises(ValueError):
+      reg._indexAliases()
+
+  #----------------------------------------------------------------------------
+  def test_clone_copy_on_write(self):
+    from .typereg import TypeRegistry, Type, TypeRef
+    old = TypeRegistry()
+    shape = old.registerType(Type(base='dict', name='Shape', doc='A shape.'))
+    surface = old.registerType(Type(base='dict', name='Surface', doc='(old)', value=[
+      TypeRef(name='shape', type=shape)]))
+    new = old.clone()
+    # types are shared until accessed
+    self.assertIs(new.peek('Shape'), shape)
+    self.assertIs(new._types['Surface'], surface)
+    nsurface = new.get('Surface')
+    self.assertIsNot(nsurface, surface)
+    self.assertEqual(nsurface, surface)
+    self.assertIs(new.peek('Shape'), shape)
+    # references between copies are preserved
+    self.assertIs(new.get('Shape'), nsurface.value[0].type)
+    self.assertIs(new.get('Surface'), nsurface)
+    # ... and the original registry copies too
+    self.assertIsNot(old.get('Shape'), shape)
+    self.assertIsNot(old.get('Shape'), new.get('Shape'))
+
+  #----------------------------------------------------------------------------
+  def test_clone_memo(self):
+    import copy
+    from .typereg import TypeRegistry, Type, TypeRef
+    old = TypeRegistry()
+    shape = old.registerType(Type(base='dict', name='Shape', doc='A shape.'))
+    other = old.registerType(Type(base='dict', name='Other', doc='Other.'))
+    memo = dict()
+    ref = copy.deepcopy(TypeRef(name='shape', type=shape), memo)
+    new = old.clone(memo=memo)
+    # types copied with the memo are adopted, the others are shared
+    self.assertIs(new.peek('Shape'), ref.type)
+    self.assertIs(new.get('Shape'), ref.type)
+    self.assertIs(new.peek('Other'), other)
+    self.assertIsNot(new.get('Other'), other)
+    self.assertIs(old.peek('Other'), other)
+
+  #----------------------------------------------------------------------------
+  def test_filterTypes(self):
+    from .typereg import TypeRegistry, Type
+    old = TypeRegistry()
+    shape = old.registerType(Type(base='dict', name='Shape', doc='A shape.'))
+    other = old.registerType(Type(base='dict', name='Other', doc='Other.'))
+    hidden = old.registerType(Type(base='dict', name='Hidden', doc='Hidden.'))
+    new = old.clone()
+    def _filter(typ):
+      if typ.name == 'Hidden':
+        return None
+      if typ.name == 'Shape':
+        return Type(base=typ.base, name=typ.name, doc='Filtered.')
+      return typ
+    types = new.filterTypes(_filter)
+    self.assertEqual([typ.name for typ in types], ['Other', 'Shape'])
+    self.assertIs(types[0], other)
+    self.assertIs(new.peek('Other'), other)
+    self.assertIs(new.peek('Hidden'), hidden)
+    self.assertIs(new.get('Shape'), types[1])
+    self.assertIs(new.current(shape), types[1])
+    self.assertIs(new.current(other), other)
+    self.assertEqual(old.get('Shape').doc, 'A shape.')
+
+  #----------------------------------------------------------------------------
+  def test_parseType_cache(self):
+    from .typereg import TypeRegistry, Type, parseCache
+    reg = TypeRegistry()
+    parseCache.clear()
+    typ1 = reg.parseType('list(Shape)')
+    hits, misses = parseCache.hits, parseCache.misses
+    typ2 = reg.parseType('list(Shape)')
+    self.assertEqual((parseCache.hits, parseCache.misses), (hits + 1, misses))
+    self.assertEqual(typ1, typ2)
+    self.assertIsNot(typ1, typ2)
+    self.assertIsNot(typ1.value, typ2.value)
+    self.assertIsNot(typ1.meta, typ2.meta)
+    # modifying the result does not affect the cache
+    typ1.value.name = 'Other'
+    typ1.meta.source = 'test'
+    self.assertEqual(reg.parseType('list(Shape)'), typ2)
+    self.assertEqual(reg.parseType('list(Shape)').meta, {})
+    self.assertEqual(
+      reg.parseType('int, optional', complete=False),
+      (Type(base='scalar', name='integer'), ', optional'))
+    # clones share the cached results, until modified
+    self.assertEqual(reg.clone()._generation, reg._generation)
+    self.assertEqual(reg.parseType('shape').base, 'unknown')
+    reg.registerType(Type(base='dict', name='shape', doc='A shape.'))
+    self.assertEqual(reg.parseType('shape'), Type(base='dict', name='shape'))
+    self.assertEqual(reg.parseType('square').base, 'unknown')
+    reg.addAlias('square', 'shape')
+    self.assertEqual(reg.parseType('square'), Type(base='dict', name='square'))
+    # failures are cached as well
+    misses = parseCache.misses
+    for idx in range(2):
+      with self.assertRaises(ValueError) as cm:
+        reg.parseType('list(')
+      self.assertIn('position 4', str(cm.exception))
+    self.assertEqual(parseCache.misses, misses + 1)
+
+  #----------------------------------------------------------------------------
+  def test_parseType_differential(self):
+    # the fixture records the results of the StringWalker-based parser
+    # (that the TypeSpecScanner replaced) for the numpydoc test corpus
+    # and for randomly generated and mutated specifications.
+    import pkg_resources
+    from .typereg import TypeRegistry
+    cases = json.loads(pkg_resources.resource_string(
+      'pyramid_describe', 'test/typereg-parse.fuzz.json').decode('utf-8'))
+    self.assertGreater(len(cases), 1000)
+    reg = TypeRegistry()
+    for case in cases:
+      try:
+        res = reg._parseTypeUncached(case['spec'], case['complete'])
+      except Exception as exc:
+        res = {'error': '%s: %s' % (exc.__class__.__name__, exc)}
+      else:
+        if case['complete']:
+          res = {'result': repr(res)}
+        else:
+          res = {'result': repr(res[0]), 'remainder': res[1]}
+      chk = {key: val for key, val in case.items() if key not in ('spec', 'complete')}
+      self.assertEqual(res, chk, 'spec %r (complete=%r)' % (case['spec'], case['complete']))
+
+  #----------------------------------------------------------------------------
+  def test_TypeSpecScanner(self):
+    from .typereg import TypeRegistry, TypeSpecScanner
+    src = TypeSpecScanner(
+      'list( 0x00ff|-1.5e3 ) & "a" ## note', TypeRegistry()._token_cre)
+    toks = []
+    while src.token()[0] != 'end':
+      toks.append(src.token())
+      src.read(len(src.token()[1]))
+    self.assertEqual(toks, [
+      ('symbol', 'list'), ('open', '('), ('ws', ' '), ('hex', '0x00ff'),
+      ('oneof', '|'), ('number', '-1.5e3'), ('ws', ' '), ('close', ')'),
+      ('ws', ' '), ('union', '&'), ('ws', ' '), ('quote', '"'), ('symbol', 'a'),
+      ('quote', '"'), ('ws', ' '), ('comment', '##'), ('ws', ' '),
+      ('symbol', 'note')])
+    self.assertEqual(src.string, '')
+    src.seek(5)
+    self.assertEqual(src.eatws().index, 6)
+    self.assertEqual(src.string[:6], '0x00ff')
+
+  #----------------------------------------------------------------------------
+  def test_intern(self):
+    import copy
+    from .typereg import TypeRegistry, Type, TypeRef
+    reg = TypeRegistry()
+    def _params():
+      return Type(base='compound', name='dict', value=[
+        TypeRef(name='a', type=reg.parseType('list(int)'), doc='A.'),
+        TypeRef(name='b', type=reg.parseType('str'), params={'optional': True}),
+      ])
+    typ1 = reg.intern(_params())
+    typ2 = _params()
+    self.assertIsNot(typ1, typ2)
+    self.assertIs(reg.intern(typ2), typ1)
+    # the children are interned too
+    typ3 = reg.intern(TypeRef(type=reg.parseType('list(int)')))
+    self.assertIs(typ3.type, typ1.value[0].type)
+    # different meta or children are not merged
+    typ4 = _params()
+    typ4.meta.classes = ['@INTERNAL']
+    self.assertIsNot(reg.intern(typ4), typ1)
+    typ5 = _params()
+    typ5.value[1].params['optional'] = False
+    self.assertIsNot(reg.intern(typ5), typ1)
+    self.assertIsNot(reg.intern(reg.parseType('1.0')), reg.intern(reg.parseType('1')))
+    # named types are not interned
+    shape = Type(base='dict', name='Shape', value=[TypeRef(name='a', type=reg.parseType('int'))])
+    self.assertIsNot(reg.intern(copy.deepcopy(shape)), reg.intern(shape))
+    ref1 = reg.intern(TypeRef(name='s', type=shape))
+    self.assertIs(reg.intern(TypeRef(name='s', type=shape)), ref1)
+    self.assertIsNot(reg.intern(TypeRef(name='s', type=copy.deepcopy(shape))), ref1)
+    # clones have their own intern table
+    self.assertIsNot(reg.clone().intern(_params()), typ1)
+    # in-place changes of interned types never cause false matches
+    typ1.value[1].params['optional'] = False
+    self.assertIsNot(reg.intern(_params()), typ1)
+
+  #----------------------------------------------------------------------------
+  def test_reachable(self):
+    from .typereg import TypeRegistry, Type, TypeRef
+    reg = TypeRegistry()
+    def _dict(name, *refs):
+      return Type(base='dict', name=name, value=[
+        TypeRef(name='name', type=reg.parseType('str'))] + [
+        TypeRef(name=ref.name.lower(), type=ref) for ref in refs])
+    author = reg.registerType(_dict('Author'))
+    source = reg.registerType(_dict('Source'))
+    shape  = reg.registerType(_dict('Shape', source, author))
+    reg.registerType(_dict('Unused', shape))
+    reg.registerAutoType(_dict('Auto'))
+    # note: the circular reference is added after registration, since
+    #       `registerType` cannot dereference it.
+    source.value.append(TypeRef(name='shape', type=shape))
+    roots = [
+      TypeRef(type=reg.parseType('list(Shape)')),
+      Type(base='unknown', name='Auto'),
+      None,
+    ]
+    graph = reg.reachable(roots)
+    self.assertEqual(graph.names, ['Author', 'Shape', 'Source'])
+    self.assertEqual(graph.roots, set(['Shape']))
+    self.assertEqual(graph.edges, {
+      'Shape'  : set(['Source', 'Author']),
+      'Source' : set(['Shape']),
+      'Author' : set(),
+    })
+    self.assertEqual(graph.referrers('Shape'), ['Source'])
+    self.assertIn('Author', graph)
+    self.assertNotIn('Unused', graph)
+    self.assertEqual(len(graph), 3)
+    # the walk does not promote auto types
+    self.assertNotIn('Auto', reg.typeNames())
+    # types that are not in `types` are excluded, including the types
+    # that are only referenced by them
+    types = [typ for typ in reg.types() if typ.name != 'Source']
+    graph = reg.reachable(roots, types=types)
+    self.assertEqual(graph.names, ['Author', 'Shape'])
+    self.assertEqual(graph.edges['Shape'], set(['Author']))
+
+  #----------------------------------------------------------------------------
+  def test_tostruct_memo(self):
+    from .typereg import TypeRegistry, Type, TypeRef
+    reg = TypeRegistry()
+    shape = Type(base='dict', name='Shape', doc='A shape.', value=[
+      TypeRef(name='sides', type=reg.parseType('int'), doc='The sides.')])
+    reg.registerType(shape)
+    shapes = Type(base='compound', name='list', value=shape)
+    memo = dict()
+    self.assertEqual(shapes.tostruct(ref=True, memo=memo), shapes.tostruct(ref=True))
+    self.assertEqual(shape.tostruct(memo=memo), shape.tostruct())
+    self.assertIs(shapes.tostruct(ref=True, memo=memo), shapes.tostruct(ref=True, memo=memo))
+    self.assertIs(
+      shapes.tostruct(ref=True, memo=memo)['params']['value'],
+      shape.tostruct(ref=True, memo=memo))
+    self.assertIsNot(shape.tostruct(memo=memo), shape.tostruct(ref=True, memo=memo))
+
 #------------------------------------------------------------------------------
 # end of $Id$
 # $ChangeLog$
@@ -12,6 +12,8 @@ import json
 import types
 import inspect
 import copy
+import threading
+import itertools
 
 import yaml
 import six
@@ -22,6 +24,7 @@ import morph
 
 from .scope import Scope
 from .i18n import _
+from .cache import RenderCache
 from . import util
 
 #------------------------------------------------------------------------------
@@ -34,6 +37,43 @@ log = logging.getLogger(__name__)
 #       ==> perhapse the "union" name is also a bit misleading???
 #           in XMLSchema, "xsd:union" means the same as "one-of" here... ugh.
 
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+def _internkey(value):
+  # note: the children of a type are interned before the type itself
+  #       (see `TypeRegistry.intern`), and must be the *same* instances
+  #       to be merged, so they are keyed by identity.
+  if isinstance(value, (Type, TypeRef)):
+    return id(value)
+  if isinstance(value, (list, tuple)):
+    return hash(tuple(_internkey(val) for val in value))
+  if isinstance(value, dict):
+    return hash(frozenset(
+      (key, _internkey(val)) for key, val in value.items()))
+  try:
+    return hash(value)
+  except TypeError:
+    # note: unhashable values all have the same key, which is
+    #       consistent with equality (but not very discriminating).
+    return 0
+
+#------------------------------------------------------------------------------
+def _identical(valA, valB):
+  # note: Type and TypeRef children must be the *same* instances
+  if isinstance(valA, (Type, TypeRef)) or isinstance(valB, (Type, TypeRef)):
+    return valA is valB
+  if valA.__class__ is not valB.__class__:
+    return False
+  if isinstance(valA, (list, tuple)):
+    return len(valA) == len(valB) \
+      and all(_identical(a, b) for a, b in zip(valA, valB))
+  if isinstance(valA, dict):
+    return len(valA) == len(valB) \
+      and all(key in valB and _identical(val, valB[key])
+              for key, val in valA.items())
+  return valA == valB
+
 #------------------------------------------------------------------------------
 class _aadict(aadict):
   def __setattr__(self, key, value):
@@ -242,6 +282,8 @@ class Type(_aadict):
 
   #----------------------------------------------------------------------------
   def __cmp__(self, target):
+    if target is self:
+      return 0
     if not isinstance(target, self.__class__):
       return cmp(self.__class__, target.__class__)
     for attr in ('base', 'name', 'doc', 'value'):
@@ -251,11 +293,25 @@ class Type(_aadict):
     return 0
 
   #----------------------------------------------------------------------------
-  def tostruct(self, ref=False):
+  def tostruct(self, ref=False, memo=None):
     '''
     Returns a JSONifiable structural representation of this Type.
     Note that all `meta` information is lost.
+
+    If `memo` is specified, it must be a dict that is used to cache
+    the representations of this Type and all of its sub-types and
+    references (by identity), in which case the returned structures
+    may be shared and must not be modified.
     '''
+    if memo is not None:
+      key = (id(self), ref)
+      if key not in memo:
+        memo[key] = self._tostruct(ref, memo)
+      return memo[key]
+    return self._tostruct(ref, memo)
+
+  #----------------------------------------------------------------------------
+  def _tostruct(self, ref, memo):
     ret = dict(name=self.name)
     if not ref and self.doc:
       ret['doc'] = self.doc
@@ -272,9 +328,10 @@ class Type(_aadict):
       elif not ref and self.base in (Type.ONEOF, Type.UNION, Type.DICT):
         gen = 'list'
       if gen == 'item':
-        ret['params'] = dict(value=self.value.tostruct(ref=True))
+        ret['params'] = dict(value=self.value.tostruct(ref=True, memo=memo))
       elif gen == 'list':
-        ret['params'] = dict(value=[v.tostruct(ref=True) for v in self.value])
+        ret['params'] = dict(
+          value=[v.tostruct(ref=True, memo=memo) for v in self.value])
     if not ref and self.base in (Type.LIST, Type.REF, Type.ONEOF, Type.UNION, Type.DICT):
       ret['base'] = self.base
     return ret
@@ -366,8 +423,21 @@ class TypeRef(_aadict):
   def is_scalar(self):       return False
 
   #----------------------------------------------------------------------------
-  def tostruct(self, ref=False):
-    ret = dict(type=self.type.tostruct(ref=True))
+  def tostruct(self, ref=False, memo=None):
+    '''
+    Returns a JSONifiable structural representation of this TypeRef
+    -- see :meth:`Type.tostruct` for details.
+    '''
+    if memo is not None:
+      key = (id(self), ref)
+      if key not in memo:
+        memo[key] = self._tostruct(ref, memo)
+      return memo[key]
+    return self._tostruct(ref, memo)
+
+  #----------------------------------------------------------------------------
+  def _tostruct(self, ref, memo):
+    ret = dict(type=self.type.tostruct(ref=True, memo=memo))
     if self.params:
       ret['params'] = dict(self.params)
     if self.name:
@@ -378,6 +448,8 @@ class TypeRef(_aadict):
 
   #----------------------------------------------------------------------------
   def __cmp__(self, target):
+    if target is self:
+      return 0
     if not isinstance(target, self.__class__):
       return cmp(self.__class__, target.__class__)
     for attr in ('type', 'name', 'doc', 'params'):
@@ -400,61 +472,101 @@ class TypeRef(_aadict):
 
 #------------------------------------------------------------------------------
 
-whitespace_cre  = re.compile(r'\s+')
-hex_cre         = re.compile(r'([a-f0-9][a-f0-9])+', re.IGNORECASE)
-constant_cre    = re.compile(r'[0-9"\'-{\\[]')
 # todo: move this into TypeRegistry as a configurable option...
 #       ==> and make it depend on declared aliases, etc...
 symbol_cre      = re.compile(r'[a-z_][a-z0-9_.]*', re.IGNORECASE)
 
 #------------------------------------------------------------------------------
-class StringWalker(object):
+def makeTokenRE(options):
+  '''
+  Returns the compiled regular expression used by the
+  :class:`TypeSpecScanner` to split type specifications into tokens,
+  given the TypeRegistry `options` that define the grouping,
+  separator and comment tokens. Each alternative is a named group, so
+  that the name of the last matched group is the token's kind.
+  '''
+  return re.compile('|'.join([
+    '(?P<comment>'  + re.escape(options.commentToken)  + ')',
+    '(?P<open>'     + re.escape(options.closure_open)  + ')',
+    '(?P<close>'    + re.escape(options.closure_close) + ')',
+    '(?P<oneof>'    + re.escape(options.oneof_sep)     + ')',
+    '(?P<union>'    + re.escape(options.union_sep)     + ')',
+    r'(?P<ws>\s+)',
+    r'(?P<hex>0x(?:[a-fA-F0-9]{2})+)',
+    r'(?P<badhex>0x)',
+    r'(?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)',
+    r'(?P<symbol>[a-zA-Z_][a-zA-Z0-9_.]*)',
+    r'(?P<quote>[\'"{\[])',
+    r'(?P<other>.)',
+    r'(?P<end>)',
+  ]), re.DOTALL)
+
+#------------------------------------------------------------------------------
+class TypeSpecScanner(object):
+  '''
+  Splits a type specification string into a stream of tokens with a
+  single compiled regular expression (see :func:`makeTokenRE`). The
+  token at the current position is matched at most once and cached,
+  so that the parser can inspect it repeatedly before consuming it.
+  Tokens are ``(KIND, TEXT)`` tuples, where KIND is one of
+  ``comment``, ``open``, ``close``, ``oneof``, ``union``, ``ws``,
+  ``hex``, ``badhex``, ``number``, ``symbol``, ``quote``, ``other``
+  or ``end``.
+
+  Constants that cannot be tokenized by a regular expression (the
+  YAML-encoded strings, lists and dicts that start with a ``quote``
+  token) are read by the parser directly from the remaining
+  :attr:`string`.
+  '''
 
   #----------------------------------------------------------------------------
-  def __init__(self, string, *args, **kw):
-    super(StringWalker, self).__init__(*args, **kw)
-    self._string  = string
-    self.index    = 0
+  def __init__(self, string, token_cre, *args, **kw):
+    super(TypeSpecScanner, self).__init__(*args, **kw)
+    self.source     = string
+    self.index      = 0
+    self._token_cre = token_cre
+    self._token     = None
 
   #----------------------------------------------------------------------------
   @property
   def string(self):
-    return self._string[self.index:]
+    return self.source[self.index:]
 
   #----------------------------------------------------------------------------
   @property
   def length(self):
-    ret = len(self._string) - self.index
+    ret = len(self.source) - self.index
     if ret <= 0:
       return 0
     return ret
 
   #----------------------------------------------------------------------------
-  def __bool__(self):
-    return self.length > 0
+  def token(self):
+    '''
+    Returns the ``(KIND, TEXT)`` token at the current position without
+    consuming it.
+    '''
+    if self._token is None or self._token[0] != self.index:
+      match = self._token_cre.match(self.source, self.index)
+      self._token = (self.index, match.lastgroup, match.group(0))
+    return self._token[1:]
 
   #----------------------------------------------------------------------------
   def eatws(self):
-    match = whitespace_cre.match(self.string)
-    if match:
-      self.index += len(match.group(0))
+    kind, text = self.token()
+    if kind == 'ws':
+      self.index += len(text)
     return self
 
-  #----------------------------------------------------------------------------
-  def peek(self, length=1):
-    if length <= 0:
-      raise ValueError('length must be positive')
-    return self.string[:length]
-
   #----------------------------------------------------------------------------
   def startswith(self, string):
-    return self.peek(len(string)) == string
+    return self.source.startswith(string, self.index)
 
   #----------------------------------------------------------------------------
   def read(self, length=1):
     if length <= 0:
       raise ValueError('length must be positive')
-    ret = self.string[:length]
+    ret = self.source[self.index:self.index + length]
     self.index += length
     return ret
 
@@ -463,6 +575,142 @@ class StringWalker(object):
     self.index = position
     return self
 
+#------------------------------------------------------------------------------
+class TypeGraph(object):
+  '''
+  The dependency graph of the named types that are reachable from a
+  set of root types, as built by :meth:`TypeRegistry.reachable`.
+
+  :Attributes:
+
+  roots : set
+
+    The names of the types that are referenced directly by the root
+    types, i.e. without passing through another named type.
+
+  edges : dict
+
+    Maps the name of each reachable type to the set of names of the
+    named types that it references directly.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, roots=None, edges=None, *args, **kw):
+    super(TypeGraph, self).__init__(*args, **kw)
+    self.roots = roots or set()
+    self.edges = edges or dict()
+
+  #----------------------------------------------------------------------------
+  @property
+  def names(self):
+    '''
+    The names of all reachable types, sorted in the same order as by
+    :meth:`TypeRegistry.typeNames`.
+    '''
+    return sorted(self.edges.keys(), key=str.lower)
+
+  #----------------------------------------------------------------------------
+  def referrers(self, name):
+    '''
+    Returns the sorted names of the reachable types that reference the
+    type `name` directly.
+    '''
+    return sorted(
+      [key for key, refs in self.edges.items() if name in refs],
+      key=str.lower)
+
+  #----------------------------------------------------------------------------
+  def __contains__(self, name):
+    return name in self.edges
+
+  #----------------------------------------------------------------------------
+  def __iter__(self):
+    return iter(self.names)
+
+  #----------------------------------------------------------------------------
+  def __len__(self):
+    return len(self.edges)
+
+#------------------------------------------------------------------------------
+
+_httpTemplates     = None
+_httpTemplatesLock = threading.Lock()
+
+# the results of the most recently used type specifications (see
+# `TypeRegistry.parseType`), keyed by registry "generation" and spec.
+# the size is the number of cached results.
+parseCache         = RenderCache(maxsize=4096)
+_generations       = itertools.count(1)
+
+#------------------------------------------------------------------------------
+def _copyParsed(value):
+  '''
+  Returns a copy of the `parseType` result `value`, i.e. of a tree of
+  Type and TypeRef objects that only contain native values. This is
+  several times faster than :func:`copy.deepcopy` (which is slower
+  than parsing most type specifications).
+  '''
+  if isinstance(value, (Type, TypeRef)):
+    ret = dict.__new__(value.__class__)
+    for key, val in six.iteritems(value):
+      dict.__setitem__(ret, key, _copyParsed(val))
+    return ret
+  if isinstance(value, list):
+    return [_copyParsed(val) for val in value]
+  if isinstance(value, tuple):
+    return tuple(_copyParsed(val) for val in value)
+  if isinstance(value, dict):
+    return value.__class__(
+      (key, _copyParsed(val)) for key, val in six.iteritems(value))
+  return value
+
+#------------------------------------------------------------------------------
+def _getHttpTemplates():
+  '''
+  Returns a tuple of the alias table (a list of ``(source, target)``
+  pairs) and the auto type templates (a dict of name to Type) for the
+  pyramid.httpexceptions HTTP error responses. These are computed only
+  once per process and shared by all TypeRegistry instances, and must
+  therefore never be modified (see :meth:`TypeRegistry.clone`).
+  '''
+  global _httpTemplates
+  if _httpTemplates is not None:
+    return _httpTemplates
+  with _httpTemplatesLock:
+    if _httpTemplates is not None:
+      return _httpTemplates
+    aliases = []
+    types   = dict()
+    for name in dir(pyramid.httpexceptions):
+      if name.startswith('_'):
+        continue
+      try:
+        sym = getattr(pyramid.httpexceptions, name)
+        if inspect.isclass(sym) \
+            and issubclass(sym, pyramid.httpexceptions.WSGIHTTPException):
+          aliases.append(('pyramid.httpexceptions.' + name, name))
+          types[name] = Type(
+            base = Type.DICT,
+            name = name,
+            doc  = _('{error.explanation}', error=sym),
+            value = [
+              TypeRef(
+                name = 'code',
+                type = Type(base=Type.CONSTANT, name=Type.INTEGER, value=sym.code)),
+              TypeRef(
+                name = 'message',
+                type = Type(base=Type.CONSTANT, name=Type.STRING, value=sym.title)),
+            ],
+            meta = {
+              'source'  : 'pyramid.httpexceptions',
+              'classes' : ['source-pyramid-httpexceptions'],
+            },
+          )
+      except Exception:
+        pass
+    _httpTemplates = (aliases, types)
+  return _httpTemplates
+
 #------------------------------------------------------------------------------
 class TypeRegistry(object):
 
@@ -506,8 +754,15 @@ class TypeRegistry(object):
     self._types     = dict()
     self._autotypes = dict()
     self._aliases   = dict()
+    self._aliasmap  = dict()
+    self._shared    = dict()
+    self._replaced  = dict()
+    self._memo      = None
+    self._interned  = dict()
+    self._generation = next(_generations)
     self._dictType_cre    = re.compile(self.options.customDictTypeRE)
     self._unknownType_cre = re.compile(self.options.unknownTypeRE)
+    self._token_cre       = makeTokenRE(self.options)
     aliases = aliases or self.options.aliases
     self.addAliases(self.DEFAULT_ALIASES if aliases is None else aliases)
     if aliases is None:
@@ -519,18 +774,46 @@ class TypeRegistry(object):
       self.loadExtensions(self.options.extensions)
 
   #----------------------------------------------------------------------------
-  def clone(self):
+  def clone(self, memo=None):
     '''
-    Creates a copy of this TypeRegistry, where the types are
-    deep-copied.
+    Creates a copy-on-write copy of this TypeRegistry: the types are
+    shared with this registry until they are accessed via :meth:`get`,
+    :meth:`getAuto` or :meth:`types` (in either registry), at which
+    point they are deep-copied. Types accessed via :meth:`peek` or
+    :meth:`filterTypes` are never copied. The cost of a clone is
+    therefore proportional to the number of types that are actually
+    modified, not to the size of the registry.
+
+    If `memo` is specified, it is used as the :func:`copy.deepcopy`
+    memo dictionary for these copies, which allows objects that
+    reference the registered types (e.g. endpoint entries) to be
+    cloned with the same memo while preserving the references. Types
+    that have already been copied with `memo` (i.e. the objects that
+    reference them were cloned first) are used directly.
     '''
     ret = TypeRegistry(_hack=True)
     ret.options          = aadict(self.options)
     ret._dictType_cre    = self._dictType_cre
     ret._unknownType_cre = self._unknownType_cre
+    ret._token_cre       = self._token_cre
     ret._aliases         = {k : set(v) for k, v in self._aliases.items()}
-    ret._types           = {k : v.clone() for k, v in self._types.items()}
-    ret._autotypes       = {k : v.clone() for k, v in self._autotypes.items()}
+    ret._aliasmap        = dict(self._aliasmap)
+    # note: the shared types are indexed by identity (and retained, so
+    #       that identities cannot be re-used), and must be copied by
+    #       *both* registries before being handed out for modification.
+    for typ in list(self._types.values()) + list(self._autotypes.values()):
+      self._shared[id(typ)] = typ
+    ret._shared          = dict(self._shared)
+    ret._replaced        = dict()
+    ret._memo            = memo
+    ret._interned        = dict()
+    ret._generation      = self._generation
+    if memo:
+      ret._types         = {k : memo.get(id(v), v) for k, v in self._types.items()}
+      ret._autotypes     = {k : memo.get(id(v), v) for k, v in self._autotypes.items()}
+    else:
+      ret._types         = dict(self._types)
+      ret._autotypes     = dict(self._autotypes)
     return ret
 
   #----------------------------------------------------------------------------
@@ -550,51 +833,76 @@ class TypeRegistry(object):
 
     * ``HTTPForbidden``
     * ``pyramid.httpexceptions.HTTPForbidden``
+
+    The aliases and types are computed only once per process. The
+    types are shared with other registries until they are accessed via
+    :meth:`get` or :meth:`getAuto`, at which point they are copied.
     '''
-    for name in dir(pyramid.httpexceptions):
-      if name.startswith('_'):
-        continue
-      try:
-        sym = getattr(pyramid.httpexceptions, name)
-        if inspect.isclass(sym) \
-            and issubclass(sym, pyramid.httpexceptions.WSGIHTTPException):
-          self.addAlias('pyramid.httpexceptions.' + name, name)
-          self.registerAutoType(
-            Type(
-              base = Type.DICT,
-              name = name,
-              doc  = _('{error.explanation}', error=sym),
-              value = [
-                TypeRef(
-                  name = 'code',
-                  type = Type(base=Type.CONSTANT, name=Type.INTEGER, value=sym.code)),
-                TypeRef(
-                  name = 'message',
-                  type = Type(base=Type.CONSTANT, name=Type.STRING, value=sym.title)),
-              ],
-              meta = {
-                'source'  : 'pyramid.httpexceptions',
-                'classes' : ['source-pyramid-httpexceptions'],
-              },
-            ))
-      except Exception:
-        pass
+    aliases, types = _getHttpTemplates()
+    for source, target in aliases:
+      self.addAlias(source, target)
+    # note: the templates are fully dereferenced (they only contain
+    #       constants), so they can be registered as-is.
+    self._autotypes.update(types)
+    for typ in types.values():
+      self._shared[id(typ)] = typ
+    self._touch()
 
   #----------------------------------------------------------------------------
   def addAlias(self, source, target):
-    # todo: check for cyclical references...
     if source in self._types or source in self._aliases:
       raise ValueError(
         'cannot alias %r to %r: already declared as standalone type' %
         (source, target))
-    for ctarget, csources in self._aliases.items():
-      if source in csources and target != ctarget:
-        raise ValueError(
-          'cannot alias %r to %r: already aliased to %r' %
-          (source, target, ctarget))
+    if source in self._aliasmap and source not in self._aliases.get(target, ()):
+      ctarget = [ctarget for ctarget, csources in self._aliases.items()
+                 if source in csources][0]
+      raise ValueError(
+        'cannot alias %r to %r: already aliased to %r' %
+        (source, target, ctarget))
+    # note: since a symbol cannot be aliased once it is the target of an
+    #       alias (see above), the canonical target of an alias never
+    #       changes after it is added, and can therefore be indexed.
+    canonical = self.resolveAliases(target)
+    if canonical == source:
+      raise ValueError(
+        'cannot alias %r to %r: cyclical alias reference' % (source, target))
     if target not in self._aliases:
       self._aliases[target] = set()
     self._aliases[target].add(source)
+    self._aliasmap[source] = canonical
+    self._touch()
+
+  #----------------------------------------------------------------------------
+  def _indexAliases(self):
+    '''
+    Rebuilds the index of aliases to their canonical targets from the
+    alias declarations, e.g. after they were replaced wholesale (as is
+    done when loading a snapshot).
+    '''
+    direct = {source: target
+              for target, sources in self._aliases.items()
+              for source in sources}
+    self._aliasmap = dict()
+    for source in direct:
+      seen   = set([source])
+      target = direct[source]
+      while target in direct:
+        if target in seen:
+          raise ValueError(
+            'cannot alias %r to %r: cyclical alias reference'
+            % (source, direct[source]))
+        seen.add(target)
+        target = direct[target]
+      self._aliasmap[source] = target
+    self._touch()
+
+  #----------------------------------------------------------------------------
+  def _touch(self):
+    # starts a new "generation" of this registry, which invalidates the
+    # cached `parseType` results. this must be called whenever the
+    # registered types or aliases change.
+    self._generation = next(_generations)
 
   #----------------------------------------------------------------------------
   def loadExtensions(self, specs):
@@ -640,6 +948,7 @@ class TypeRegistry(object):
       type = self.dereference(type)
     # todo: should this check for collision?...
     self._types[type.name] = type
+    self._touch()
     return type
 
   #----------------------------------------------------------------------------
@@ -647,6 +956,7 @@ class TypeRegistry(object):
     type = self.dereference(type, auto=True)    
     # todo: should this check for collision?...
     self._autotypes[type.name] = type
+    self._touch()
     return type
 
   #----------------------------------------------------------------------------
@@ -674,13 +984,28 @@ class TypeRegistry(object):
 
   #----------------------------------------------------------------------------
   def resolveAliases(self, symbol):
-    for key, val in self._aliases.items():
-      if symbol in val:
-        return self.resolveAliases(key)
-    return symbol
+    return self._aliasmap.get(symbol, symbol)
 
   #----------------------------------------------------------------------------
   def get(self, symbol):
+    if self.peek(symbol) is None:
+      return None
+    return self._own(self._types, self.resolveAliases(symbol))
+
+  #----------------------------------------------------------------------------
+  def getAuto(self, symbol):
+    symbol = self.resolveAliases(symbol)
+    if symbol not in self._autotypes:
+      return None
+    return self._own(self._autotypes, symbol)
+
+  #----------------------------------------------------------------------------
+  def peek(self, symbol):
+    '''
+    Same as :meth:`get`, but the returned type may be shared with
+    other registries (see :meth:`clone`) and must therefore not be
+    modified.
+    '''
     symbol = self.resolveAliases(symbol)
     if symbol not in self._types and symbol in self._autotypes:
       # TODO: what about promoting other auto types that are
@@ -689,9 +1014,165 @@ class TypeRegistry(object):
     return self._types.get(symbol)
 
   #----------------------------------------------------------------------------
-  def getAuto(self, symbol):
-    symbol = self.resolveAliases(symbol)
-    return self._autotypes.get(symbol)
+  def _own(self, table, symbol):
+    # returns the type `symbol` from `table` (either `self._types` or
+    # `self._autotypes`), first replacing it with a private copy if it
+    # is shared with other registries (see :meth:`clone`). note that
+    # the copies are memoized, so that a type that is registered in
+    # both tables is only copied once.
+    typ = table[symbol]
+    if id(typ) in self._shared:
+      if self._memo is None:
+        self._memo = dict()
+      typ = table[symbol] = copy.deepcopy(typ, self._memo)
+    return typ
+
+  #----------------------------------------------------------------------------
+  def replace(self, type, new):
+    '''
+    Replaces `type` with `new` (typically, a modified copy of `type`,
+    which may be shared with other registries and therefore cannot be
+    modified in-place) in this registry, and records the replacement
+    so that it can be looked up with :meth:`current`.
+    '''
+    # note: `type` is retained so that its identity cannot be re-used.
+    self._replaced[id(type)] = (type, new)
+    for table in (self._types, self._autotypes):
+      if table.get(type.name) is type:
+        table[type.name] = new
+        self._touch()
+
+  #----------------------------------------------------------------------------
+  def current(self, type):
+    '''
+    Returns the object that `type` was replaced with via
+    :meth:`replace`, or `type` itself if it was not replaced.
+    '''
+    while id(type) in self._replaced:
+      type = self._replaced[id(type)][1]
+    return type
+
+  #----------------------------------------------------------------------------
+  def intern(self, type):
+    '''
+    Returns the canonical instance of the anonymous Type or TypeRef
+    `type`: the first object passed to this method that has the same
+    structure (including `meta`) and the same child instances, or
+    `type` itself if there is none yet. The children of `type` are
+    interned first, and are replaced in `type` by their canonical
+    instances. Named dict and extension types (i.e. the types that are
+    registered in this registry) are returned as-is, and their
+    children are left untouched.
+
+    Interning the endpoint types, e.g. the many identical ``dict``
+    parameter shapes of a large API, makes them share single
+    instances, which reduces memory and the cost of cloning them. Note
+    that interned types may therefore be referenced from multiple
+    places, and must be copied before being modified.
+    '''
+    if isinstance(type, TypeRef):
+      if type.type is not None:
+        sub = self.intern(type.type)
+        if sub is not type.type:
+          type.type = sub
+    elif isinstance(type, Type):
+      if type.base in (Type.DICT, Type.EXTENSION):
+        return type
+      if isinstance(type.value, (Type, TypeRef)):
+        sub = self.intern(type.value)
+        if sub is not type.value:
+          type.value = sub
+      elif isinstance(type.value, list) \
+          and any(isinstance(val, (Type, TypeRef)) for val in type.value):
+        value = [
+          self.intern(val) if isinstance(val, (Type, TypeRef)) else val
+          for val in type.value]
+        if any(cur is not new for cur, new in zip(type.value, value)):
+          type.value = value
+    else:
+      return type
+    # note: candidates are always fully compared, so a key that became
+    #       stale through in-place changes can only cause a miss.
+    key = (type.__class__, _internkey(dict(type)))
+    for cand in self._interned.get(key, ()):
+      if cand.__class__ is type.__class__ and _identical(dict(cand), dict(type)):
+        return cand
+    self._interned.setdefault(key, []).append(type)
+    return type
+
+  #----------------------------------------------------------------------------
+  def filterTypes(self, func):
+    '''
+    Calls `func` with each registered type (sorted by name) and
+    returns the list of the non-``None`` results. The types passed to
+    `func` may be shared with other registries (see :meth:`clone`),
+    and must therefore not be modified in-place: instead, `func` must
+    return a modified copy, which then replaces the type in this
+    registry (see :meth:`replace`).
+    '''
+    ret = []
+    for name in self.typeNames():
+      typ = self._types[name]
+      res = func(typ)
+      if res is None:
+        continue
+      if res is not typ:
+        self.replace(typ, res)
+      ret.append(res)
+    return ret
+
+  #----------------------------------------------------------------------------
+  def reachable(self, roots, types=None):
+    '''
+    Returns a :class:`TypeGraph` of the named types that are reachable
+    from the Type and TypeRef objects in `roots` (e.g. the `params`,
+    `returns` and `raises` of a set of endpoints; ``None`` values are
+    ignored). A named type is any type that is not a scalar, constant
+    or anonymous compound type -- it is only included if it is
+    registered in `types`, which defaults to all registered types. A
+    reachable type is walked via its entry in `types` (or this
+    registry) rather than via the object that references it, so that
+    the types that were filtered out of `types` and the types that are
+    only referenced by them are excluded. Note that, unlike
+    :meth:`get`, this does not promote any auto types.
+    '''
+    if types is None:
+      table = self._types
+    else:
+      table = {typ.name: typ for typ in types}
+    anonymous = (Type.SCALAR, Type.CONSTANT, Type.COMPOUND)
+    graph = TypeGraph()
+    seen  = set()
+    # note: the walk is iterative (since the types can be arbitrarily
+    #       deep), and `stack` holds (type, referrer) pairs, where the
+    #       referrer is the name of the closest named ancestor type or
+    #       ``None`` for the roots.
+    stack = [(typ, None) for typ in roots if typ is not None]
+    while stack:
+      typ, referrer = stack.pop()
+      if isinstance(typ, Type) and typ.base not in anonymous:
+        name = self.resolveAliases(typ.name)
+        if name not in table:
+          continue
+        if referrer is None:
+          graph.roots.add(name)
+        else:
+          graph.edges[referrer].add(name)
+        if name in graph.edges:
+          continue
+        graph.edges[name] = set()
+        typ      = table[name]
+        referrer = name
+      elif (id(typ), referrer) in seen:
+        continue
+      else:
+        # note: anonymous types are typically shared (see
+        #       :meth:`intern`), so they are only walked once per
+        #       referrer.
+        seen.add((id(typ), referrer))
+      for child in typ.children or ():
+        stack.append((child, referrer))
+    return graph
 
   #----------------------------------------------------------------------------
   def typeNames(self):
@@ -699,7 +1180,7 @@ class TypeRegistry(object):
 
   #----------------------------------------------------------------------------
   def types(self):
-    return sorted(self._types.values(), key=lambda typ: typ.name.lower())
+    return [self._own(self._types, name) for name in self.typeNames()]
 
   #----------------------------------------------------------------------------
   def prepareParams(self, type):
@@ -712,10 +1193,34 @@ class TypeRegistry(object):
 
   #----------------------------------------------------------------------------
   def parseType(self, spec, complete=True):
-    src = StringWalker(spec)
+    '''
+    Parses the type specification `spec` and returns the resulting
+    Type. If `complete` is falsy, the spec may have trailing data, and
+    a tuple of ``(Type, REMAINDER)`` is returned instead.
+
+    The results (including failures) are cached in `parseCache`, keyed
+    by the spec and this registry's current set of types and aliases,
+    and the caller always receives a private copy.
+    '''
+    key = (self._generation, spec.__class__, spec, complete)
+    ret = parseCache.get(key)
+    if ret is None:
+      try:
+        ret = self._parseTypeUncached(spec, complete)
+      except ValueError as err:
+        # note: a new exception is stored so that no traceback is retained
+        ret = ValueError(*err.args)
+      parseCache.put(key, ret, 1)
+    if isinstance(ret, ValueError):
+      raise ValueError(*ret.args)
+    return _copyParsed(ret)
+
+  #----------------------------------------------------------------------------
+  def _parseTypeUncached(self, spec, complete):
+    src = TypeSpecScanner(spec, self._token_cre)
     typ = self._parseType(src)
-    if src.string and src.string.startswith(self.options.commentToken):
-      src.read(len(src.string))
+    if src.token()[0] == 'comment':
+      src.read(src.length)
     if not typ or src.index <= 0:
       raise ValueError('could not parse %r' % (spec,))
     rem = src.string
@@ -731,22 +1236,20 @@ class TypeRegistry(object):
     typ = self._parseType_next(source)
     if not typ:
       return typ
-    if not source.eatws():
-      return typ
-    for seqtyp, seqtok in [
-        (Type.ONEOF, self.options.oneof_sep),
-        (Type.UNION, self.options.union_sep),
-      ]:
-      if source.startswith(seqtok):
-        return self._parseType_sequence(source, typ, seqtyp, seqtok)
+    kind = source.eatws().token()[0]
+    if kind == 'oneof':
+      return self._parseType_sequence(
+        source, typ, Type.ONEOF, self.options.oneof_sep)
+    if kind == 'union':
+      return self._parseType_sequence(
+        source, typ, Type.UNION, self.options.union_sep)
     return typ
 
   #----------------------------------------------------------------------------
   def _parseType_sequence(self, source, current, base, token):
+    kind = source.token()[0]
     while True:
-      if not source.eatws():
-        return current
-      if not source.startswith(token):
+      if source.eatws().token()[0] != kind:
         return current
         # raise ValueError(
         #   'cannot parse after %s separator (%r) at position %d (%r)'
@@ -763,43 +1266,28 @@ class TypeRegistry(object):
           % (base, token, source.index, source.string))
       current.value.append(styp)
 
-  #----------------------------------------------------------------------------
-  def _peekSymbol(self, source):
-    match = symbol_cre.match(source.string)
-    if not match:
-      return None
-    return match.group(0)
-
   #----------------------------------------------------------------------------
   def _parseType_next(self, source):
-    if not source.eatws():
-      return None
-    if source.startswith(self.options.closure_open):
+    kind, text = source.eatws().token()
+    if kind == 'open':
       idx = source.index
-      source.read(1)
+      source.read(len(text))
       typ = self._parseType(source)
       if not typ:
         source.seek(idx)
         raise ValueError(
           'cannot parse content of grouping (%r) at position %d (%r)' \
             % (self.options.closure_open, source.index, source.string))
-      source.eatws()
-      if source.read(1) != self.options.closure_close:
+      if source.eatws().token()[0] != 'close':
         source.seek(idx)
         raise ValueError(
           'unterminated %r at position %d (%r)' \
             % (self.options.closure_open, source.index, source.string))
+      source.read(len(self.options.closure_close))
       return typ
-    token = self._peekSymbol(source)
-    if token:
-      typ = self._parseType_token(source, token)
-      if typ:
-        return typ
-    if constant_cre.match(source.string):
-      typ = self._parseType_constant(source)
-      if typ:
-        return typ
-    return None
+    if kind == 'symbol':
+      return self._parseType_token(source, text)
+    return self._parseType_constant(source) or None
 
   #----------------------------------------------------------------------------
   def _parseType_token(self, source, token):
@@ -811,8 +1299,7 @@ class TypeRegistry(object):
     if hasattr(self, '_parseType_compound_' + symbol):
       value = None
       source.read(len(token))
-      source.eatws()
-      if source.startswith(self.options.closure_open):
+      if source.eatws().token()[0] == 'open':
         value = self._parseType(source)
       typ = getattr(self, '_parseType_compound_' + token)(source, token, value)
       if typ:
@@ -856,11 +1343,12 @@ class TypeRegistry(object):
     # TODO: convert this to use constant.parse()!...
     #       (the issue is that constant.parse auto-converts hex values,
     #       which i want to detect somehow to set the type to BYTE or BYTES)
-    if source.startswith('0x'):
+    kind, text = source.token()
+    if kind == 'hex':
       return self._parseType_constant_hex(source)
-    if source.peek() in '01234567890-':
+    if kind == 'number' or text == '-':
       return self._parseType_constant_num(source)
-    if source.peek() in '\'"{[':
+    if kind == 'quote':
       return self._parseType_constant_yaml(source)
     return None
 
@@ -887,13 +1375,11 @@ class TypeRegistry(object):
 
   #----------------------------------------------------------------------------
   def _parseType_constant_hex(self, source):
-    if not source.string.startswith('0x'):
+    kind, text = source.token()
+    if kind != 'hex':
       return None
-    match = hex_cre.match(source.string[2:])
-    if not match:
-      return None
-    data = match.group(0)
-    source.read(len(data) + 2)
+    data = text[2:]
+    source.read(len(text))
     if len(data) == 2:
       return Type(base=Type.CONSTANT, name=Type.BYTE, value=data.decode('hex'))
     return Type(base=Type.CONSTANT, name=Type.BYTES, value=data.decode('hex'))
@@ -903,6 +1389,19 @@ class TypeRegistry(object):
     # NOTE: using json, not yaml, because yaml is far too lenient.
     # for example ``78 !foo~`` would be interpreted as the entire
     # *string* "78 !foo~", not the number 78 + plus extra stuff...
+    # note: the number token uses the JSON number grammar, so it is
+    #       decoded directly (including the whitespace that json would
+    #       consume) -- except when followed by a newline and more data,
+    #       which util.jsonParse rejects.
+    start = source.index
+    kind, text = source.token()
+    if kind == 'number':
+      source.read(len(text))
+      source.eatws()
+      if not source.length \
+          or '\n' not in source.source[start + len(text):source.index]:
+        return self._parseType_native(json.loads(text))
+      source.seek(start)
     ret, rem = util.jsonParse(source.string, partial=True)
     source.read(source.length - len(rem))
     return self._parseType_native(ret)